@@ -0,0 +1,122 @@
+import atexit
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 저장소 루트 (bench/ 의 상위)
+ROOT = Path(__file__).resolve().parent.parent
+
+# 결과 파일 형식 버전 (필드가 바뀌면 올린다)
+RESULT_VERSION = 1
+
+## 데이터셋 크기 표기 (1k, 100k, 1m) -> 개수
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    units = {"k": 1000, "m": 1000 * 1000}
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+## 벤치마크용 작업 디렉터리 준비 -> 데이터 디렉터리
+##  원본 데이터셋과 저장소의 uploads/ 가 바뀌지 않도록 임시 복사본에서 실행하고 끝나면 지운다.
+##  모델/설정 모듈을 import 하기 전에 호출해야 DATA_DIR 가 반영된다
+def prepare_data_dir(dataset: Optional[str]) -> Path:
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    atexit.register(shutil.rmtree, workdir, True)
+    data_dir = workdir / "data"
+    if dataset:
+        shutil.copytree(dataset, data_dir)
+    else:
+        data_dir.mkdir()
+    shutil.copytree(ROOT / "uploads", workdir / "uploads")
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ.setdefault("SQLITE_PATH", str(data_dir / "community.db"))
+    os.chdir(workdir)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    return data_dir
+
+## 지연 시간 목록(초) 요약 -> 밀리초 백분위수와 초당 처리량
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "ops_per_sec": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+## 실행 환경 정보 (실행 간 비교용)
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "storage_engine": os.getenv("STORAGE_ENGINE", "json"),
+        "cache_enabled": os.getenv("CACHE_ENABLED", "1"),
+    }
+
+## 결과 저장 (output 이 없으면 표준 출력)
+def write_result(kind: str, params: dict, results: Dict[str, dict], output: Optional[str]):
+    document = {
+        "version": RESULT_VERSION,
+        "kind": kind,
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+## 한 줄 요약 출력 (표준 에러, 결과 JSON 과 섞이지 않게)
+def report(name: str, summary: Dict[str, float]):
+    print(
+        f"{name:<32} n={summary['count']:<7} p50={summary['p50_ms']:>9.3f}ms "
+        f"p95={summary['p95_ms']:>9.3f}ms p99={summary['p99_ms']:>9.3f}ms "
+        f"{summary['ops_per_sec']:>10.1f}/s errors={summary['errors']}",
+        file=sys.stderr
+    )
+
+## 프로세스 최대 상주 메모리(MB, resource 모듈이 없으면 None)
+def max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 는 바이트, 리눅스는 KB
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+## 시간 측정 (time.perf_counter)
+now = time.perf_counter
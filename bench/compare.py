@@ -0,0 +1,51 @@
+"""두 벤치마크 결과 비교
+
+    python -m bench.compare before.json after.json
+
+공통 항목마다 p50/p95/p99 와 처리량의 변화율을 출력한다. --threshold 보다 느려진
+항목이 있으면 종료 코드 1 을 돌려준다 (CI 에서 회귀 확인용).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "ops_per_sec")
+
+def _change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p95 가 이 비율(%%) 이상 느려지면 회귀")
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text(encoding="utf-8"))
+    after = json.loads(Path(args.after).read_text(encoding="utf-8"))
+    if before.get("kind") != after.get("kind"):
+        print(f"종류가 다릅니다: {before.get('kind')} / {after.get('kind')}", file=sys.stderr)
+        sys.exit(2)
+
+    regressed = []
+    print(f"{'name':<32}" + "".join(f"{metric:>22}" for metric in METRICS))
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None or "p50_ms" not in old:
+            continue
+        cells = []
+        for metric in METRICS:
+            cells.append(f"{old[metric]:>9} -> {new[metric]:<9}({_change(old[metric], new[metric]):+.0f}%)")
+        print(f"{name:<32}" + "".join(f"{cell:>22}" for cell in cells))
+        if _change(old["p95_ms"], new["p95_ms"]) >= args.threshold:
+            regressed.append(name)
+
+    if regressed:
+        print(f"회귀: {', '.join(regressed)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
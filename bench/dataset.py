@@ -0,0 +1,131 @@
+"""벤치마크용 합성 데이터셋 생성 (data/*.json 형식)
+
+    python -m bench.dataset --size 100k --out bench/datasets/100k
+
+사용자/게시글/댓글을 각각 --size 개씩 만든다 (--users/--posts/--comments 로 개별 지정).
+1M 도 메모리에 전부 올리지 않고 레코드 단위로 파일에 바로 쓴다.
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bench.common import parse_size
+
+# 제목/내용용 단어
+WORDS = (
+    "안녕하세요 오늘 날씨 정말 좋네요 점심 메뉴 추천 부탁드립니다 주말 여행 후기 공유합니다 "
+    "파이썬 자바스크립트 서버 데이터베이스 성능 최적화 질문 있습니다 감사합니다 고양이 강아지 "
+    "사진 영화 음악 운동 공부 프로젝트 회고 커뮤니티 게시판 처음 가입했어요 잘 부탁드려요 "
+    "fastapi python json cache index benchmark latency"
+).split()
+
+DEFAULT_PROFILE_IMAGE_URL = "/static/profile_images/default.jpg"
+
+# 모든 사용자 공통 비밀번호 (Bench1234!)
+PASSWORD_HASH = hashlib.sha256("Bench1234!".encode()).hexdigest()
+
+## 레코드를 JSON 배열 파일로 하나씩 쓰기
+def write_array(path: Path, records) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            count += 1
+        f.write("]\n")
+    return count
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+def _timestamp(start: datetime, index: int) -> str:
+    return (start + timedelta(seconds=index)).isoformat()
+
+def users(count: int, start: datetime):
+    for user_id in range(1, count + 1):
+        yield {
+            "id": user_id,
+            "email": f"user{user_id}@bench.test",
+            "password": PASSWORD_HASH,
+            "nickname": f"user{user_id}",
+            "profile_image_url": DEFAULT_PROFILE_IMAGE_URL,
+            "profile_image_variants": None,
+            "created_at": _timestamp(start, user_id),
+        }
+
+def posts(count: int, user_count: int, comment_counts, rng: random.Random, start: datetime):
+    for post_id in range(1, count + 1):
+        user_id = rng.randint(1, user_count)
+        created_at = _timestamp(start, post_id)
+        yield {
+            "id": post_id,
+            "title": _sentence(rng, 2, 4)[:26],
+            "content": _sentence(rng, 10, 60),
+            "image_url": None,
+            "image_variants": None,
+            "user_id": user_id,
+            "author_nickname": f"user{user_id}",
+            "author_profile_image": DEFAULT_PROFILE_IMAGE_URL,
+            "created_at": created_at,
+            "updated_at": created_at,
+            "likes": 0,
+            "comments_count": comment_counts.get(post_id, 0),
+            "view_count": rng.randint(0, 1000),
+        }
+
+def comments(post_ids, user_count: int, rng: random.Random, start: datetime):
+    for comment_id, post_id in enumerate(post_ids, 1):
+        user_id = rng.randint(1, user_count)
+        created_at = _timestamp(start, comment_id)
+        yield {
+            "id": comment_id,
+            "post_id": post_id,
+            "user_id": user_id,
+            "author_nickname": f"user{user_id}",
+            "author_profile_image": DEFAULT_PROFILE_IMAGE_URL,
+            "content": _sentence(rng, 3, 20),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 데이터셋 생성")
+    parser.add_argument("--size", default="1k", help="기본 레코드 수 (1k, 100k, 1m)")
+    parser.add_argument("--users", help="사용자 수 (기본 --size)")
+    parser.add_argument("--posts", help="게시글 수 (기본 --size)")
+    parser.add_argument("--comments", help="댓글 수 (기본 --size)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="출력 디렉터리 (DATA_DIR 로 사용)")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    user_count = parse_size(args.users) if args.users else size
+    post_count = parse_size(args.posts) if args.posts else size
+    comment_count = parse_size(args.comments) if args.comments else size
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+
+    # 댓글이 달릴 게시글을 먼저 정해야 게시글의 comments_count 를 맞출 수 있다 (최근 글에 몰리도록)
+    post_ids = [post_count - int(post_count * rng.random() ** 3) for _ in range(comment_count)] if post_count else []
+    comment_counts = {}
+    for post_id in post_ids:
+        comment_counts[post_id] = comment_counts.get(post_id, 0) + 1
+
+    written = {
+        "users": write_array(out / "users.json", users(user_count, start)),
+        "posts": write_array(out / "posts.json", posts(post_count, user_count or 1, comment_counts, rng, start)),
+        "comments": write_array(out / "comments.json", comments(post_ids, user_count or 1, rng, start)),
+    }
+    for name, count in written.items():
+        print(f"{name}: {count}개 -> {out / (name + '.json')}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""HTTP 부하 측정 (ASGI 전송으로 앱을 프로세스 안에서 직접 호출, 네트워크 없음)
+
+    python -m bench.load --data bench/datasets/100k --concurrency 32 --seconds 10 --output load.json
+
+엔드포인트마다 --concurrency 개의 요청을 동시에 보내며 --seconds 초 동안 측정한다.
+"""
+import argparse
+import asyncio
+import random
+import sys
+from typing import Callable, Dict, List, Tuple
+
+from bench.common import prepare_data_dir, summarize, write_result, report, now
+
+# 요청 생성 함수: (반복 번호) -> (메서드, 경로, 추가 인자)
+Request = Tuple[str, str, dict]
+
+## 엔드포인트 시나리오
+def scenarios(rng: random.Random, post_count: int, user_count: int) -> Dict[str, Callable[[int], Request]]:
+    def post_id() -> int:
+        return rng.randint(1, post_count)
+
+    def user_id() -> int:
+        return rng.randint(1, user_count)
+
+    def unique() -> str:
+        # 닉네임은 10자 이하
+        return f"{rng.getrandbits(36):09x}"
+
+    return {
+        "GET /posts": lambda i: ("GET", "/posts", {"params": {"limit": 20}}),
+        # 조건부 요청 (If-None-Match: * 는 버전만 확인하고 304)
+        "GET /posts 304": lambda i: ("GET", "/posts", {"params": {"limit": 20}, "headers": {"If-None-Match": "*"}}),
+        "GET /posts/{id}": lambda i: ("GET", f"/posts/{post_id()}", {}),
+        "GET /posts/{id}/comments": lambda i: ("GET", f"/posts/{post_id()}/comments", {}),
+        "GET /posts/search": lambda i: ("GET", "/posts/search", {"params": {"q": rng.choice(("점심 메뉴", "파이썬", "고양이"))}}),
+        "POST /posts/{id}/view": lambda i: ("POST", f"/posts/{post_id()}/view", {}),
+        "POST /posts/{id}/like": lambda i: ("POST", f"/posts/{post_id()}/like", {"data": {"user_id": user_id()}}),
+        "POST /posts/{id}/comments": lambda i: (
+            "POST", f"/posts/{post_id()}/comments", {"data": {"user_id": user_id(), "content": f"load comment {i}"}}
+        ),
+        "POST /auth/signin": lambda i: (
+            "POST", "/auth/signin", {"data": {"email": f"user{user_id()}@bench.test", "password": "Bench1234!"}}
+        ),
+        "POST /auth/signup": lambda i: (
+            "POST", "/auth/signup", {"data": {
+                "email": f"load{unique()}@bench.test", "password": "Bench1234!",
+                "password_confirm": "Bench1234!", "nickname": f"n{unique()}",
+            }}
+        ),
+    }
+
+## 한 엔드포인트 측정
+async def measure(client, make_request: Callable[[int], Request], concurrency: int, seconds: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    # 응답 본문 바이트 (전송된 그대로, 압축 포함)
+    wire_bytes = 0
+    counter = iter(range(1 << 62))
+    started = now()
+    deadline = started + seconds
+
+    async def worker():
+        nonlocal errors, wire_bytes
+        while now() < deadline:
+            method, path, kwargs = make_request(next(counter))
+            begin = now()
+            try:
+                response = await client.request(method, path, **kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+                wire_bytes += response.num_bytes_downloaded
+            except Exception:
+                errors += 1
+            latencies.append(now() - begin)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, now() - started, errors)
+    summary["bytes_per_response"] = round(wire_bytes / len(latencies)) if latencies else 0
+    return summary
+
+async def run(args) -> Dict[str, dict]:
+    import httpx
+    from main import app
+    from model.post import post_model
+    from model.user import user_model
+
+    rng = random.Random(args.seed)
+    results = {}
+    # ASGITransport 는 lifespan 을 실행하지 않으므로 직접 감싼다
+    async with app.router.lifespan_context(app):
+        post_count = max(1, len(post_model.collection))
+        user_count = max(1, len(user_model.collection))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in scenarios(rng, post_count, user_count).items():
+                if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                    continue
+                # 워밍업 (첫 로드, 인덱스 구성)
+                await measure(client, make_request, 1, args.warmup)
+                results[name] = await measure(client, make_request, args.concurrency, args.seconds)
+                report(name, results[name])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="ASGI 부하 측정 (엔드포인트별 p50/p95/p99, req/s)")
+    parser.add_argument("--data", help="데이터셋 디렉터리 (bench.dataset 출력, 없으면 빈 데이터)")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 요청 수")
+    parser.add_argument("--seconds", type=float, default=5.0, help="엔드포인트별 측정 시간")
+    parser.add_argument("--warmup", type=float, default=0.5, help="엔드포인트별 워밍업 시간")
+    parser.add_argument("--only", action="append", help="이 이름으로 시작하는 엔드포인트만 (예: 'GET /posts')")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    prepare_data_dir(args.data)
+    results = asyncio.run(run(args))
+    write_result("load", vars(args), results, args.output)
+
+if __name__ == "__main__":
+    main()
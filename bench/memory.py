@@ -0,0 +1,114 @@
+"""레코드 메모리 벤치마크 (dict vs model.record 의 __slots__ 레코드)
+
+    python -m bench.dataset --size 100k --out bench/datasets/100k
+    python -m bench.memory --data bench/datasets/100k --output memory.json
+
+컬렉션마다 같은 레코드를 한 번은 JSON 에서 읽은 dict 그대로, 한 번은 레코드 클래스로 바꿔서 들고
+tracemalloc 으로 남은 메모리를 잰다. 레코드당 바이트는 값(문자열 등)까지 포함한 크기다.
+--data 가 없으면 bench.dataset 과 같은 방식으로 --size 개를 만들어 JSON 으로 한 번 거친 뒤 잰다.
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+from bench import dataset
+from bench.common import ROOT, parse_size, write_result, now
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from model.record import Comment, Post, User
+
+RECORD_TYPES = {"users": User, "posts": Post, "comments": Comment}
+
+## 컬렉션 레코드 목록을 만드는 함수 (호출할 때마다 새로 JSON 을 읽는다)
+def sources(data: str, size: int) -> dict:
+    if data:
+        def reader(name: str) -> Callable[[], List[dict]]:
+            def read() -> List[dict]:
+                with open(Path(data) / f"{name}.json", "r", encoding="utf-8") as f:
+                    return json.load(f)
+            return read
+        return {name: reader(name) for name in RECORD_TYPES}
+
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    post_ids = [size - int(size * rng.random() ** 3) for _ in range(size)]
+    generated = {
+        "users": list(dataset.users(size, start)),
+        "posts": list(dataset.posts(size, size, {}, rng, start)),
+        "comments": list(dataset.comments(post_ids, size, rng, start)),
+    }
+    # 저장소에서 읽은 레코드처럼 값 문자열을 레코드마다 따로 갖도록 JSON 으로 한 번 거친다
+    texts = {name: json.dumps(records, ensure_ascii=False) for name, records in generated.items()}
+    return {name: (lambda text=text: json.loads(text)) for name, text in texts.items()}
+
+## build() 가 돌려준 값이 붙잡고 있는 메모리 -> (값, 바이트)
+def retained(build: Callable[[], object]):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current
+
+## 한 컬렉션 측정
+def measure(name: str, read: Callable[[], List[dict]]) -> dict:
+    record_type = RECORD_TYPES[name]
+    dicts, dict_bytes = retained(read)
+    count = len(dicts)
+    del dicts
+    records, record_bytes = retained(lambda: [record_type.from_dict(record) for record in read()])
+
+    # 변환 비용 (로드 때 from_dict, 응답 때 to_dict)
+    plain = read()
+    started = now()
+    for record in plain:
+        record_type.from_dict(record)
+    from_dict_seconds = now() - started
+    started = now()
+    for record in records:
+        record.to_dict()
+    to_dict_seconds = now() - started
+
+    per_dict = dict_bytes / count if count else 0.0
+    per_record = record_bytes / count if count else 0.0
+    return {
+        "records": count,
+        "dict_bytes_per_record": round(per_dict, 1),
+        "record_bytes_per_record": round(per_record, 1),
+        "saved_percent": round((1 - per_record / per_dict) * 100, 1) if per_dict else 0.0,
+        "dict_mb": round(dict_bytes / (1024 * 1024), 1),
+        "record_mb": round(record_bytes / (1024 * 1024), 1),
+        "from_dict_us": round(from_dict_seconds / count * 1e6, 3) if count else 0.0,
+        "to_dict_us": round(to_dict_seconds / count * 1e6, 3) if count else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="레코드 메모리 벤치마크 (dict vs __slots__ 레코드)")
+    parser.add_argument("--data", help="데이터셋 디렉터리 (bench.dataset 출력, 없으면 --size 개를 만든다)")
+    parser.add_argument("--size", default="10k", help="--data 가 없을 때 컬렉션별 레코드 수")
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, read in sources(args.data, parse_size(args.size)).items():
+        results[name] = measure(name, read)
+        result = results[name]
+        print(
+            f"{name:<32} n={result['records']:<8} dict={result['dict_bytes_per_record']:>8.1f}B "
+            f"record={result['record_bytes_per_record']:>8.1f}B ({result['saved_percent']:+.1f}% 절약) "
+            f"from_dict={result['from_dict_us']:.2f}us to_dict={result['to_dict_us']:.2f}us",
+            file=sys.stderr
+        )
+    write_result("memory", vars(args), results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""모델 단위 마이크로 벤치마크
+
+    python -m bench.dataset --size 100k --out bench/datasets/100k
+    python -m bench.micro --data bench/datasets/100k --output micro.json
+
+데이터셋을 임시 디렉터리에 복사해서 실행하므로 원본은 바뀌지 않는다.
+벤치마크마다 --iterations 번 또는 --seconds 초 중 먼저 끝나는 만큼 반복한다.
+"""
+import argparse
+import random
+import sys
+from typing import Callable, Dict, List
+
+from bench.common import prepare_data_dir, summarize, write_result, report, now, max_rss_mb
+
+## 한 벤치마크 실행 -> 요약
+def run(operation: Callable[[int], object], iterations: int, seconds: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    started = now()
+    deadline = started + seconds
+    for i in range(iterations):
+        begin = now()
+        try:
+            operation(i)
+        except Exception:
+            errors += 1
+        latencies.append(now() - begin)
+        if begin > deadline:
+            break
+    return summarize(latencies, now() - started, errors)
+
+## 벤치마크 목록 (이름 -> 반복마다 호출할 함수)
+def benchmarks(rng: random.Random) -> Dict[str, Callable[[int], object]]:
+    from model.post import post_model
+    from model.comment import comment_model
+    from model.user import user_model
+
+    post_count = max(1, len(post_model.collection))
+    user_count = max(1, len(user_model.collection))
+    first_page = post_model.find_all(0, 20)
+
+    def random_post_id() -> int:
+        return rng.randint(1, post_count)
+
+    def signup(i: int):
+        user_model.create({
+            "email": f"micro{i}-{rng.random()}@bench.test",
+            "password": user_model.hash_password("Bench1234!"),
+            "nickname": f"micro{i}-{rng.random()}",
+            "profile_image_url": None,
+            "created_at": "2024-06-01T00:00:00",
+        })
+
+    def create_comment(i: int):
+        post_id = random_post_id()
+        comment_model.create({
+            "post_id": post_id,
+            "user_id": rng.randint(1, user_count),
+            "content": f"micro comment {i}",
+            "created_at": "2024-06-01T00:00:00",
+            "updated_at": "2024-06-01T00:00:00",
+        })
+        post_model.increment_comment_count(post_id, 1)
+
+    return {
+        "post.find_all": lambda i: post_model.find_all(0, 20),
+        "post.find_all.skip": lambda i: post_model.find_all(rng.randint(0, post_count), 20),
+        "post.find_all.cursor": lambda i: post_model.find_all(0, 20, first_page["next_cursor"]),
+        "post.find_by_id": lambda i: post_model.find_by_id(random_post_id()),
+        "post.search": lambda i: post_model.search(rng.choice(("점심 메뉴", "파이썬", "고양이 사진")), 0, 20),
+        "post.increment_view_count": lambda i: post_model.increment_view_count(random_post_id()),
+        "post.toggle_like": lambda i: post_model.toggle_like(random_post_id(), rng.randint(1, user_count)),
+        "comment.find_by_post_id": lambda i: comment_model.find_by_post_id(random_post_id()),
+        "comment.create": create_comment,
+        "user.find_by_email": lambda i: user_model.find_by_email(f"user{rng.randint(1, user_count)}@bench.test"),
+        "user.signup": signup,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 단위 마이크로 벤치마크")
+    parser.add_argument("--data", help="데이터셋 디렉터리 (bench.dataset 출력, 없으면 빈 데이터)")
+    parser.add_argument("--iterations", type=int, default=1000, help="벤치마크별 최대 반복 수")
+    parser.add_argument("--seconds", type=float, default=5.0, help="벤치마크별 최대 실행 시간")
+    parser.add_argument("--only", action="append", help="이 이름으로 시작하는 벤치마크만 (여러 번 지정 가능)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    prepare_data_dir(args.data)
+    rng = random.Random(args.seed)
+
+    # 첫 로드(파일 읽기 + 인덱스 구성)는 따로 잰다
+    started = now()
+    from model.post import post_model
+    from model.comment import comment_model
+    from model.user import user_model
+    for model in (post_model, comment_model, user_model):
+        len(model.collection)
+    load_seconds = now() - started
+    load_rss = max_rss_mb()
+    print(f"{'load':<32} {load_seconds:.3f}s rss={load_rss}MB", file=sys.stderr)
+
+    results = {"load": {"seconds": round(load_seconds, 3), "rss_mb": load_rss}}
+    for name, operation in benchmarks(rng).items():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        results[name] = run(operation, args.iterations, args.seconds)
+        report(name, results[name])
+
+    from model.counter import flush_all
+    flush_all()
+    write_result("micro", vars(args), results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 from fastapi import HTTPException, UploadFile
-from model.user import user_model
+from model.user import user_model, async_user_model
+from model.index import DuplicateKeyError
 from datetime import datetime
-import uuid
-from pathlib import Path
+from core.upload import save_upload
+from core.images import schedule_derivatives, variant_urls
 
-PROFILE_DIR = Path("uploads/profile_images")
-PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+DEFAULT_PROFILE_IMAGE_URL = "/static/profile_images/default.jpg"
+
+# 유니크 인덱스 필드별 중복 메시지
+DUPLICATE_MESSAGES = {
+    "email": "이미 사용중인 이메일입니다.",
+    "nickname": "이미 사용중인 닉네임입니다.",
+}
 
 class AuthController:
 
@@ -26,37 +32,29 @@ class AuthController:
     @staticmethod
     async def save_profile_image(profile_image: UploadFile) -> str:
         if not profile_image or not profile_image.filename:
-            return "/static/profile_images/default.jpg"
+            return DEFAULT_PROFILE_IMAGE_URL
         
         if not profile_image.filename.lower().endswith('.jpg'):
             raise HTTPException(400, "프로필 사진은 .jpg 파일만 가능합니다")
         
-        if profile_image.content_type != "image/jpeg":
-            raise HTTPException(400, "JPEG 이미지만 업로드 가능합니다")
-        
-        contents = await profile_image.read()
-        if len(contents) > 5 * 1024 * 1024:
-            raise HTTPException(400, "파일 크기는 5MB 이하여야 합니다.")
-        
-        unique_filename = f"{uuid.uuid4().hex}.jpg"
-        file_path = PROFILE_DIR / unique_filename
+        # 청크 단위로 받으면서 크기 제한과 JPEG 매직 바이트 확인 (내용 해시 경로에 저장)
+        profile_image_url = await save_upload(
+            profile_image, 5 * 1024 * 1024, "jpeg", "JPEG 이미지만 업로드 가능합니다"
+        )
         
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        return f"/static/profile_images/{unique_filename}"
+        # 썸네일/중간 크기 파생본은 백그라운드에서 생성
+        schedule_derivatives(profile_image_url)
+        return profile_image_url
     
     ## 회원가입
     @staticmethod
     async def signup(email: str, password: str, password_confirm: str, 
                      nickname: str, profile_image: UploadFile = None):
-        # 이메일 중복 체크
-        if user_model.find_by_email(email):
-            raise HTTPException(400, "이미 사용중인 이메일입니다.")
-        
-        # 닉네임 중복 체크
-        if user_model.find_by_nickname(nickname):
-            raise HTTPException(400, "이미 사용중인 닉네임입니다.")
+        # 이메일/닉네임 중복 체크 (이미지 저장 전에 빨리 거절, 최종 보장은 모델의 유니크 인덱스)
+        if await async_user_model.find_by_email(email):
+            raise HTTPException(400, DUPLICATE_MESSAGES["email"])
+        if await async_user_model.find_by_nickname(nickname):
+            raise HTTPException(400, DUPLICATE_MESSAGES["nickname"])
         
         # 비밀번호 유효성 체크
         AuthController.validate_password(password)
@@ -68,27 +66,32 @@ class AuthController:
         profile_image_url = await AuthController.save_profile_image(profile_image)
         
         # 사용자 생성
-        new_user = user_model.create({
-            "email": email,
-            "password": user_model.hash_password(password),
-            "nickname": nickname,
-            "profile_image_url": profile_image_url,
-            "created_at": datetime.now().isoformat()
-        })
+        try:
+            new_user = await async_user_model.create({
+                "email": email,
+                "password": user_model.hash_password(password),
+                "nickname": nickname,
+                "profile_image_url": profile_image_url,
+                "profile_image_variants": variant_urls(profile_image_url),
+                "created_at": datetime.now().isoformat()
+            })
+        except DuplicateKeyError as e:
+            raise HTTPException(400, DUPLICATE_MESSAGES[e.field])
         
         return {
             "id": new_user["id"],
             "email": new_user["email"],
             "nickname": new_user["nickname"],
-            "profile_image_url": new_user["profile_image_url"]
+            "profile_image_url": new_user["profile_image_url"],
+            "profile_image_variants": new_user["profile_image_variants"]
         }
     
     ## 로그인
     @staticmethod
-    def signin(email: str, password: str):
+    async def signin(email: str, password: str):
 
         # 사용자 찾기
-        user = user_model.find_by_email(email)
+        user = await async_user_model.find_by_email(email)
         if not user:
             raise HTTPException(401, "이메일 또는 비밀번호가 잘못되었습니다.")
         
@@ -100,7 +103,8 @@ class AuthController:
             "id": user["id"],
             "email": user["email"],
             "nickname": user["nickname"],
-            "profile_image_url": user["profile_image_url"]
+            "profile_image_url": user["profile_image_url"],
+            "profile_image_variants": user.get("profile_image_variants")
         }
 
 auth_controller = AuthController()
\ No newline at end of file
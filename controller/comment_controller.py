@@ -1,21 +1,22 @@
 from fastapi import HTTPException
-from model.comment import comment_model
-from model.user import user_model
-from model.post import post_model
+from model.comment import async_comment_model
+from model.user import async_user_model
+from model.post import async_post_model
 from datetime import datetime
+from core.responses import make_etag
 
 class CommentController:
 
     ## 댓글 작성
     @staticmethod
-    def create_comment(post_id: int, user_id: int, content: str):
+    async def create_comment(post_id: int, user_id: int, content: str):
         # 게시글 확인
-        post = post_model.find_by_id(post_id)
+        post = await async_post_model.find_by_id(post_id)
         if not post:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
         
         # 사용자 확인
-        user = user_model.find_by_id(user_id)
+        user = await async_user_model.find_by_id(user_id)
         if not user:
             raise HTTPException(404, "사용자를 찾을 수 없습니다.")
         
@@ -25,7 +26,7 @@ class CommentController:
         
         # 댓글 생성
         now = datetime.now().isoformat()
-        new_comment = comment_model.create({
+        new_comment = await async_comment_model.create({
             "post_id": post_id,
             "user_id": user_id,
             "author_nickname": user["nickname"],
@@ -36,31 +37,37 @@ class CommentController:
         })
         
         # 게시글의 댓글 수 업데이트
-        comment_count = comment_model.count_by_post_id(post_id)
-        post_model.update(post_id, {"comments_count": comment_count})
+        await async_post_model.increment_comment_count(post_id, 1)
         
         return new_comment
     
 
     ## 댓글 목록 조회
     @staticmethod
-    def get_comments(post_id: int):
+    async def get_comments(post_id: int):
         # 게시글 확인
-        post = post_model.find_by_id(post_id)
+        post = await async_post_model.find_by_id(post_id)
         if not post:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
         
-        comments = comment_model.find_by_post_id(post_id)
+        comments = await async_comment_model.find_by_post_id(post_id)
         return {
             "total": len(comments),
             "comments": comments
         }
     
+    ## 댓글 목록 ETag (게시글이 없으면 None -> get_comments 에서 404)
+    @staticmethod
+    async def get_comments_etag(post_id: int):
+        if await async_post_model.version_of(post_id) is None:
+            return None
+        return make_etag(await async_comment_model.version_by_post_id(post_id))
+    
     ## 댓글 수정
     @staticmethod
-    def update_comment(comment_id: int, user_id: int, content: str):
+    async def update_comment(comment_id: int, user_id: int, content: str):
         # 댓글 찾기
-        comment = comment_model.find_by_id(comment_id)
+        comment = await async_comment_model.find_by_id(comment_id)
         if not comment:
             raise HTTPException(404, "댓글을 찾을 수 없습니다.")
         
@@ -73,7 +80,7 @@ class CommentController:
             raise HTTPException(400, "댓글 내용을 입력해주세요.")
         
         # 수정
-        updated_comment = comment_model.update(comment_id, {
+        updated_comment = await async_comment_model.update(comment_id, {
             "content": content,
             "updated_at": datetime.now().isoformat()
         })
@@ -82,9 +89,9 @@ class CommentController:
     
     ## 댓글 삭제
     @staticmethod
-    def delete_comment(comment_id: int, user_id: int):
+    async def delete_comment(comment_id: int, user_id: int):
         # 댓글 찾기
-        comment = comment_model.find_by_id(comment_id)
+        comment = await async_comment_model.find_by_id(comment_id)
         if not comment:
             raise HTTPException(404, "댓글을 찾을 수 없습니다.")
         
@@ -95,13 +102,12 @@ class CommentController:
         post_id = comment['post_id']
         
         # 삭제
-        success = comment_model.delete(comment_id)
+        success = await async_comment_model.delete(comment_id)
         if not success:
             raise HTTPException(500, "댓글 삭제에 실패했습니다.")
         
         # 게시글의 댓글 수 업데이트
-        comment_count = comment_model.count_by_post_id(post_id)
-        post_model.update(post_id, {"comments_count": comment_count})
+        await async_post_model.increment_comment_count(post_id, -1)
         
         return {"message": "댓글이 삭제되었습니다."}
 
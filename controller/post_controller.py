@@ -1,12 +1,11 @@
 from fastapi import HTTPException, UploadFile
-from model.post import post_model
-from model.user import user_model
+from model.post import async_post_model
+from model.user import async_user_model
 from datetime import datetime
-import uuid
 from pathlib import Path
-
-POST_IMAGES_DIR = Path("uploads/post_images")
-POST_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+from core.upload import save_upload
+from core.images import schedule_derivatives, variant_urls
+from core.responses import make_etag
 
 class PostController:
 
@@ -16,32 +15,28 @@ class PostController:
         if not image or not image.filename:
             return None
         
-        allowed_extensions = ['.jpg', '.jpeg', '.png']
+        # 확장자별 실제 이미지 형식
+        allowed_extensions = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png'}
         file_ext = Path(image.filename).suffix.lower()
         
         if file_ext not in allowed_extensions:
             raise HTTPException(400, "이미지는 .jpg, .jpeg, .png 파일만 가능합니다.")
         
-        if image.content_type not in ["image/jpeg", "image/png"]:
-            raise HTTPException(400, "JPEG 또는 PNG 이미지만 업로드 가능합니다.")
-        
-        contents = await image.read()
-        if len(contents) > 10 * 1024 * 1024:
-            raise HTTPException(400, "파일 크기는 10MB 이하여야 합니다.")
-        
-        unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-        file_path = POST_IMAGES_DIR / unique_filename
-        
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        # 청크 단위로 받으면서 크기 제한과 매직 바이트 확인 (내용 해시 경로에 저장)
+        image_url = await save_upload(
+            image, 10 * 1024 * 1024, allowed_extensions[file_ext],
+            "JPEG 또는 PNG 이미지만 업로드 가능합니다."
+        )
         
-        return f"/static/post_images/{unique_filename}"
+        # 썸네일/중간 크기 파생본은 백그라운드에서 생성
+        schedule_derivatives(image_url)
+        return image_url
     
     ## 게시글 등록
     @staticmethod
     async def create_post(title: str, content: str, user_id: int, image: UploadFile = None):
         # 사용자 확인
-        user = user_model.find_by_id(user_id)
+        user = await async_user_model.find_by_id(user_id)
         if not user:
             raise HTTPException(404, "사용자를 찾을 수 없습니다.")
         
@@ -59,10 +54,11 @@ class PostController:
         # 게시글 생성
         now = datetime.now().isoformat()
         
-        new_post = post_model.create({
+        new_post = await async_post_model.create({
             "title": title,
             "content": content,
             "image_url": image_url,
+            "image_variants": variant_urls(image_url),
             "user_id": user_id,
             "author_nickname": user["nickname"],
             "author_profile_image": user["profile_image_url"],
@@ -81,7 +77,7 @@ class PostController:
                           content: str = None, image: UploadFile = None):
 
         # 게시글 찾기
-        post = post_model.find_by_id(post_id)
+        post = await async_post_model.find_by_id(post_id)
         if not post:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
         
@@ -107,55 +103,68 @@ class PostController:
         if image:
             image_url = await PostController.save_post_image(image)
             updates["image_url"] = image_url
+            updates["image_variants"] = variant_urls(image_url)
         
         # 업데이트
-        updated_post = post_model.update(post_id, updates)
+        updated_post = await async_post_model.update(post_id, updates)
         return updated_post
     
     ## 게시글 목록 조회
     @staticmethod
-    def get_posts(skip: int = 0, limit: int = 20):
-        return post_model.find_all(skip, limit)
+    async def get_posts(skip: int = 0, limit: int = 20, cursor: str = None):
+        try:
+            return await async_post_model.find_all(skip, limit, cursor)
+        except ValueError:
+            raise HTTPException(400, "잘못된 페이지 커서입니다.")
+    
+    ## 게시글 목록 ETag (잘못된 커서면 None -> get_posts 에서 400)
+    @staticmethod
+    async def get_posts_etag(skip: int = 0, limit: int = 20, cursor: str = None):
+        try:
+            return make_etag(await async_post_model.find_all_version(skip, limit, cursor))
+        except ValueError:
+            return None
+    
+    ## 게시글 검색
+    @staticmethod
+    async def search_posts(q: str, skip: int = 0, limit: int = 20):
+        if not q or not q.strip():
+            raise HTTPException(400, "검색어를 입력해주세요.")
+        return await async_post_model.search(q, skip, limit)
     
     ## 게시글 상세 조회
     @staticmethod
-    def get_post(post_id: int):
-        post = post_model.find_by_id(post_id)
+    async def get_post(post_id: int):
+        post = await async_post_model.find_by_id(post_id)
         if not post:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
         return post
     
-    ## 좋아요 추가/취소
+    ## 게시글 ETag (없으면 None -> get_post 에서 404)
     @staticmethod
-    def toggle_like(post_id: int, user_id: int):
-        from model.post import post_model
+    async def get_post_etag(post_id: int):
+        version = await async_post_model.version_of(post_id)
+        return make_etag(version) if version is not None else None
     
-        post = post_model.find_by_id(post_id)
+    ## 좋아요 추가/취소
+    @staticmethod
+    async def toggle_like(post_id: int, user_id: int):
+        post = await async_post_model.find_by_id(post_id)
         if not post:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
     
-        user = user_model.find_by_id(user_id)
+        user = await async_user_model.find_by_id(user_id)
         if not user:
             raise HTTPException(404, "사용자를 찾을 수 없습니다.")
     
-        like_users = post.get('like_users', [])
-    
-        if user_id in like_users:
-            # 좋아요 취소
-            post_model.remove_like(post_id, user_id)
-            return {"liked": False, "likes": len(like_users) - 1}
-        else:
-            # 좋아요 추가
-            post_model.add_like(post_id, user_id)
-            return {"liked": True, "likes": len(like_users) + 1}
+        liked, likes = await async_post_model.toggle_like(post_id, user_id)
+        return {"liked": liked, "likes": likes}
 
     ## 조회수
     @staticmethod
-    def increment_view(post_id: int):
+    async def increment_view(post_id: int):
 
-        from model.post import post_model
-    
-        success = post_model.increment_view_count(post_id)
+        success = await async_post_model.increment_view_count(post_id)
         if not success:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
     
@@ -163,12 +172,10 @@ class PostController:
     
     ## 게시글 삭제
     @staticmethod
-    def delete_post(post_id: int, user_id: int):
-    
-        from model.post import post_model
+    async def delete_post(post_id: int, user_id: int):
     
         # 게시글 찾기
-        post = post_model.find_by_id(post_id)
+        post = await async_post_model.find_by_id(post_id)
         if not post:
             raise HTTPException(404, "게시글을 찾을 수 없습니다.")
     
@@ -176,16 +183,10 @@ class PostController:
         if post['user_id'] != user_id:
             raise HTTPException(403, "삭제 권한이 없습니다.")
     
-        # 삭제
-        success = post_model.delete(post_id)
+        # 삭제 (댓글, 좋아요, 이미지 참조까지 함께 정리)
+        success = await async_post_model.delete(post_id)
         if not success:
             raise HTTPException(500, "게시글 삭제에 실패했습니다.")
-    
-        # 해당 게시글의 댓글도 함께 삭제 (선택사항)
-        from model.comment import comment_model
-        comments = comment_model.find_by_post_id(post_id)
-        for comment in comments:
-            comment_model.delete(comment['id'])
 
         return {"message": "게시글이 삭제되었습니다."}
 
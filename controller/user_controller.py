@@ -1,6 +1,9 @@
 from fastapi import HTTPException, UploadFile
-from model.user import user_model
-from controller.auth_controller import AuthController
+from model.user import user_model, async_user_model
+from model.index import DuplicateKeyError
+from controller.auth_controller import AuthController, DUPLICATE_MESSAGES
+from core.images import variant_urls
+from core.responses import make_etag
 
 class UserController:
 
@@ -10,7 +13,7 @@ class UserController:
                           password: str = None, profile_image: UploadFile = None):
         
         # 사용자 찾기
-        user = user_model.find_by_id(user_id)
+        user = await async_user_model.find_by_id(user_id)
         if not user:
             raise HTTPException(404, "사용자를 찾을 수 없습니다.")
         
@@ -23,10 +26,10 @@ class UserController:
             if len(nickname) > 10:
                 raise HTTPException(400, "닉네임은 10자 이하여야 합니다.")
             
-            # 닉네임 중복 체크 (자신 제외)
-            existing = user_model.find_by_nickname(nickname)
+            # 닉네임 중복 체크 (자신 제외, 최종 보장은 모델의 유니크 인덱스)
+            existing = await async_user_model.find_by_nickname(nickname)
             if existing and existing['id'] != user_id:
-                raise HTTPException(400, "이미 사용중인 닉네임입니다.")
+                raise HTTPException(400, DUPLICATE_MESSAGES["nickname"])
             
             updates["nickname"] = nickname
         
@@ -39,10 +42,14 @@ class UserController:
         if profile_image:
             profile_image_url = await AuthController.save_profile_image(profile_image)
             updates["profile_image_url"] = profile_image_url
+            updates["profile_image_variants"] = variant_urls(profile_image_url)
         
         # 업데이트
         if updates:
-            updated_user = user_model.update(user_id, updates)
+            try:
+                updated_user = await async_user_model.update(user_id, updates)
+            except DuplicateKeyError as e:
+                raise HTTPException(400, DUPLICATE_MESSAGES[e.field])
         else:
             updated_user = user
         
@@ -50,14 +57,15 @@ class UserController:
             "id": updated_user["id"],
             "email": updated_user["email"],
             "nickname": updated_user["nickname"],
-            "profile_image_url": updated_user["profile_image_url"]
+            "profile_image_url": updated_user["profile_image_url"],
+            "profile_image_variants": updated_user.get("profile_image_variants")
         }
     
     ## 사용자 정보 조회
     @staticmethod
-    def get_user(user_id: int):
+    async def get_user(user_id: int):
         """사용자 정보 조회"""
-        user = user_model.find_by_id(user_id)
+        user = await async_user_model.find_by_id(user_id)
         if not user:
             raise HTTPException(404, "사용자를 찾을 수 없습니다.")
         
@@ -66,7 +74,14 @@ class UserController:
             "email": user["email"],
             "nickname": user["nickname"],
             "profile_image_url": user["profile_image_url"],
+            "profile_image_variants": user.get("profile_image_variants"),
             "created_at": user.get("created_at")
         }
 
+    ## 사용자 정보 ETag (없으면 None -> get_user 에서 404)
+    @staticmethod
+    async def get_user_etag(user_id: int):
+        version = await async_user_model.version_of(user_id)
+        return make_etag(version) if version is not None else None
+
 user_controller = UserController()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+from pathlib import Path
+
+## 환경변수 bool 파싱
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+# 데이터 파일 위치
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+
+# 컬렉션 인메모리 캐시 사용 여부
+CACHE_ENABLED = _env_bool("CACHE_ENABLED", True)
+
+# 저장 엔진: json(파일 전체 재작성) | log(append-only 로그) | binary(mmap 바이너리 스냅샷 + 로그) | sqlite
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "json")
+
+# log 엔진: 로그가 이 크기를 넘으면 스냅샷으로 압축
+LOG_COMPACT_BYTES = int(os.getenv("LOG_COMPACT_BYTES", str(8 * 1024 * 1024)))
+
+# 조회수 등 카운터 증분 버퍼: 이 간격(초)마다 또는 쌓인 증분이 이 개수를 넘으면 저장
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "1.0"))
+COUNTER_FLUSH_THRESHOLD = int(os.getenv("COUNTER_FLUSH_THRESHOLD", "1000"))
+
+# 모델 호출을 실행하는 스레드 풀 크기 (읽기/쓰기 분리: 쓰기가 밀려도 읽기는 기다리지 않는다)
+IO_READ_WORKERS = int(os.getenv("IO_READ_WORKERS", "8"))
+IO_WRITE_WORKERS = int(os.getenv("IO_WRITE_WORKERS", "4"))
+
+# 이미지 파생본(썸네일 등)을 만드는 프로세스 풀 크기
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# /static 파일 메타데이터(stat, ETag) 캐시: 재확인 간격(초)과 최대 항목 수
+STATIC_META_TTL = float(os.getenv("STATIC_META_TTL", "2.0"))
+STATIC_CACHE_ENTRIES = int(os.getenv("STATIC_CACHE_ENTRIES", "10000"))
+
+# sqlite 엔진: 데이터베이스 파일
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH", str(DATA_DIR / "community.db")))
+
+# 목록 응답(GET /posts 등) 압축: 본문이 이 크기(바이트) 이상이고 클라이언트가 받으면 br/gzip 으로 압축
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# 게시글/댓글 컬렉션 샤드 수와 샤드 블록 크기 (sqlite 엔진에서는 쓰지 않는다)
+#  게시글은 id, 댓글은 post_id 를 SHARD_BLOCK 개 단위 구간으로 나눠 SHARDS 개 샤드에 돌아가며 배치한다
+SHARDS = int(os.getenv("SHARDS", "1"))
+SHARD_BLOCK = int(os.getenv("SHARD_BLOCK", "1000"))
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from core.config import IMAGE_WORKERS
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 가 없으면 파생본 없이 원본만 쓴다
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ROOT = Path("uploads")
+STATIC_PREFIX = "/static/"
+
+# 파생본 이름 -> 최대 변 길이(px)
+VARIANTS = {
+    "thumb": 200,
+    "medium": 800,
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+# 실행 중인 작업 (GC 방지)
+_pending = set()
+
+## 파생본 경로: abc.jpg -> abc.thumb.jpg
+def variant_path(path: Path, variant: str) -> Path:
+    return path.with_name(f"{path.stem}.{variant}{path.suffix}")
+
+## 파생본 경로 -> 원본 경로: abc.thumb.jpg -> abc.jpg
+def original_path(path: Path) -> Path:
+    return path.with_name(f"{Path(path.stem).stem}{path.suffix}")
+
+## 파생본인지 (abc.thumb.jpg)
+def is_variant(path: Path) -> bool:
+    return Path(path.stem).suffix.lstrip(".") in VARIANTS
+
+## /static URL -> uploads 아래 파일 경로
+def url_to_path(url: str) -> Path:
+    return UPLOAD_ROOT / url[len(STATIC_PREFIX):]
+
+## 원본 URL -> 파생본 URL 목록 (Pillow 가 없으면 모두 원본)
+# 파생본은 백그라운드에서 만들어지므로 아직 없거나 생성에 실패했을 수 있다.
+# 그동안 정적 서빙(core.static)이 파생본 URL 로 원본을 대신 보낸다.
+def variant_urls(url: Optional[str]) -> Optional[Dict[str, str]]:
+    if not url:
+        return None
+    urls = {}
+    for variant in VARIANTS:
+        if Image is None:
+            urls[variant] = url
+        else:
+            base, _, name = url.rpartition("/")
+            urls[variant] = f"{base}/{variant_path(Path(name), variant).name}"
+    urls["original"] = url
+    return urls
+
+## 파생본 생성 (프로세스 풀에서 실행, 이미 있으면 건너뜀)
+def generate_derivatives(path: str, overwrite: bool = False) -> int:
+    source = Path(path)
+    created = 0
+    if not overwrite and all(variant_path(source, variant).exists() for variant in VARIANTS):
+        return created
+    with Image.open(source) as original:
+        image_format = original.format
+        original = ImageOps.exif_transpose(original)
+        for variant, max_side in VARIANTS.items():
+            target = variant_path(source, variant)
+            if target.exists() and not overwrite:
+                continue
+            resized = original.copy()
+            resized.thumbnail((max_side, max_side))
+            if image_format == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+            tmp = target.with_name(f".{target.name}.tmp")
+            resized.save(tmp, format=image_format, quality=85, optimize=True)
+            os.replace(tmp, target)
+            created += 1
+    return created
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+def _log_failure(path: str, future: asyncio.Future):
+    _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("이미지 파생본 생성 실패: %s (%s)", path, future.exception())
+
+## 업로드된 이미지의 파생본 생성을 백그라운드로 예약 (기다리지 않는다)
+def schedule_derivatives(url: Optional[str]):
+    if Image is None or not url:
+        return
+    path = str(url_to_path(url))
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_executor(), generate_derivatives, path)
+    _pending.add(future)
+    future.add_done_callback(lambda f: _log_failure(path, f))
+
+## 기존 파일 전체 파생본 생성 -> 만든 파생본 수
+def backfill(directories: Iterable[Path], overwrite: bool = False) -> int:
+    if Image is None:
+        raise RuntimeError("이미지 파생본을 만들려면 Pillow 가 필요합니다.")
+    sources = [
+        str(path) for directory in directories for path in sorted(directory.rglob("*"))
+        if path.is_file() and not path.name.startswith(".") and not is_variant(path)
+    ]
+    created = 0
+    executor = _get_executor()
+    for path, future in zip(sources, [executor.submit(generate_derivatives, path, overwrite) for path in sources]):
+        try:
+            created += future.result()
+        except Exception as e:
+            logger.warning("이미지 파생본 생성 실패: %s (%s)", path, e)
+    return created
+
+## 종료 시 프로세스 풀 정리
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,221 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# 요청 지연 히스토그램 구간(초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestStats:
+    """요청 하나에서 쓴 모델 호출/파일 I/O/JSON 디코드 집계 (Server-Timing 헤더용)"""
+
+    __slots__ = ("model_calls", "model_seconds", "bytes_read", "bytes_written", "decode_seconds")
+
+    def __init__(self):
+        self.model_calls = 0
+        self.model_seconds = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.decode_seconds = 0.0
+
+# 현재 요청의 집계 (스레드 풀로 넘어간 모델 호출에도 contextvars 로 전달된다)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class Histogram:
+    """누적 구간 히스토그램 (Prometheus histogram)"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    """프로세스 전체 지표 (GET /metrics 에서 Prometheus 텍스트 형식으로 내보낸다)
+
+    워커 프로세스마다 따로 집계되므로 여러 워커로 실행하면 워커별로 수집한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (메서드, 경로 템플릿) -> 지연 히스토그램
+        self.requests: Dict[Tuple[str, str], Histogram] = {}
+        # (메서드, 경로 템플릿, 상태 코드) -> 응답 수
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        # (모델, 메서드) -> [호출 수, 누적 시간]
+        self.model_calls: Dict[Tuple[str, str], list] = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.decode_count = 0
+        self.decode_seconds = 0.0
+
+    ## 요청 완료
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            histogram = self.requests.get((method, route))
+            if histogram is None:
+                histogram = self.requests[(method, route)] = Histogram()
+            histogram.observe(seconds)
+            key = (method, route, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    ## 모델 메서드 호출
+    def observe_model_call(self, model: str, method: str, seconds: float):
+        with self._lock:
+            entry = self.model_calls.get((model, method))
+            if entry is None:
+                entry = self.model_calls[(model, method)] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+        stats = current_request.get()
+        if stats is not None:
+            stats.model_calls += 1
+            stats.model_seconds += seconds
+
+    ## 파일에서 읽은 바이트
+    def add_read(self, size: int):
+        with self._lock:
+            self.bytes_read += size
+        stats = current_request.get()
+        if stats is not None:
+            stats.bytes_read += size
+
+    ## 파일에 쓴 바이트
+    def add_written(self, size: int):
+        with self._lock:
+            self.bytes_written += size
+        stats = current_request.get()
+        if stats is not None:
+            stats.bytes_written += size
+
+    ## 저장소 JSON 디코드 시간
+    def add_decode(self, seconds: float):
+        with self._lock:
+            self.decode_count += 1
+            self.decode_seconds += seconds
+        stats = current_request.get()
+        if stats is not None:
+            stats.decode_seconds += seconds
+
+    ## Prometheus 텍스트 형식
+    def render(self, collections: Dict[str, dict]) -> str:
+        with self._lock:
+            requests = {key: (list(h.counts), h.sum, h.count) for key, h in self.requests.items()}
+            responses = dict(self.responses)
+            model_calls = {key: tuple(value) for key, value in self.model_calls.items()}
+            totals = (self.bytes_read, self.bytes_written, self.decode_count, self.decode_seconds)
+
+        lines = [
+            "# HELP http_request_duration_seconds Request latency until the response starts",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), (counts, total, count) in sorted(requests.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS, counts):
+                cumulative += bucket
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += ["# HELP http_responses_total Responses by status code", "# TYPE http_responses_total counter"]
+        for (method, route, status), count in sorted(responses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        lines += ["# HELP model_calls_total Model method calls", "# TYPE model_calls_total counter"]
+        for (model, method), (count, _) in sorted(model_calls.items()):
+            lines.append(f'model_calls_total{{model="{model}",method="{method}"}} {count}')
+        lines += ["# HELP model_call_seconds_total Time spent in model method calls (including pool wait)",
+                  "# TYPE model_call_seconds_total counter"]
+        for (model, method), (_, seconds) in sorted(model_calls.items()):
+            lines.append(f'model_call_seconds_total{{model="{model}",method="{method}"}} {seconds}')
+
+        bytes_read, bytes_written, decode_count, decode_seconds = totals
+        lines += [
+            "# HELP storage_read_bytes_total Bytes read from data and upload files",
+            "# TYPE storage_read_bytes_total counter",
+            f"storage_read_bytes_total {bytes_read}",
+            "# HELP storage_written_bytes_total Bytes written to data and upload files",
+            "# TYPE storage_written_bytes_total counter",
+            f"storage_written_bytes_total {bytes_written}",
+            "# HELP storage_json_decodes_total Storage loads that decoded JSON",
+            "# TYPE storage_json_decodes_total counter",
+            f"storage_json_decodes_total {decode_count}",
+            "# HELP storage_json_decode_seconds_total Time spent decoding stored JSON",
+            "# TYPE storage_json_decode_seconds_total counter",
+            f"storage_json_decode_seconds_total {decode_seconds}",
+        ]
+
+        for name, kind, help_text in (("hits", "counter", "Collection cache hits"),
+                                      ("misses", "counter", "Collection cache misses (reloads)"),
+                                      ("records", "gauge", "Records cached in memory")):
+            metric = f"collection_cache_{name}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for collection, stats in sorted(collections.items()):
+                lines.append(f'{metric}{{collection="{collection}"}} {stats[name]}')
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+metrics = Metrics()
+
+class MetricsMiddleware:
+    """요청별 지연/모델 호출/I/O 를 집계하고 Server-Timing 헤더를 붙이는 ASGI 미들웨어
+
+    BaseHTTPMiddleware 를 쓰지 않고 ASGI 로 바로 감싸서 요청마다 드는 비용이 작다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        responded = False
+
+        async def send_with_timing(message):
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                elapsed = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, elapsed).encode("latin-1")))
+                message = {**message, "headers": headers}
+                metrics.observe_request(scope["method"], _route_of(scope), message["status"], elapsed)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except BaseException:
+            if not responded:
+                metrics.observe_request(scope["method"], _route_of(scope), 500, time.perf_counter() - started)
+            raise
+        finally:
+            current_request.reset(token)
+
+## 경로 템플릿 (/posts/{post_id}) - 실제 경로를 쓰면 라벨 종류가 끝없이 늘어난다
+def _route_of(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _server_timing(stats: RequestStats, elapsed: float) -> str:
+    return (
+        f"total;dur={elapsed * 1000:.2f}, "
+        f'model;dur={stats.model_seconds * 1000:.2f};desc="{stats.model_calls} calls", '
+        f"decode;dur={stats.decode_seconds * 1000:.2f}, "
+        f'io;desc="read={stats.bytes_read} written={stats.bytes_written}"'
+    )
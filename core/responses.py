@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from starlette.responses import Response
+
+from core.config import RESPONSE_COMPRESS_MIN_BYTES
+from model.record import encode_record
+
+try:
+    import orjson
+except ImportError:  # orjson 이 없으면 표준 json 으로 직렬화한다
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli 가 없으면 gzip 만 쓴다
+    brotli = None
+
+# 압축 수준: 응답마다 압축하므로 크기보다 속도 쪽으로 둔다
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+## 값 -> JSON 바이트
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS, default=encode_record)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=encode_record).encode("utf-8")
+
+## Accept-Encoding -> {인코딩: q 값}
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+## 클라이언트가 받을 수 있는 압축 방식 (br > gzip, 없으면 None)
+def negotiate_encoding(header: str) -> Optional[str]:
+    if not header:
+        return None
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (("br", brotli is not None), ("gzip", True))
+    best, best_quality = None, 0.0
+    for name, available in candidates:
+        quality = accepted.get(name, wildcard)
+        if available and quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+## 본문 압축
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+## 응답 버전 값 -> ETag (압축 여부와 관계없이 같은 값이라 약한 ETag)
+def make_etag(version: Any) -> str:
+    return f'W/"{hashlib.blake2b(repr(version).encode(), digest_size=12).hexdigest()}"'
+
+## If-None-Match 가 ETag 와 맞으면 304 응답 (본문을 만들거나 인코딩하지 않는다), 아니면 None
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+    return None
+
+## 목록 응답: 한 번만 직렬화하고 클라이언트가 받으면 압축한다
+##  라우트에서 Response 를 바로 돌려주면 FastAPI 가 값을 다시 변환/검증하지 않는다.
+##  RESPONSE_COMPRESS_MIN_BYTES 보다 작은 본문은 압축 이득보다 비용이 커서 그대로 보낸다.
+def json_response(request: Request, content: Any, status_code: int = 200, etag: Optional[str] = None) -> Response:
+    body = dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    if etag is not None:
+        headers["ETag"] = etag
+    if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding is not None:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,271 @@
+import hashlib
+import mimetypes
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+
+from core.config import STATIC_META_TTL, STATIC_CACHE_ENTRIES
+from core.images import is_variant, original_path
+from core.metrics import metrics
+
+CHUNK_SIZE = 64 * 1024
+
+# 내용 해시로 이름이 정해지는 원본은 바뀌지 않으므로 영구 캐시
+# (파생본 abc.thumb.jpg 는 backfill-images --overwrite 로 다시 써질 수 있어 제외)
+IMMUTABLE_PREFIX = "sha256/"
+
+# 디렉터리별 Cache-Control (앞에서부터 먼저 맞는 것, 파생본은 VARIANT_CACHE_CONTROL)
+CACHE_CONTROL = (
+    ("sha256/", "public, max-age=31536000, immutable"),
+    ("post_images/", "public, max-age=86400"),
+    ("profile_images/", "public, max-age=3600"),
+    ("", "no-cache"),
+)
+
+# 파생본은 다시 만들어질 수 있으므로 짧게
+VARIANT_CACHE_CONTROL = "public, max-age=600"
+
+# 파생본이 아직 없어 원본을 대신 보낼 때 (만들어지면 바로 바뀌도록 매번 재검증)
+FALLBACK_CACHE_CONTROL = "no-cache"
+
+class FileMeta(NamedTuple):
+    path: str
+    size: int
+    etag: str
+    headers: Tuple[Tuple[bytes, bytes], ...]
+    identity: Tuple[int, int, int]
+    checked_at: float
+    immutable: bool
+
+
+class UploadStaticFiles:
+    """uploads 정적 파일 서빙 ASGI 앱
+
+    - 강한 ETag (내용 해시, 내용 주소 원본은 파일 이름) 와 디렉터리별 Cache-Control
+    - If-None-Match 가 맞으면 파일을 열지 않고 304
+    - 단일 바이트 범위(Range) 요청은 206
+    - 서버가 http.response.zerocopysend 확장을 지원하면 sendfile 로 전송
+    - 파생본(abc.thumb.jpg)이 아직 없거나 생성에 실패했으면 원본을 대신 보낸다
+    - 파일 메타데이터는 캐시해서 자주 쓰는 파일은 매번 stat 하지 않는다
+      (내용 주소 파일은 재확인하지 않고, 나머지는 STATIC_META_TTL 마다 재확인)
+    """
+
+    def __init__(self, directory: str, meta_ttl: float = STATIC_META_TTL,
+                 max_entries: int = STATIC_CACHE_ENTRIES):
+        self.directory = os.path.realpath(directory)
+        self.meta_ttl = meta_ttl
+        self.max_entries = max_entries
+        self._meta: "OrderedDict[str, FileMeta]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await _send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        relative = self._relative_path(scope)
+        meta = self._cached(relative)
+        if meta is None:
+            meta = await anyio.to_thread.run_sync(self._lookup, relative)
+        if meta is None:
+            await _send_empty(send, 404)
+            return
+
+        request_headers = Headers(scope=scope)
+        if _etag_matches(request_headers.get("if-none-match"), meta.etag):
+            await _send_empty(send, 304, [h for h in meta.headers if h[0] != b"content-type"])
+            return
+
+        byte_range = _parse_range(request_headers, meta)
+        if byte_range == "unsatisfiable":
+            await _send_empty(send, 416, [(b"content-range", f"bytes */{meta.size}".encode())])
+            return
+
+        if byte_range is None:
+            status, start, length = 200, 0, meta.size
+            headers = list(meta.headers)
+        else:
+            start, end = byte_range
+            status, length = 206, end - start + 1
+            headers = list(meta.headers) + [
+                (b"content-range", f"bytes {start}-{end}/{meta.size}".encode())
+            ]
+        headers.append((b"content-length", str(length).encode()))
+
+        try:
+            f = await anyio.to_thread.run_sync(open, meta.path, "rb")
+        except FileNotFoundError:
+            # 캐시된 사이에 지워진 파일 (업로드 GC 등)
+            self._evict(relative)
+            await _send_empty(send, 404)
+            return
+
+        try:
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+            elif "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": start, "count": length})
+            else:
+                await _send_file(send, f, start, length)
+            if scope["method"] != "HEAD":
+                metrics.add_read(length)
+        finally:
+            f.close()
+
+    ## 마운트 경로를 뺀 상대 경로
+    @staticmethod
+    def _relative_path(scope) -> str:
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return path.lstrip("/")
+
+    ## 캐시된 메타데이터 (재확인이 필요하면 None)
+    def _cached(self, relative: str) -> Optional[FileMeta]:
+        with self._lock:
+            meta = self._meta.get(relative)
+            if meta is None:
+                return None
+            if not meta.immutable and time.monotonic() - meta.checked_at > self.meta_ttl:
+                return None
+            self._meta.move_to_end(relative)
+            return meta
+
+    def _evict(self, relative: str):
+        with self._lock:
+            self._meta.pop(relative, None)
+
+    ## 파일 확인 + 메타데이터 계산 (스레드에서 실행)
+    def _lookup(self, relative: str) -> Optional[FileMeta]:
+        full_path = os.path.realpath(os.path.join(self.directory, relative))
+        if os.path.commonpath([full_path, self.directory]) != self.directory:
+            return None
+        stat_result = _stat(full_path)
+        variant = is_variant(Path(relative))
+        fallback = stat_result is None and variant
+        if fallback:
+            full_path = str(original_path(Path(full_path)))
+            stat_result = _stat(full_path)
+        if stat_result is None:
+            self._evict(relative)
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        identity = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            previous = self._meta.get(relative)
+        immutable = relative.startswith(IMMUTABLE_PREFIX) and not variant
+        if previous is not None and previous.identity == identity:
+            etag = previous.etag
+        elif immutable:
+            # 파일 이름이 곧 내용 해시
+            etag = f'"{Path(relative).name}"'
+        else:
+            etag = f'"{_hash_file(full_path)}"'
+
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        if fallback:
+            cache_control = FALLBACK_CACHE_CONTROL
+        elif variant:
+            cache_control = VARIANT_CACHE_CONTROL
+        else:
+            cache_control = next(value for prefix, value in CACHE_CONTROL if relative.startswith(prefix))
+        headers = (
+            (b"content-type", content_type.encode()),
+            (b"etag", etag.encode()),
+            (b"cache-control", cache_control.encode()),
+            (b"last-modified", formatdate(stat_result.st_mtime, usegmt=True).encode()),
+            (b"accept-ranges", b"bytes"),
+        )
+        meta = FileMeta(full_path, stat_result.st_size, etag, headers, identity,
+                        time.monotonic(), immutable)
+        with self._lock:
+            self._meta[relative] = meta
+            self._meta.move_to_end(relative)
+            while len(self._meta) > self.max_entries:
+                self._meta.popitem(last=False)
+        return meta
+
+
+## stat (없거나 잘못된 경로면 None)
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+## 파일 내용 해시 (ETag)
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+## If-None-Match 비교 (약한 비교)
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+## Range 헤더 -> (시작, 끝) / None(전체) / "unsatisfiable"
+def _parse_range(headers: Headers, meta: FileMeta):
+    value = headers.get("range")
+    if not value or not value.startswith("bytes="):
+        return None
+    # If-Range 가 현재 ETag 와 다르면 전체를 보낸다
+    if_range = headers.get("if-range")
+    if if_range and if_range.strip() != meta.etag:
+        return None
+    spec = value[len("bytes="):].strip()
+    if "," in spec:
+        # 여러 범위는 지원하지 않고 전체를 보낸다
+        return None
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if not start_text:
+            suffix = int(end_text)
+            if suffix <= 0:
+                return "unsatisfiable"
+            start, end = max(meta.size - suffix, 0), meta.size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else meta.size - 1
+    except ValueError:
+        return None
+    end = min(end, meta.size - 1)
+    if start > end or start >= meta.size:
+        return "unsatisfiable"
+    return start, end
+
+async def _send_empty(send, status: int, headers=()):
+    await send({"type": "http.response.start", "status": status,
+                "headers": list(headers) + [(b"content-length", b"0")]})
+    await send({"type": "http.response.body", "body": b""})
+
+## 청크 단위 전송 (zerocopysend 를 못 쓸 때)
+async def _send_file(send, f, start: int, length: int):
+    await anyio.to_thread.run_sync(f.seek, start)
+    remaining = length
+    while remaining > 0:
+        chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+    if remaining > 0:
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,79 @@
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from model.blob import blob_model, BLOB_PREFIX
+from core.images import UPLOAD_ROOT
+from core.metrics import metrics
+
+# 업로드 중인 임시 파일 (최종 위치와 같은 파일시스템이어야 rename 이 원자적이다)
+UPLOAD_TMP_DIR = UPLOAD_ROOT / ".tmp"
+UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+CHUNK_SIZE = 64 * 1024
+
+# 이미지 형식별 매직 바이트
+IMAGE_SIGNATURES = {
+    "jpeg": b"\xff\xd8\xff",
+    "png": b"\x89PNG\r\n\x1a\n",
+}
+
+# 이미지 형식별 저장 확장자 (같은 내용이면 확장자도 같아야 한 파일로 합쳐진다)
+FORMAT_EXTENSIONS = {
+    "jpeg": ".jpg",
+    "png": ".png",
+}
+
+## 첫 청크의 매직 바이트로 이미지 형식 판별
+def detect_image_format(head: bytes) -> Optional[str]:
+    for image_format, signature in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return image_format
+    return None
+
+## 청크 쓰기 + 해시 갱신
+def _write_chunk(f, hasher, chunk: bytes):
+    f.write(chunk)
+    hasher.update(chunk)
+
+## 업로드를 청크 단위로 임시 파일에 받은 뒤 내용 해시 경로로 원자적 이동 -> /static URL
+async def save_upload(upload: UploadFile, max_bytes: int, image_format: str, format_message: str) -> str:
+    size_message = f"파일 크기는 {max_bytes // (1024 * 1024)}MB 이하여야 합니다."
+    # 크기를 이미 알면 읽기 전에 거절
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(400, size_message)
+
+    tmp_path = UPLOAD_TMP_DIR / f"{uuid.uuid4().hex}.part"
+    f = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        size = 0
+        head = b""
+        hasher = hashlib.sha256()
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(head) < 8:
+                head += chunk[:8 - len(head)]
+                if len(head) >= 8 and detect_image_format(head) != image_format:
+                    raise HTTPException(400, format_message)
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(400, size_message)
+            await run_in_threadpool(_write_chunk, f, hasher, chunk)
+        if detect_image_format(head) != image_format:
+            raise HTTPException(400, format_message)
+        await run_in_threadpool(f.close)
+        metrics.add_written(size)
+
+        # uploads/sha256/ab/cd/<sha256>.<ext> - 같은 내용은 한 파일만 남는다
+        digest = hasher.hexdigest()
+        relative_path = Path(BLOB_PREFIX, digest[:2], digest[2:4], digest + FORMAT_EXTENSIONS[image_format])
+        # 참조를 하나 잡은 채로 돌려준다 (이 URL 을 저장하는 모델이 넘겨받는다)
+        return await run_in_threadpool(blob_model.store, tmp_path, relative_path)
+    finally:
+        f.close()
+        tmp_path.unlink(missing_ok=True)
@@ -1,11 +1,52 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from route import auth, post, user, comment
+from model.collection import cache_stats
+from model.counter import flush_all as flush_counters
+from model.post import async_post_model
+from model.aio import run_write
+from core.config import COUNTER_FLUSH_INTERVAL
+from core import images
+from core.static import UploadStaticFiles
+from core.metrics import MetricsMiddleware, metrics
+from controller.auth_controller import DEFAULT_PROFILE_IMAGE_URL
 
-app = FastAPI(title="Community API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+## 카운터 버퍼 주기적 저장
+async def flush_counters_periodically():
+    while True:
+        await asyncio.sleep(COUNTER_FLUSH_INTERVAL)
+        try:
+            await run_write(flush_counters)
+        except Exception:
+            # 저장하지 못한 증분은 버퍼에 남아 있으므로 다음 주기에 다시 저장한다
+            logger.exception("카운터 저장 실패")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 예전 게시글 레코드의 like_users 를 좋아요 저장소로 이전
+    await async_post_model.migrate_like_users()
+    # 기본 프로필 이미지 파생본 (이미 있으면 건너뜀)
+    images.schedule_derivatives(DEFAULT_PROFILE_IMAGE_URL)
+    flusher = asyncio.create_task(flush_counters_periodically())
+    yield
+    flusher.cancel()
+    # 종료 시 대기 중인 카운터와 검색 색인 저장
+    await run_write(flush_counters)
+    await async_post_model.save_search_index()
+    images.shutdown()
+
+app = FastAPI(title="Community API", version="1.0.0", lifespan=lifespan)
+
+# 요청별 지연/모델 호출/I/O 집계 + Server-Timing 헤더
+app.add_middleware(MetricsMiddleware)
 
 # 정적 파일 서빙
-app.mount("/static", StaticFiles(directory="uploads"), name="static")
+app.mount("/static", UploadStaticFiles(directory="uploads"), name="static")
 
 # 라우터 등록
 app.include_router(auth.router)
@@ -19,4 +60,14 @@ async def root():
         "message": "Community API Server",
         "version": "1.0.0",
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+## 컬렉션 캐시 적중 통계
+@app.get("/stats/cache")
+async def get_cache_stats():
+    return cache_stats()
+
+## Prometheus 지표
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(cache_stats()), media_type="text/plain; version=0.0.4")
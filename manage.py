@@ -0,0 +1,112 @@
+import argparse
+
+from core import images
+
+## 기존 업로드 이미지 파생본 생성 + 레코드에 파생본 URL 채우기
+def backfill_images(args):
+    from model.post import post_model
+    from model.user import user_model
+
+    created = images.backfill(
+        [images.UPLOAD_ROOT / "post_images", images.UPLOAD_ROOT / "profile_images",
+         images.UPLOAD_ROOT / "sha256"],
+        overwrite=args.overwrite
+    )
+    post_model.collection.update_many({
+        post["id"]: {"image_variants": images.variant_urls(post["image_url"])}
+        for post in post_model.collection.all() if post.get("image_url")
+    })
+    user_model.collection.update_many({
+        user["id"]: {"profile_image_variants": images.variant_urls(user["profile_image_url"])}
+        for user in user_model.collection.all() if user.get("profile_image_url")
+    })
+    images.shutdown()
+    print(f"파생본 {created}개 생성")
+
+## 어떤 게시글/사용자도 참조하지 않는 업로드 파일 정리
+def gc_uploads(args):
+    from model.blob import blob_model
+
+    removed = blob_model.collect_garbage(min_age=args.min_age)
+    print(f"파일 {removed}개 삭제")
+
+## 블롭 참조 카운트를 게시글/댓글/사용자가 실제로 가진 URL 수로 다시 맞추기 (서버를 멈추고 실행)
+def recount_blobs(args):
+    from model.blob import blob_model
+    from model.comment import comment_model
+    from model.post import post_model
+    from model.user import user_model
+
+    urls = [user.get("profile_image_url") for user in user_model.collection.all()]
+    for post in post_model.collection.all():
+        urls += [post.get("image_url"), post.get("author_profile_image")]
+    urls += [comment.get("author_profile_image") for comment in comment_model.collection.all()]
+    changed = blob_model.recount(urls)
+    print(f"참조 기록 {changed}개 수정")
+
+## data/*.json (또는 log/binary 엔진 데이터)를 SQLite 로 옮기기
+def migrate_sqlite(args):
+    from itertools import chain, islice
+    from core.config import DATA_DIR
+    from model.shard import read_layout, shard_names
+    from model.storage import BinaryStorage, LogStorage, SqliteStorage, iter_json_array
+
+    ## 한 저장소 파일의 레코드 (없으면 None)
+    def source_records(source: str):
+        binary_paths = [DATA_DIR / f"{source}.bin", DATA_DIR / f"{source}.bin.log",
+                        DATA_DIR / f"{source}.bin.log.compacting"]
+        if any(path.exists() for path in binary_paths):
+            # 바이너리 스냅샷 + 로그 (레코드는 꺼낼 때 디코드된다)
+            return iter(BinaryStorage(source).load().values())
+        log_paths = [DATA_DIR / f"{source}.log", DATA_DIR / f"{source}.log.compacting"]
+        if any(path.exists() for path in log_paths):
+            # 로그는 재생해야 최종 상태를 알 수 있다
+            return iter(LogStorage(source).load())
+        if (DATA_DIR / f"{source}.json").exists():
+            return iter_json_array(DATA_DIR / f"{source}.json")
+        return None
+
+    for name in ("users", "posts", "comments", "blobs"):
+        # 샤드로 나뉜 컬렉션은 모든 샤드 파일을 합친다
+        sources = [source_records(source) for source in shard_names(name, read_layout(name)["count"])]
+        sources = [records for records in sources if records is not None]
+        if not sources:
+            continue
+        records = chain.from_iterable(sources)
+        target = SqliteStorage(name)
+        count = 0
+        while True:
+            batch = list(islice(records, args.batch_size))
+            if not batch:
+                break
+            target.upsert_many(batch)
+            count += len(batch)
+        # 실행 중인 워커가 있으면 다음 접근 때 다시 읽도록 알린다
+        with target.lock():
+            target.generation.bump()
+        print(f"{name}: {count}개 이전")
+
+def main():
+    parser = argparse.ArgumentParser(description="Community API 관리 명령")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-images", help="기존 이미지의 썸네일/중간 크기 파생본 생성")
+    backfill.add_argument("--overwrite", action="store_true", help="이미 있는 파생본도 다시 생성")
+    backfill.set_defaults(func=backfill_images)
+
+    gc = commands.add_parser("gc-uploads", help="참조되지 않는 내용 주소 업로드 파일 삭제")
+    gc.add_argument("--min-age", type=float, default=3600, help="이 시간(초)보다 오래된 파일만 삭제")
+    gc.set_defaults(func=gc_uploads)
+
+    recount = commands.add_parser("recount-blobs", help="업로드 파일 참조 카운트를 레코드 기준으로 다시 계산")
+    recount.set_defaults(func=recount_blobs)
+
+    migrate = commands.add_parser("migrate-sqlite", help="JSON 데이터를 SQLite(STORAGE_ENGINE=sqlite)로 이전")
+    migrate.add_argument("--batch-size", type=int, default=1000, help="트랜잭션 하나에 넣을 레코드 수")
+    migrate.set_defaults(func=migrate_sqlite)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from typing import Iterable
+
+from core.config import IO_READ_WORKERS, IO_WRITE_WORKERS
+from core.metrics import metrics
+
+# 파일 I/O 와 JSON 인코딩을 이벤트 루프 밖에서 돌리는 스레드 풀
+read_executor = ThreadPoolExecutor(max_workers=IO_READ_WORKERS, thread_name_prefix="model-read")
+write_executor = ThreadPoolExecutor(max_workers=IO_WRITE_WORKERS, thread_name_prefix="model-write")
+
+## 읽기 풀에서 실행 (요청 집계 등 contextvars 를 그대로 넘긴다)
+async def run_read(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(read_executor, partial(copy_context().run, func, *args, **kwargs))
+
+## 쓰기 풀에서 실행
+async def run_write(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(write_executor, partial(copy_context().run, func, *args, **kwargs))
+
+class AsyncModel:
+    """모델의 공개 메서드를 스레드 풀에서 실행하는 비동기 프록시
+
+    writes 에 있는 메서드는 쓰기 풀, 나머지는 읽기 풀에서 실행된다.
+    """
+
+    def __init__(self, model, writes: Iterable[str] = ()):
+        self._model = model
+        self._writes = frozenset(writes)
+        # 지표 라벨 (PostModel -> post)
+        self._name = type(model).__name__.lower().removesuffix("model")
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._model, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        run = run_write if name in self._writes else run_read
+
+        model_name = self._name
+
+        async def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await run(attr, *args, **kwargs)
+            finally:
+                metrics.observe_model_call(model_name, name, time.perf_counter() - started)
+
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
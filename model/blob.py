@@ -0,0 +1,130 @@
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+
+from model.collection import Collection
+from model.index import UniqueIndex
+from core.images import UPLOAD_ROOT, VARIANTS, variant_path, is_variant
+
+# 내용 해시로 저장되는 업로드 (uploads/sha256/ab/cd/<sha256>.<ext>)
+BLOB_PREFIX = "sha256"
+BLOB_URL_PREFIX = f"/static/{BLOB_PREFIX}/"
+
+class BlobModel:
+    """내용 주소 업로드 파일의 참조 카운트
+
+    같은 내용은 한 파일만 저장하고, 게시글/사용자가 참조를 잃어
+    카운트가 0이 되면 파일(파생본 포함)을 지운다. 업로드(store)가 참조를 잡고,
+    그 URL 을 저장한 레코드가 참조를 넘겨받는다 (저장하지 못하면 release 로 돌려준다).
+    게시글/댓글에 복사해 둔 작성자 프로필 이미지(author_profile_image)도 복사본마다 참조를 잡는다.
+    """
+
+    def __init__(self):
+        self.collection = Collection("blobs")
+        self.collection.add_index(UniqueIndex("url"))
+        # 파일 배치/삭제와 참조 카운트 변경을 직렬화 (저장소 파일 잠금이라 다른 워커와도 직렬화된다)
+        self._lock = self.collection.storage.lock
+
+    ## 내용 주소 업로드인지 (기존 uuid 파일명, 기본 이미지는 추적하지 않음)
+    @staticmethod
+    def is_blob_url(url: Optional[str]) -> bool:
+        return bool(url) and url.startswith(BLOB_URL_PREFIX)
+
+    ## URL -> 파일 경로
+    @staticmethod
+    def path_of(url: str) -> Path:
+        return UPLOAD_ROOT / url[len("/static/"):]
+
+    ## 임시 파일을 해시 경로로 옮기고 참조 하나 잡기 -> /static URL
+    ## (같은 내용이 있으면 덮어써도 결과는 같다. 잡은 참조는 이 URL 을 저장한 레코드가 넘겨받는다)
+    def store(self, tmp_path: Path, relative_path: Path) -> str:
+        target = UPLOAD_ROOT / relative_path
+        url = f"/static/{relative_path.as_posix()}"
+        with self._lock():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+            self.acquire(url)
+        return url
+
+    ## 참조 추가
+    def acquire(self, url: Optional[str]):
+        if not self.is_blob_url(url):
+            return
+        with self._lock():
+            blob = self.collection.find_one("url", url)
+            if blob:
+                self.collection.update(blob["id"], {"refs": blob["refs"] + 1})
+            else:
+                self.collection.insert({"url": url, "refs": 1})
+
+    ## 참조 해제 (0이 되면 파일 삭제, 참조 기록이 없는 파일은 collect_garbage 가 정리)
+    def release(self, url: Optional[str]):
+        self.release_many([url])
+
+    ## 참조 여러 개 해제 (같은 URL 은 나온 수만큼, 저장소 쓰기는 수정/삭제 한 번씩)
+    def release_many(self, urls: Iterable[Optional[str]]):
+        counts = Counter(url for url in urls if self.is_blob_url(url))
+        if not counts:
+            return
+        with self._lock():
+            updates, removed = {}, []
+            for url, count in counts.items():
+                blob = self.collection.find_one("url", url)
+                if blob is None:
+                    continue
+                if blob["refs"] > count:
+                    updates[blob["id"]] = {"refs": blob["refs"] - count}
+                else:
+                    removed.append(blob)
+            if updates:
+                self.collection.update_many(updates)
+            if removed:
+                self.collection.delete_many([blob["id"] for blob in removed])
+                for blob in removed:
+                    self._remove_files(self.path_of(blob["url"]))
+
+    ## 참조 카운트를 레코드들이 실제로 가진 URL 수로 다시 맞추기 (서버를 멈추고 실행) -> 바꾼 기록 수
+    ## 참조가 0이 된 파일은 지우지 않고 collect_garbage 에 맡긴다
+    def recount(self, urls: Iterable[Optional[str]]) -> int:
+        counts = Counter(url for url in urls if self.is_blob_url(url))
+        with self._lock():
+            blobs = {blob["url"]: blob for blob in self.collection.all()}
+            updates = {
+                blob["id"]: {"refs": counts[url]}
+                for url, blob in blobs.items() if url in counts and blob["refs"] != counts[url]
+            }
+            stale = [blob["id"] for url, blob in blobs.items() if url not in counts]
+            missing = [url for url in counts if url not in blobs]
+            if updates:
+                self.collection.update_many(updates)
+            if stale:
+                self.collection.delete_many(stale)
+            for url in missing:
+                self.collection.insert({"url": url, "refs": counts[url]})
+        return len(updates) + len(stale) + len(missing)
+
+    @staticmethod
+    def _remove_files(path: Path):
+        for target in [path] + [variant_path(path, variant) for variant in VARIANTS]:
+            target.unlink(missing_ok=True)
+
+    ## 어떤 레코드도 참조하지 않는 파일 정리 (업로드 후 저장에 실패한 경우 등) -> 지운 파일 수
+    def collect_garbage(self, min_age: float = 3600) -> int:
+        removed = 0
+        cutoff = time.time() - min_age
+        for path in (UPLOAD_ROOT / BLOB_PREFIX).rglob("*"):
+            if not path.is_file() or path.stat().st_mtime > cutoff:
+                continue
+            original = path
+            if is_variant(path):
+                original = path.with_name(Path(path.stem).stem + path.suffix)
+            url = "/static/" + original.relative_to(UPLOAD_ROOT).as_posix()
+            with self._lock():
+                if self.collection.find_one("url", url) is None:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+blob_model = BlobModel()
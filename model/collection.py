@@ -0,0 +1,492 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, MutableMapping, Optional, Tuple, Type, Union
+
+from core.config import CACHE_ENABLED
+from core.metrics import metrics
+from model.cow import ChunkedMap
+from model.record import Record, as_dict, convert
+from model.storage import SqliteStorage, create_storage
+from model.snapshot import LazyRecords
+from model.index import DuplicateKeyError, UniqueIndex, GroupIndex, SortedIndex, sql_index
+from model.search import TextIndex
+
+# 이름 -> 컬렉션 (캐시 통계 조회용)
+collections: Dict[str, "Collection"] = {}
+
+Index = Union[UniqueIndex, GroupIndex, SortedIndex, TextIndex]
+
+class Snapshot:
+    """컬렉션의 한 버전 (레코드 + 보조 인덱스)
+
+    발행된 스냅샷의 레코드와 인덱스는 다시 바뀌지 않으므로 잠금 없이 읽는다.
+    쓰기는 fork() 로 구조를 공유하는 다음 버전(초안)을 만들어 바꾸고, 저장이 끝나면 통째로 교체한다.
+    인덱스, 최대 id, 최대 버전은 처음 필요할 때 채운다.
+    """
+
+    __slots__ = ("generation", "records", "indexes", "max_id", "max_version", "version", "base")
+
+    def __init__(self, generation: Optional[int], records: MutableMapping[int, dict],
+                 indexes: Optional[Dict[str, Index]] = None,
+                 max_id: Optional[int] = None, max_version: Optional[int] = None):
+        self.generation = generation
+        self.records = records
+        self.indexes = indexes
+        self.max_id = max_id
+        self.max_version = max_version
+        # 초안에서 바뀐 레코드에 붙일 버전 (None 이면 아직 바꾼 것이 없다)
+        self.version: Optional[int] = None
+        # 초안의 원본 스냅샷
+        self.base: Optional["Snapshot"] = None
+
+    ## 다음 버전 초안 (레코드는 바꾸는 버킷만 복사, 인덱스는 바꿀 때 fork)
+    def fork(self) -> "Snapshot":
+        draft = Snapshot(None, self.records.fork(), self.indexes, self.max_id, self.max_version)
+        draft.base = self
+        return draft
+
+
+class Collection:
+    """저장 엔진 위의 write-through 인메모리 캐시 (다중 버전)
+
+    메모리 상태는 Snapshot 단위로 바뀐다. 읽기는 현재 스냅샷 하나만 보고 잠금을 잡지 않으므로
+    쓰기가 길어도 기다리지 않고, 쓰다 만 상태도 보지 않는다. 쓰기는 현재 스냅샷을 fork 한 초안을 바꾸고
+    저장소에 반영한 뒤 세대 번호를 올리면서 초안을 현재 스냅샷으로 교체한다. 레코드는 수정 시 새 레코드로
+    교체(copy-on-write)되고 발행된 버전은 바뀌지 않으므로, 반환된 레코드는 이후 쓰기와 관계없이
+    그대로 직렬화해도 된다 (반환된 레코드를 수정하면 안 된다).
+
+    저장소의 세대 번호(워커들이 공유하는 mmap 카운터)가 바뀌면 다음 접근 때 다시 읽는다.
+    쓰기 구간에서 바뀐 레코드에는 그 구간의 버전(올라갈 세대 번호, 레코드마다 단조 증가)이
+    "version" 필드로 저장되므로 조건부 요청(ETag)은 본문 없이 버전만 비교하면 된다.
+    보조 인덱스는 로드 때가 아니라 처음 필요할 때 만들므로 id 조회만 하는 동안에는
+    지연 로드 저장소(binary 엔진)의 레코드를 모두 디코드하지 않는다.
+
+    쓰기끼리는 _write_lock 으로 직렬화되고, 여러 워커 프로세스가 같은 저장소를 쓰는 경우
+    쓰기 구간은 저장소 파일 잠금으로도 감싼다. 잠금을 잡은 뒤 저장소를 다시 확인하므로
+    다른 워커의 쓰기를 덮어쓰지 않는다. _load_lock 은 저장소 다시 읽기, 인덱스 만들기, 발행만 감싼다.
+
+    sqlite 엔진에서는 컬럼이 있는 필드의 인덱스를 SQL 인덱스(model.index.sql_index)로 바꿔 등록하고,
+    스냅샷 레코드는 테이블 위의 지연 매핑이다. 메모리 인덱스(전문 검색)는 다시 읽을 때
+    저장소의 변경 기록으로 바뀐 레코드만 다시 색인한다.
+
+    record_type(model.record)을 주면 메모리에는 dict 대신 그 __slots__ 레코드로 들고 있는다.
+    저장소는 그대로 dict/JSON 으로 읽고 쓰며, 로드할 때와 쓸 때 레코드 타입으로 바꾼다.
+    """
+
+    def __init__(self, name: str, cache_enabled: bool = CACHE_ENABLED,
+                 record_type: Optional[Type[Record]] = None):
+        self.name = name
+        self.record_type = record_type
+        self.storage = create_storage(name)
+        self.db_path = self.storage.path
+        self.cache_enabled = cache_enabled
+        self.hits = 0
+        self.misses = 0
+        self._snapshot: Optional[Snapshot] = None
+        # 가장 최근에 만든 인덱스 (다시 읽은 버전의 인덱스를 만들 때 바뀐 문서만 다시 색인한다)
+        self._index_base: Dict[str, Index] = {}
+        # _index_base 가 반영한 sqlite 변경 기록 번호 (None 이면 모든 레코드로 다시 만든다)
+        self._index_seq: Optional[int] = None
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # 필드 -> 등록된 인덱스 (비어 있는 원형, 버전마다 fork 해서 채운다)
+        self.indexes: Dict[str, Index] = {}
+        collections[name] = self
+
+    ## 보조 인덱스 등록 (로드/쓰기 때마다 함께 갱신된다)
+    def add_index(self, index: Index):
+        if isinstance(self.storage, SqliteStorage):
+            index = sql_index(index, self.storage)
+        with self._write_lock, self._load_lock:
+            self.indexes[index.field] = index
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.indexes is not None:
+                built = index.fork()
+                built.rebuild(snapshot.records.values())
+                indexes = {**snapshot.indexes, index.field: built}
+                self._snapshot = Snapshot(snapshot.generation, snapshot.records, indexes,
+                                          snapshot.max_id, snapshot.max_version)
+                self._index_base = indexes
+
+    ## 현재 스냅샷 (캐시가 유효하면 잠금 없이 그대로 사용)
+    def _current(self) -> Snapshot:
+        snapshot = self._snapshot
+        if self.cache_enabled and snapshot is not None and snapshot.generation == self.storage.generation.value():
+            self.hits += 1
+            return snapshot
+        return self._reload()
+
+    ## 저장소를 다시 읽어 새 스냅샷으로 교체
+    def _reload(self) -> Snapshot:
+        with self._load_lock:
+            # 세대 번호를 먼저 읽어야 로드 도중 커밋된 쓰기를 다음 접근에서 놓치지 않는다
+            generation = self.storage.generation.value()
+            snapshot = self._snapshot
+            if self.cache_enabled and snapshot is not None and snapshot.generation == generation:
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            started = time.perf_counter()
+            loaded = self.storage.load()
+            record_type = self.record_type
+            if isinstance(loaded, LazyRecords):
+                if record_type is not None:
+                    loaded.convert(record_type.from_dict)
+            elif record_type is not None:
+                loaded = ChunkedMap((record["id"], record_type.from_dict(record)) for record in loaded)
+            else:
+                loaded = ChunkedMap((record["id"], record) for record in loaded)
+            metrics.add_decode(time.perf_counter() - started)
+            snapshot = Snapshot(generation, loaded)
+            self._snapshot = snapshot
+            return snapshot
+
+    ## 스냅샷의 보조 인덱스 (없으면 만든다)
+    def _indexes(self, snapshot: Snapshot) -> Dict[str, Index]:
+        indexes = snapshot.indexes
+        if indexes is not None:
+            return indexes
+        with self._load_lock:
+            if snapshot.indexes is None:
+                seq, changed = self._changed_since_index(snapshot)
+                indexes = {}
+                for field, index in self.indexes.items():
+                    base = self._index_base.get(field)
+                    index = (base or index).fork()
+                    if base is not None and changed is not None and isinstance(index, TextIndex):
+                        self._apply_changes(index, snapshot.records, changed)
+                    else:
+                        index.rebuild(snapshot.records.values())
+                    indexes[field] = index
+                snapshot.indexes = indexes
+                self._index_base = indexes
+                self._index_seq = seq
+            return snapshot.indexes
+
+    ## sqlite 변경 기록 -> (현재 번호, _index_base 이후 바뀐 id) (다른 엔진이거나 알 수 없으면 바뀐 id 는 None)
+    def _changed_since_index(self, snapshot: Snapshot) -> Tuple[Optional[int], Optional[List[int]]]:
+        if not isinstance(self.storage, SqliteStorage):
+            return None, None
+        # 번호를 먼저 읽는다 (그 뒤의 변경은 다음에 다시 반영해도 결과가 같다)
+        seq = self.storage.change_seq()
+        if self._index_seq is None:
+            return seq, None
+        return seq, self.storage.changed_ids(self._index_seq)
+
+    ## 바뀐 id 만 전문 검색 인덱스에 다시 반영 (add 는 이미 있는 문서를 다시 색인한다)
+    @staticmethod
+    def _apply_changes(index: TextIndex, records: MutableMapping[int, dict], changed: List[int]):
+        for record_id in changed:
+            record = records.get(record_id)
+            if record is None:
+                index.remove({"id": record_id})
+            else:
+                index.add(record)
+
+    ## 스냅샷의 가장 큰 id
+    def _max_id(self, snapshot: Snapshot) -> int:
+        if snapshot.max_id is None:
+            snapshot.max_id = max(snapshot.records, default=0)
+        return snapshot.max_id
+
+    ## 스냅샷에 저장된 레코드 버전 중 최댓값
+    def _max_version(self, snapshot: Snapshot) -> int:
+        if snapshot.max_version is None:
+            records = snapshot.records
+            if isinstance(records, LazyRecords):
+                snapshot.max_version = records.max_version()
+            else:
+                snapshot.max_version = max((record.get("version", 0) for record in records.values()), default=0)
+        return snapshot.max_version
+
+    ## 쓰기 구간 -> 초안 (저장이 끝나면 발행, 실패하면 버리고 다음 접근에서 다시 읽는다)
+    ## (published: 저장이 끝난 뒤 새 스냅샷이 보이기 직전에 발행 잠금 안에서 부를 함수)
+    @contextmanager
+    def _writing(self, published: Optional[Callable[[], None]] = None):
+        with self.storage.lock(), self._write_lock:
+            draft = self._current().fork()
+            try:
+                yield draft
+            except BaseException:
+                if draft.version is not None:
+                    # 저장소가 일부만 바뀌었을 수 있으므로 세대 번호를 올려 모든 워커가 다시 읽게 한다
+                    self.storage.generation.bump()
+                raise
+            if draft.version is not None:
+                self._publish(draft, published)
+            elif published is not None:
+                published()
+
+    ## 초안을 현재 스냅샷으로 교체
+    def _publish(self, draft: Snapshot, published: Optional[Callable[[], None]] = None):
+        with self._load_lock:
+            # 저장이 끝난 뒤 파일 잠금 안에서 올려야 다른 워커가 커밋 전 상태를 읽고 최신으로 여기지 않는다
+            draft.generation = self.storage.generation.bump()
+            draft.base = None
+            if draft.indexes is not None:
+                self._index_base = draft.indexes
+            if published is not None:
+                # 새 스냅샷이 보이기 전에 불러야 읽는 쪽이 새 레코드와 함께 이전 상태를 보지 않는다
+                published()
+            self._snapshot = draft
+
+    ## 초안의 인덱스 (처음 바꿀 때 원본 스냅샷의 인덱스를 fork)
+    def _write_indexes(self, draft: Snapshot) -> Dict[str, Index]:
+        if draft.indexes is None or draft.indexes is draft.base.indexes:
+            draft.indexes = {field: index.fork() for field, index in self._indexes(draft.base).items()}
+        return draft.indexes
+
+    ## 쓰기 시작 (초안을 바꾸기 직전에 호출)
+    def _begin_write(self, draft: Snapshot):
+        if draft.version is not None:
+            return
+        # 발행되면 세대 번호가 하나 오른다. 세대 파일이 새로 만들어져도
+        # 버전이 뒤로 가지 않도록 저장된 최댓값보다도 크게 잡는다
+        base = draft.base
+        draft.version = max(base.generation or 0, self._max_version(base)) + 1
+        draft.max_version = draft.version
+
+    ## 모든 레코드
+    def all(self) -> List[dict]:
+        return list(self._current().records.values())
+
+    ## id로 레코드 찾기
+    def get(self, record_id: int) -> Optional[dict]:
+        return self._current().records.get(record_id)
+
+    ## 인덱스 필드 값으로 레코드 찾기
+    def find_one(self, field: str, value) -> Optional[dict]:
+        snapshot = self._current()
+        record_id = self._indexes(snapshot)[field].get(value)
+        if record_id is None:
+            return None
+        return snapshot.records.get(record_id)
+
+    ## 그룹 인덱스로 레코드 목록 찾기
+    def find_many(self, field: str, value, reverse: bool = False) -> List[dict]:
+        snapshot = self._current()
+        records = snapshot.records
+        return [records[record_id] for record_id in self._indexes(snapshot)[field].get(value, reverse)]
+
+    ## 그룹 인덱스로 개수 세기
+    def count(self, field: str, value) -> int:
+        return self._indexes(self._current())[field].count(value)
+
+    ## 정렬 인덱스로 최신순 페이지 조회 -> (레코드 목록, 다음 페이지 정렬 키)
+    def page(self, field: str, skip: int = 0, limit: int = 20, after=None):
+        snapshot = self._current()
+        records = snapshot.records
+        record_ids, next_entry = self._indexes(snapshot)[field].page(skip, limit, after)
+        return [records[record_id] for record_id in record_ids], next_entry
+
+    ## 전문 검색 인덱스로 검색 -> (점수순 레코드 목록, 전체 일치 수)
+    def search(self, field: str, query: str, skip: int = 0, limit: int = 20):
+        snapshot = self._current()
+        records = snapshot.records
+        record_ids, total = self._indexes(snapshot)[field].search(query, skip, limit)
+        return [records[record_id] for record_id in record_ids], total
+
+    ## 전문 검색 통계 -> (문서 수, 전체 길이, {토큰: 문서 빈도}) (샤드 통계를 합칠 때 쓴다)
+    def search_stats(self, field: str, query: str):
+        return self._indexes(self._current())[field].stats(query)
+
+    ## 전문 검색 상위 count 개 -> ([(점수, 레코드)], 전체 일치 수) (샤드 결과를 합칠 때 쓴다)
+    ## (stats: 모든 샤드의 합친 통계)
+    def search_top(self, field: str, query: str, count: int, stats=None):
+        snapshot = self._current()
+        records = snapshot.records
+        top, total = self._indexes(snapshot)[field].top(query, count, stats)
+        return [(score, records[record_id]) for score, record_id in top], total
+
+    ## 인덱스를 파일에 저장 (저장을 지원하는 인덱스만)
+    def save_index(self, field: str):
+        self._indexes(self._current())[field].save()
+
+    ## 전체 레코드 수
+    def __len__(self) -> int:
+        return len(self._current().records)
+
+    ## 다음 id 생성
+    def next_id(self) -> int:
+        return self._max_id(self._current()) + 1
+
+    ## 레코드 추가 (record_id 가 없으면 다음 id) -> 저장된 레코드 (넘긴 dict는 바꾸지 않는다)
+    ## 이미 있는 record_id 면 DuplicateKeyError
+    def insert(self, record: dict, record_id: Optional[int] = None) -> dict:
+        with self._writing() as draft:
+            if record_id is not None and record_id in draft.records:
+                raise DuplicateKeyError("id", record_id)
+            indexes = self._write_indexes(draft)
+            record = {**record, "id": self._max_id(draft) + 1 if record_id is None else record_id}
+            for index in indexes.values():
+                index.check(record)
+            self._begin_write(draft)
+            record["version"] = draft.version
+            record = convert(record, self.record_type)
+            draft.records[record["id"]] = record
+            if draft.max_id is not None:
+                draft.max_id = max(draft.max_id, record["id"])
+            for index in indexes.values():
+                index.add(record)
+            self.storage.insert(record, draft.records)
+        return record
+
+    ## 레코드 수정
+    def update(self, record_id: int, updates: dict) -> Optional[dict]:
+        return self.update_with_previous(record_id, updates)[1]
+
+    ## 레코드 수정 -> (수정 전 레코드, 수정된 레코드) (없는 id면 (None, None))
+    ## 수정 전 레코드도 쓰기 잠금 안에서 읽으므로 동시에 수정해도 각자 자기가 바꾼 값을 받는다
+    def update_with_previous(self, record_id: int, updates: dict) -> Tuple[Optional[dict], Optional[dict]]:
+        with self._writing() as draft:
+            previous = draft.records.get(record_id)
+            if previous is None:
+                return None, None
+            record = self._apply_update(draft, record_id, updates)
+            self.storage.patch(record_id, {**updates, "version": record["version"]}, draft.records)
+        return previous, record
+
+    ## 여러 레코드 수정을 저장소 쓰기 한 번으로 (없는 id는 건너뜀)
+    def update_many(self, changes: Dict[int, dict]) -> List[dict]:
+        with self._writing() as draft:
+            applied = {}
+            updated = []
+            for record_id, updates in changes.items():
+                if record_id not in draft.records:
+                    continue
+                record = self._apply_update(draft, record_id, updates)
+                updated.append(record)
+                applied[record_id] = {**updates, "version": record["version"]}
+            if applied:
+                self.storage.patch_many(applied, draft.records)
+        return updated
+
+    ## 숫자 필드에 증감값 더하기 {id: {필드: 증감}} (쓰기 잠금 안에서 최신 값 기준으로 계산)
+    ## (published({id: 새 레코드 버전, 없는 id 는 None}): 더한 값이 보이기 직전에 발행 잠금 안에서 부를 함수)
+    def increment_many(self, changes: Dict[int, Dict[str, int]],
+                       published: Optional[Callable[[Dict[int, Optional[int]]], None]] = None) -> List[dict]:
+        versions: Dict[int, Optional[int]] = {}
+        notify = (lambda: published(versions)) if published is not None else None
+        with self._writing(notify) as draft:
+            applied = {}
+            updated = []
+            for record_id, deltas in changes.items():
+                record = draft.records.get(record_id)
+                if record is None:
+                    versions[record_id] = None
+                    continue
+                updates = {field: record.get(field, 0) + delta
+                           for field, delta in deltas.items()}
+                record = self._apply_update(draft, record_id, updates)
+                updated.append(record)
+                applied[record_id] = {**updates, "version": record["version"]}
+                versions[record_id] = record["version"]
+            if applied:
+                self.storage.patch_many(applied, draft.records)
+        return updated
+
+    ## 레코드 전체 교체 (필드 제거 등 병합 수정으로 안 되는 경우)
+    def replace_many(self, replacements: List[dict]):
+        with self._writing() as draft:
+            records = draft.records
+            indexes = self._write_indexes(draft)
+            replaced = []
+            for record in replacements:
+                old = records.get(record["id"])
+                if old is None:
+                    continue
+                for index in indexes.values():
+                    index.check(record)
+                self._begin_write(draft)
+                record = convert({**record, "version": draft.version}, self.record_type)
+                records[record["id"]] = record
+                for index in indexes.values():
+                    index.replace(old, record)
+                replaced.append(record)
+            if replaced:
+                self.storage.replace_many(replaced, records)
+
+    ## 초안의 레코드 교체 + 인덱스 갱신
+    def _apply_update(self, draft: Snapshot, record_id: int, updates: dict) -> dict:
+        old = draft.records[record_id]
+        record = as_dict(old)
+        record.update(updates)
+        # 인덱스 필드가 바뀐 경우에만 재색인
+        changed = [field for field, index in self.indexes.items()
+                   if any(name in updates for name in index.fields)]
+        indexes = self._write_indexes(draft) if changed else {}
+        for field in changed:
+            indexes[field].check(record)
+        self._begin_write(draft)
+        record["version"] = draft.version
+        record = convert(record, self.record_type)
+        draft.records[record_id] = record
+        for field in changed:
+            indexes[field].replace(old, record)
+        return record
+
+    ## 레코드 삭제
+    def delete(self, record_id: int) -> bool:
+        with self._writing() as draft:
+            if not self._remove(draft, [record_id]):
+                return False
+            self.storage.delete(record_id, draft.records)
+        return True
+
+    ## 여러 레코드를 저장소 쓰기 한 번으로 삭제 -> 삭제된 레코드 (없는 id는 건너뜀)
+    def delete_many(self, record_ids: List[int]) -> List[dict]:
+        with self._writing() as draft:
+            deleted = self._remove(draft, record_ids)
+            if deleted:
+                self.storage.delete_many([record["id"] for record in deleted], draft.records)
+        return deleted
+
+    ## 필드 값이 같은 레코드를 모두 삭제 -> 삭제된 레코드 (인덱스가 있으면 인덱스로 찾는다)
+    def delete_where(self, field: str, value) -> List[dict]:
+        with self._writing() as draft:
+            records = draft.records
+            index = self._indexes(draft.base).get(field)
+            if isinstance(index, GroupIndex):
+                # 뒤에서부터 지워야 그룹 목록에서 원소를 옮기지 않는다
+                record_ids = index.get(value, reverse=True)
+            elif isinstance(index, UniqueIndex):
+                record_ids = [record_id for record_id in [index.get(value)] if record_id is not None]
+            else:
+                record_ids = [record_id for record_id, record in records.items() if record.get(field) == value]
+            deleted = self._remove(draft, record_ids)
+            if deleted:
+                self.storage.delete_many([record["id"] for record in deleted], records)
+        return deleted
+
+    ## 초안의 레코드 삭제 + 인덱스 갱신
+    def _remove(self, draft: Snapshot, record_ids: List[int]) -> List[dict]:
+        records = draft.records
+        deleted = [records[record_id] for record_id in dict.fromkeys(record_ids) if record_id in records]
+        if not deleted:
+            return deleted
+        indexes = self._write_indexes(draft)
+        self._begin_write(draft)
+        for record in deleted:
+            for index in indexes.values():
+                index.remove(record)
+            del records[record["id"]]
+            if record["id"] == draft.max_id:
+                draft.max_id = None
+        return deleted
+
+    ## 캐시 적중 통계
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "enabled": self.cache_enabled,
+            "generation": snapshot.generation if snapshot is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "records": len(snapshot.records) if snapshot is not None else 0,
+        }
+
+## 전체 컬렉션 캐시 통계
+def cache_stats() -> Dict[str, dict]:
+    return {name: collection.stats() for name, collection in collections.items()}
@@ -1,74 +1,82 @@
-import json
-from pathlib import Path
 from typing import List, Optional
+from model.shard import create_collection
+from model.record import Comment, public_dict
+from model.aio import AsyncModel
+from model.index import GroupIndex
+from model.blob import blob_model
 
 class CommentModel:
     def __init__(self):
-        self.db_path = Path("data/comments.json")
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # SHARDS 가 2 이상이면 post_id 구간별 샤드 (게시글의 댓글은 한 샤드에 모인다)
+        self.collection = create_collection("comments", shard_field="post_id", record_type=Comment)
+        self.db_path = self.collection.db_path
+        # 게시글별 댓글 id 목록 (작성순)
+        self.collection.add_index(GroupIndex("post_id", order_by="created_at"))
     
+    ## 응답용 댓글 (레코드 버전은 ETag 에만 쓰고 빼낸다)
+    @staticmethod
+    def _present(comment: Optional[dict]) -> Optional[dict]:
+        return public_dict(comment)
+
     ## 모든 댓글 읽기
     def _read_all(self) -> List[dict]:
-        if not self.db_path.exists():
-            return []
-        with open(self.db_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    
-    ## 모든 댓글 쓰기
-    def _write_all(self, comments: List[dict]):
-        with open(self.db_path, "w", encoding="utf-8") as f:
-            json.dump(comments, f, ensure_ascii=False, indent=2)
+        return self.collection.all()
     
     ## 다음 id 생성
     def get_next_id(self) -> int:
-        comments = self._read_all()
-        if not comments:
-            return 1
-        return max(comment["id"] for comment in comments) + 1
+        return self.collection.next_id()
     
     ## id로 댓글 찾기
     def find_by_id(self, comment_id: int) -> Optional[dict]:
-        comments = self._read_all()
-        return next((c for c in comments if c['id'] == comment_id), None)
+        return self.collection.get(comment_id)
     
     ## id로 게시글의 댓글 조회
     def find_by_post_id(self, post_id: int) -> List[dict]:
-        comments = self._read_all()
-        post_comments = [c for c in comments if c['post_id'] == post_id]
         # 최신순 정렬
-        return sorted(post_comments, key=lambda x: x['created_at'], reverse=True)
+        return [self._present(comment) for comment in self.collection.find_many("post_id", post_id, reverse=True)]
     
-    ## 댓글 생성
+    ## 게시글 댓글 목록 버전 (추가/수정은 가장 큰 레코드 버전을, 삭제는 개수를 바꾼다)
+    def version_by_post_id(self, post_id: int) -> tuple:
+        comments = self.collection.find_many("post_id", post_id)
+        return (len(comments), max((comment.get("version", 0) for comment in comments), default=0))
+
+    ## 댓글 생성 (복사한 작성자 프로필 이미지 참조를 잡는다)
     def create(self, comment_data: dict) -> dict:
-        comments = self._read_all()
-        comment_data['id'] = self.get_next_id()
-        comments.append(comment_data)
-        self._write_all(comments)
-        return comment_data
+        blob_model.acquire(comment_data.get('author_profile_image'))
+        try:
+            comment = self.collection.insert(comment_data)
+        except BaseException:
+            blob_model.release(comment_data.get('author_profile_image'))
+            raise
+        return self._present(comment)
     
     ## 댓글 수정
     def update(self, comment_id: int, updates: dict) -> Optional[dict]:
-        comments = self._read_all()
-        comment = next((c for c in comments if c['id'] == comment_id), None)
-        if not comment:
-            return None
-        comment.update(updates)
-        self._write_all(comments)
-        return comment
+        return self._present(self.collection.update(comment_id, updates))
     
     ## 댓글 삭제
     def delete(self, comment_id: int) -> bool:
-        comments = self._read_all()
-        original_length = len(comments)
-        comments = [c for c in comments if c['id'] != comment_id]
-        if len(comments) < original_length:
-            self._write_all(comments)
-            return True
-        return False
+        return self.delete_many([comment_id]) > 0
+
+    ## 여러 댓글 삭제 (저장소 쓰기 한 번) -> 삭제된 댓글 수
+    def delete_many(self, comment_ids: List[int]) -> int:
+        return self._released(self.collection.delete_many(comment_ids))
+
+    ## 게시글의 댓글 전체 삭제 (저장소 쓰기 한 번) -> 삭제된 댓글 수
+    def delete_by_post_id(self, post_id: int) -> int:
+        return self._released(self.collection.delete_where("post_id", post_id))
+
+    ## 삭제된 댓글의 작성자 프로필 이미지 참조 해제 -> 삭제된 댓글 수
+    @staticmethod
+    def _released(deleted: List[dict]) -> int:
+        blob_model.release_many(comment.get('author_profile_image') for comment in deleted)
+        return len(deleted)
     
     ## 댓글 수
     def count_by_post_id(self, post_id: int) -> int:
-        comments = self._read_all()
-        return len([c for c in comments if c['post_id'] == post_id])
+        return self.collection.count("post_id", post_id)
+
+comment_model = CommentModel()
 
-comment_model = CommentModel()
\ No newline at end of file
+# 라우트/컨트롤러용 비동기 모델 (스레드 풀에서 실행)
+async_comment_model = AsyncModel(comment_model, writes=("create", "update", "delete", "delete_many", "delete_by_post_id"))
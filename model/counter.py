@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from core.config import COUNTER_FLUSH_INTERVAL, COUNTER_FLUSH_THRESHOLD
+from model.collection import Collection
+from model.record import as_dict
+
+# 등록된 버퍼 (주기적 저장/종료 시 저장용)
+counter_buffers: List["CounterBuffer"] = []
+
+class CounterBuffer:
+    """레코드별 카운터 증분을 메모리에 모았다가 한 번에 저장하는 버퍼
+
+    증분은 flush_interval 초가 지났거나 flush_threshold 개가 쌓이면
+    Collection.increment_many 로 저장소에 한 번만 쓴다. 조회 시에는
+    저장된 값에 대기 중인 증분을 더해서 돌려준다.
+
+    저장한 증분은 그 증분이 들어간 레코드 버전과 함께 다음 저장 때까지 남겨 두고,
+    그보다 오래된 레코드에만 더한다. 그래서 새 레코드가 보이는 순간과 증분이 빠지는 순간이
+    따로 있어도 읽는 쪽이 두 번 더하거나 빠뜨리지 않는다.
+    """
+
+    def __init__(self, collection: Collection,
+                 flush_interval: float = COUNTER_FLUSH_INTERVAL,
+                 flush_threshold: int = COUNTER_FLUSH_THRESHOLD):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[int, Dict[str, int]] = {}
+        # 저장 중인 증분 (저장이 끝날 때까지 조회에 계속 반영)
+        self._flushing: Dict[int, Dict[str, int]] = {}
+        # 저장된 증분 {id: (증분, 증분이 들어간 레코드 버전)} (그보다 오래된 레코드에만 반영)
+        self._flushed: Dict[int, Tuple[Dict[str, int], int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # 대기 중인 add 호출 수 (전체, 레코드별)
+        self._pending_count = 0
+        self._pending_adds: Dict[int, int] = {}
+        self._last_flush = time.monotonic()
+        counter_buffers.append(self)
+
+    ## 증분 추가
+    def add(self, record_id: int, field: str, delta: int = 1):
+        with self._lock:
+            deltas = self._pending.setdefault(record_id, {})
+            deltas[field] = deltas.get(field, 0) + delta
+            self._pending_count += 1
+            self._pending_adds[record_id] = self._pending_adds.get(record_id, 0) + 1
+            due = (self._pending_count >= self.flush_threshold
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    ## 레코드에 아직 들어가지 않은 증분 {필드: 증분} (저장 중인 것 포함)
+    def deltas(self, record: dict) -> Dict[str, int]:
+        record_id = record["id"]
+        with self._lock:
+            pending = self._pending.get(record_id)
+            flushing = self._flushing.get(record_id)
+            flushed = self._flushed.get(record_id)
+            if flushed is not None and record.get("version", 0) >= flushed[1]:
+                flushed = None
+            if not pending and not flushing and flushed is None:
+                return {}
+            deltas = dict(flushed[0]) if flushed is not None else {}
+            for extra in (flushing, pending):
+                for field, delta in (extra or {}).items():
+                    deltas[field] = deltas.get(field, 0) + delta
+        return deltas
+
+    ## 레코드에 대기 중인 증분 반영 (증분이 없으면 그대로)
+    def apply(self, record: dict) -> dict:
+        if record is None:
+            return None
+        deltas = self.deltas(record)
+        if not deltas:
+            return record
+        applied = as_dict(record)
+        for field, delta in deltas.items():
+            applied[field] = record.get(field, 0) + delta
+        return applied
+
+    ## 삭제된 레코드의 증분 버리기
+    def discard(self, record_id: int):
+        with self._lock:
+            self._pending.pop(record_id, None)
+            self._flushing.pop(record_id, None)
+            self._flushed.pop(record_id, None)
+            self._pending_count -= self._pending_adds.pop(record_id, 0)
+
+    ## 저장소에 반영
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+                # 지난 저장의 증분이 든 레코드는 이미 발행됐다
+                self._flushed = {}
+                self._pending_count = 0
+                self._pending_adds = {}
+                self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                # 더하기는 쓰기 잠금 안에서 해야 다른 워커의 증분을 덮어쓰지 않는다
+                self.collection.increment_many(pending, self._published)
+            except BaseException:
+                self._requeue()
+                raise
+
+    ## 저장된 증분을 레코드 버전과 함께 옮기기 (컬렉션이 새 레코드를 보이기 직전에 발행 잠금 안에서 불린다)
+    def _published(self, versions: Dict[int, int]):
+        with self._lock:
+            for record_id, version in versions.items():
+                deltas = self._flushing.pop(record_id, None)
+                if deltas and version is not None:
+                    self._flushed[record_id] = (deltas, version)
+
+    ## 저장하지 못한 증분을 대기 목록에 되돌리기
+    def _requeue(self):
+        with self._lock:
+            flushing, self._flushing = self._flushing, {}
+            for record_id, deltas in flushing.items():
+                pending = self._pending.setdefault(record_id, {})
+                for field, delta in deltas.items():
+                    pending[field] = pending.get(field, 0) + delta
+                self._pending_count += 1
+                self._pending_adds[record_id] = self._pending_adds.get(record_id, 0) + 1
+
+## 모든 버퍼 저장
+def flush_all():
+    for buffer in counter_buffers:
+        buffer.flush()
@@ -0,0 +1,226 @@
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, Iterator, List, MutableMapping, Tuple
+
+# 정수 키는 2^BUCKET_BITS 개 연속 구간이 한 버킷
+BUCKET_BITS = 8
+# 정수가 아닌 키의 버킷 수 (해시로 나눈다)
+HASH_BUCKETS = 1024
+# 정렬 목록 블록 크기 (두 배를 넘으면 반으로 나눈다)
+BLOCK_SIZE = 512
+
+class ChunkedMap(MutableMapping):
+    """버킷 단위로 구조를 공유하는 copy-on-write 매핑
+
+    fork() 는 버킷 목록만 복사한 다음 버전을 돌려주고, 다음 버전에서 처음 바꾸는 버킷만 복사한다.
+    그래서 한 버전을 읽는 동안 다음 버전을 만들어도 읽는 쪽은 바뀌지 않고,
+    쓰기 비용은 전체 크기가 아니라 (버킷 수 + 바뀐 버킷 크기)에 비례한다.
+    정수 키는 연속 구간이 한 버킷에 모이므로 id 순으로 넣으면 id 순으로 돈다.
+    fork() 한 원본은 더 이상 바꾸지 않는다 (발행된 버전은 읽기 전용).
+    """
+
+    __slots__ = ("_buckets", "_owned", "_len")
+
+    def __init__(self, items: Iterable[Tuple[Hashable, object]] = ()):
+        buckets: Dict[int, dict] = {}
+        for key, value in items:
+            number = key >> BUCKET_BITS if type(key) is int else hash(key) % HASH_BUCKETS
+            bucket = buckets.get(number)
+            if bucket is None:
+                bucket = buckets[number] = {}
+            bucket[key] = value
+        self._buckets = buckets
+        # 이 버전이 만든(복사한) 버킷 번호 - 이 버킷만 제자리에서 바꿀 수 있다
+        self._owned = set(buckets)
+        self._len = sum(map(len, buckets.values()))
+
+    ## 다음 버전 (버킷은 처음 바꿀 때 복사)
+    def fork(self) -> "ChunkedMap":
+        forked = type(self).__new__(type(self))
+        forked._buckets = dict(self._buckets)
+        forked._owned = set()
+        forked._len = self._len
+        return forked
+
+    def __getitem__(self, key):
+        bucket = self._buckets.get(key >> BUCKET_BITS if type(key) is int else hash(key) % HASH_BUCKETS)
+        if bucket is None:
+            raise KeyError(key)
+        return bucket[key]
+
+    def get(self, key, default=None):
+        bucket = self._buckets.get(key >> BUCKET_BITS if type(key) is int else hash(key) % HASH_BUCKETS)
+        if bucket is None:
+            return default
+        return bucket.get(key, default)
+
+    def __contains__(self, key) -> bool:
+        bucket = self._buckets.get(key >> BUCKET_BITS if type(key) is int else hash(key) % HASH_BUCKETS)
+        return bucket is not None and key in bucket
+
+    ## 바꿀 수 있는 버킷 (공유 중이면 복사)
+    def _writable(self, number: int) -> dict:
+        if number in self._owned:
+            return self._buckets[number]
+        bucket = dict(self._buckets.get(number, ()))
+        self._buckets[number] = bucket
+        self._owned.add(number)
+        return bucket
+
+    def __setitem__(self, key, value):
+        bucket = self._writable(key >> BUCKET_BITS if type(key) is int else hash(key) % HASH_BUCKETS)
+        if key not in bucket:
+            self._len += 1
+        bucket[key] = value
+
+    def __delitem__(self, key):
+        number = key >> BUCKET_BITS if type(key) is int else hash(key) % HASH_BUCKETS
+        if key not in self._buckets.get(number, ()):
+            raise KeyError(key)
+        bucket = self._writable(number)
+        del bucket[key]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[number]
+            self._owned.discard(number)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        for bucket in self._buckets.values():
+            yield from bucket
+
+    ## 값 반복자 (키마다 찾지 않고 버킷을 그대로 돈다)
+    def values(self) -> Iterator:
+        for bucket in self._buckets.values():
+            yield from bucket.values()
+
+    def items(self) -> Iterator[tuple]:
+        for bucket in self._buckets.values():
+            yield from bucket.items()
+
+
+class ChunkedSet(ChunkedMap):
+    """버킷 단위로 구조를 공유하는 copy-on-write 집합 (값이 없는 ChunkedMap)
+
+    fork() 한 다음 버전에 원소 하나를 넣거나 빼면 그 원소의 버킷 하나만 복사한다.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, keys: Iterable[Hashable] = ()):
+        super().__init__((key, None) for key in keys)
+
+    def add(self, key):
+        if key not in self:
+            self[key] = None
+
+    def discard(self, key):
+        if key in self:
+            del self[key]
+
+
+class SortedBlocks:
+    """블록 단위로 구조를 공유하는 copy-on-write 정렬 목록
+
+    원소를 BLOCK_SIZE 안팎의 정렬된 블록들로 나눠 들고, fork() 는 블록 목록만 복사한다.
+    추가/삭제는 그 원소가 들어가는 블록 하나만 복사하므로 O(블록 수 + 블록 크기)이다.
+    위치 계산은 블록 길이를 끝에서부터 더하므로 최신(끝) 쪽 조회가 빠르다.
+    """
+
+    __slots__ = ("_blocks", "_maxes", "_owned", "_len")
+
+    def __init__(self, items: Iterable = ()):
+        items = sorted(items)
+        self._blocks: List[list] = [items[i:i + BLOCK_SIZE] for i in range(0, len(items), BLOCK_SIZE)]
+        # 블록별 가장 큰 원소 (블록 찾기용)
+        self._maxes = [block[-1] for block in self._blocks]
+        # 이 버전이 만든(복사한) 블록 - 살아 있는 다른 버전의 블록과 id 가 겹치지 않는다
+        self._owned = {id(block) for block in self._blocks}
+        self._len = len(items)
+
+    ## 다음 버전 (블록은 처음 바꿀 때 복사)
+    def fork(self) -> "SortedBlocks":
+        forked = SortedBlocks.__new__(SortedBlocks)
+        forked._blocks = list(self._blocks)
+        forked._maxes = list(self._maxes)
+        forked._owned = set()
+        forked._len = self._len
+        return forked
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        for block in self._blocks:
+            yield from block
+
+    ## 바꿀 수 있는 블록 (공유 중이면 복사)
+    def _writable(self, i: int) -> list:
+        block = self._blocks[i]
+        if id(block) not in self._owned:
+            block = list(block)
+            self._blocks[i] = block
+            self._owned.add(id(block))
+        return block
+
+    def add(self, item):
+        if not self._blocks:
+            block = [item]
+            self._blocks.append(block)
+            self._maxes.append(item)
+            self._owned.add(id(block))
+            self._len = 1
+            return
+        # 새 원소는 대부분 가장 크므로 마지막 블록에 붙는다
+        i = min(bisect_left(self._maxes, item), len(self._blocks) - 1)
+        block = self._writable(i)
+        insort(block, item)
+        self._maxes[i] = block[-1]
+        self._len += 1
+        if len(block) > 2 * BLOCK_SIZE:
+            half = block[BLOCK_SIZE:]
+            del block[BLOCK_SIZE:]
+            self._blocks.insert(i + 1, half)
+            self._maxes.insert(i + 1, half[-1])
+            self._maxes[i] = block[-1]
+            self._owned.add(id(half))
+
+    ## 원소 제거 (없으면 False)
+    def remove(self, item) -> bool:
+        i = bisect_left(self._maxes, item)
+        if i == len(self._blocks):
+            return False
+        position = bisect_left(self._blocks[i], item)
+        if self._blocks[i][position] != item:
+            return False
+        block = self._writable(i)
+        del block[position]
+        self._len -= 1
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+        return True
+
+    ## item 이 들어갈 가장 앞 위치
+    def bisect_left(self, item) -> int:
+        i = bisect_left(self._maxes, item)
+        if i == len(self._blocks):
+            return self._len
+        after = sum(map(len, self._blocks[i:]))
+        return self._len - after + bisect_left(self._blocks[i], item)
+
+    ## [start, end) 구간 목록
+    def slice(self, start: int, end: int) -> list:
+        parts = []
+        offset = self._len
+        for block in reversed(self._blocks):
+            if offset <= start:
+                break
+            block_start = offset - len(block)
+            if block_start < end:
+                parts.append(block[max(start - block_start, 0):end - block_start])
+            offset = block_start
+        return [item for part in reversed(parts) for item in part]
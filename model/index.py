@@ -0,0 +1,307 @@
+import base64
+import bisect
+import copy
+import json
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from model.cow import ChunkedMap, SortedBlocks
+
+class DuplicateKeyError(ValueError):
+    """유니크 인덱스에 이미 같은 값이 있을 때"""
+
+    def __init__(self, field: str, value):
+        super().__init__(f"{field} 값이 중복됩니다: {value}")
+        self.field = field
+        self.value = value
+
+
+class UniqueIndex:
+    """필드 값 -> 레코드 id 유니크 해시 인덱스"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.fields = (field,)
+        self._ids: ChunkedMap = ChunkedMap()
+
+    ## 다음 버전용 복사본 (구조를 공유하고 바꾸는 부분만 복사한다)
+    def fork(self) -> "UniqueIndex":
+        forked = copy.copy(self)
+        forked._ids = self._ids.fork()
+        return forked
+
+    ## 전체 재구성 (기존 데이터의 중복은 먼저 나온 레코드 우선)
+    def rebuild(self, records: Iterable[dict]):
+        field = self.field
+        # 뒤에서부터 넣어야 먼저 나온 레코드가 남는다
+        ids: Dict[Hashable, int] = dict(reversed([(record.get(field), record["id"]) for record in records]))
+        ids.pop(None, None)
+        self._ids = ChunkedMap(ids.items())
+
+    ## 값으로 id 찾기
+    def get(self, value) -> Optional[int]:
+        return self._ids.get(value)
+
+    ## 쓰기 전 중복 검사
+    def check(self, record: dict):
+        value = record.get(self.field)
+        owner = self._ids.get(value)
+        if value is not None and owner is not None and owner != record["id"]:
+            raise DuplicateKeyError(self.field, value)
+
+    def add(self, record: dict):
+        value = record.get(self.field)
+        if value is not None:
+            self._ids[value] = record["id"]
+
+    def remove(self, record: dict):
+        value = record.get(self.field)
+        if self._ids.get(value) == record["id"]:
+            del self._ids[value]
+
+    def replace(self, old: dict, record: dict):
+        self.remove(old)
+        self.add(record)
+
+
+class GroupIndex:
+    """필드 값 -> (정렬 키, id) 목록 인덱스
+
+    그룹마다 order_by 순으로 정렬된 목록을 유지하므로 그룹 조회는 그룹 크기에,
+    개수 조회는 O(1)에 끝난다.
+    """
+
+    def __init__(self, field: str, order_by: str):
+        self.field = field
+        self.order_by = order_by
+        self.fields = (field, order_by)
+        self._groups: ChunkedMap = ChunkedMap()
+        # 이 버전이 만든(복사한) 그룹 목록 - 이 목록만 제자리에서 바꿀 수 있다
+        self._owned = set()
+
+    def _entry(self, record: dict) -> Tuple[str, int]:
+        return (record.get(self.order_by), record["id"])
+
+    ## 다음 버전용 복사본 (그룹 목록은 처음 바꿀 때 복사)
+    def fork(self) -> "GroupIndex":
+        forked = copy.copy(self)
+        forked._groups = self._groups.fork()
+        forked._owned = set()
+        return forked
+
+    def rebuild(self, records: Iterable[dict]):
+        groups: Dict[Hashable, List[Tuple[str, int]]] = {}
+        for record in records:
+            groups.setdefault(record.get(self.field), []).append(self._entry(record))
+        for group in groups.values():
+            group.sort()
+        self._groups = ChunkedMap(groups.items())
+        self._owned = set(groups)
+
+    ## 바꿀 수 있는 그룹 목록 (공유 중이면 복사)
+    def _writable(self, value) -> List[Tuple[str, int]]:
+        if value in self._owned:
+            return self._groups[value]
+        group = list(self._groups.get(value, ()))
+        self._groups[value] = group
+        self._owned.add(value)
+        return group
+
+    ## 그룹의 id 목록 (reverse=True 면 최신순)
+    def get(self, value, reverse: bool = False) -> List[int]:
+        group = self._groups.get(value, [])
+        entries = reversed(group) if reverse else group
+        return [record_id for _, record_id in entries]
+
+    ## 그룹 크기
+    def count(self, value) -> int:
+        return len(self._groups.get(value, ()))
+
+    def check(self, record: dict):
+        pass
+
+    def add(self, record: dict):
+        # 새 레코드는 대부분 가장 최근이므로 끝에 붙는다
+        bisect.insort(self._writable(record.get(self.field)), self._entry(record))
+
+    def remove(self, record: dict):
+        value = record.get(self.field)
+        group = self._groups.get(value)
+        if not group:
+            return
+        entry = self._entry(record)
+        position = bisect.bisect_left(group, entry)
+        if position < len(group) and group[position] == entry:
+            group = self._writable(value)
+            del group[position]
+            if not group:
+                del self._groups[value]
+                self._owned.discard(value)
+
+    def replace(self, old: dict, record: dict):
+        self.remove(old)
+        self.add(record)
+
+
+class SortedIndex:
+    """(정렬 키, id) 순서 인덱스 - 최신순 페이지 조회용
+
+    항목은 SortedBlocks 블록에 나눠 들고, 페이지 위치는 끝(최신)에서부터 블록 길이로 찾으므로
+    최신 쪽 skip/limit 과 커서 조회는 O(지나온 블록 수 + limit) 이다.
+    """
+
+    def __init__(self, order_by: str):
+        self.field = order_by
+        self.fields = (order_by,)
+        self._entries: SortedBlocks = SortedBlocks()
+
+    def _entry(self, record: dict) -> Tuple[str, int]:
+        return (record.get(self.field), record["id"])
+
+    ## 다음 버전용 복사본 (블록은 처음 바꿀 때 복사)
+    def fork(self) -> "SortedIndex":
+        forked = copy.copy(self)
+        forked._entries = self._entries.fork()
+        return forked
+
+    def rebuild(self, records: Iterable[dict]):
+        self._entries = SortedBlocks(self._entry(record) for record in records)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    ## 최신순 페이지 (after 커서가 있으면 그 다음부터)
+    def page(self, skip: int = 0, limit: int = 20, after: Optional[Tuple[str, int]] = None):
+        end = self._entries.bisect_left(after) if after else len(self._entries)
+        end = max(end - max(skip, 0), 0)
+        start = max(end - max(limit, 0), 0)
+        entries = self._entries.slice(start, end)[::-1]
+        next_entry = entries[-1] if entries and start > 0 else None
+        return [record_id for _, record_id in entries], next_entry
+
+    def check(self, record: dict):
+        pass
+
+    def add(self, record: dict):
+        self._entries.add(self._entry(record))
+
+    def remove(self, record: dict):
+        self._entries.remove(self._entry(record))
+
+    def replace(self, old: dict, record: dict):
+        self.remove(old)
+        self.add(record)
+
+
+class SqlUniqueIndex(UniqueIndex):
+    """컬럼 인덱스가 있는 SQLite 테이블의 유니크 인덱스 (조회/중복 검사를 SQL 로)
+
+    레코드 쓰기가 컬럼도 함께 갱신하므로 메모리에는 아무것도 들고 있지 않는다.
+    """
+
+    def __init__(self, field: str, storage):
+        super().__init__(field)
+        self.storage = storage
+
+    def fork(self) -> "SqlUniqueIndex":
+        return self
+
+    def rebuild(self, records: Iterable[dict]):
+        pass
+
+    def get(self, value) -> Optional[int]:
+        return self.storage.lookup(self.field, value) if value is not None else None
+
+    ## 쓰기 전 중복 검사 (저장소 잠금 안이므로 다른 워커와 겹치지 않는다)
+    def check(self, record: dict):
+        value = record.get(self.field)
+        owner = self.get(value)
+        if owner is not None and owner != record["id"]:
+            raise DuplicateKeyError(self.field, value)
+
+    def add(self, record: dict):
+        pass
+
+    def remove(self, record: dict):
+        pass
+
+
+class SqlGroupIndex(GroupIndex):
+    """컬럼 인덱스가 있는 SQLite 테이블의 그룹 인덱스 (그룹 조회/개수를 SQL 로)"""
+
+    def __init__(self, field: str, order_by: str, storage):
+        super().__init__(field, order_by)
+        self.storage = storage
+
+    def fork(self) -> "SqlGroupIndex":
+        return self
+
+    def rebuild(self, records: Iterable[dict]):
+        pass
+
+    def get(self, value, reverse: bool = False) -> List[int]:
+        return self.storage.group(self.field, value, self.order_by, reverse)
+
+    def count(self, value) -> int:
+        return self.storage.count(self.field, value)
+
+    def check(self, record: dict):
+        pass
+
+    def add(self, record: dict):
+        pass
+
+    def remove(self, record: dict):
+        pass
+
+
+class SqlSortedIndex(SortedIndex):
+    """컬럼 인덱스가 있는 SQLite 테이블의 정렬 인덱스 (페이지를 SQL 로)"""
+
+    def __init__(self, order_by: str, storage):
+        super().__init__(order_by)
+        self.storage = storage
+
+    def fork(self) -> "SqlSortedIndex":
+        return self
+
+    def rebuild(self, records: Iterable[dict]):
+        pass
+
+    def page(self, skip: int = 0, limit: int = 20, after: Optional[Tuple[str, int]] = None):
+        return self.storage.page(self.field, skip, limit, after)
+
+    def add(self, record: dict):
+        pass
+
+    def remove(self, record: dict):
+        pass
+
+
+## 저장소 컬럼으로 조회할 수 있으면 SQL 인덱스로 바꾼다 (storage: SqliteStorage, 아니면 그대로)
+def sql_index(index, storage):
+    if not set(index.fields) <= storage.columns:
+        return index
+    if isinstance(index, UniqueIndex):
+        return SqlUniqueIndex(index.field, storage)
+    if isinstance(index, GroupIndex):
+        return SqlGroupIndex(index.field, index.order_by, storage)
+    if isinstance(index, SortedIndex):
+        return SqlSortedIndex(index.field, storage)
+    return index
+
+
+## 정렬 키를 페이지 커서 문자열로
+def encode_cursor(entry: Tuple[str, int]) -> str:
+    raw = json.dumps(list(entry), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+## 커서 문자열을 정렬 키로 (잘못된 커서면 ValueError)
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, record_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"잘못된 커서입니다: {cursor}") from e
+    if not isinstance(sort_key, str) or not isinstance(record_id, int):
+        raise ValueError(f"잘못된 커서입니다: {cursor}")
+    return (sort_key, record_id)
@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple, Union
+
+from core.config import DATA_DIR, LOG_COMPACT_BYTES
+from core.metrics import metrics
+from model.cow import ChunkedMap, ChunkedSet
+from model.storage import FileLock, GenerationCounter, LogCompaction, read_json, write_json_atomic, open_append_log
+
+# 좋아요 사용자가 이보다 많은 게시글은 ChunkedSet 으로 들어 토글마다 전체가 아니라 버킷 하나만 복사한다
+SMALL_SET = 256
+
+# 게시글의 좋아요 사용자 집합 (작으면 frozenset)
+Users = Union[FrozenSet[int], ChunkedSet]
+
+class LikeModel:
+    """게시글별 좋아요 사용자 집합
+
+    메모리에는 post_id -> 사용자 집합(작으면 frozenset, 크면 ChunkedSet) 을 ChunkedMap 으로 들고,
+    변경은 data/likes.log 에 [post_id, user_id, 1|0] 한 줄씩 추가한다. 로그가 커지면 data/likes.json
+    ({post_id: 정렬된 user_id 배열}) 스냅샷으로 압축한다.
+    읽기는 발행된 버전 하나를 잠금 없이 보고, 쓰기는 그 버전을 fork 해서 바꾼 뒤 로그에 기록하고 교체한다.
+    변경은 data/likes.lock 파일 잠금 안에서 최신 상태를 다시 읽은 뒤 하므로
+    여러 워커 프로세스가 함께 써도 된다. 다른 워커의 변경은 data/likes.gen 세대 번호로 알아챈다.
+    """
+
+    def __init__(self, compact_bytes: int = LOG_COMPACT_BYTES):
+        self.path = DATA_DIR / "likes.json"
+        self.log_path = DATA_DIR / "likes.log"
+        self.compaction = LogCompaction(self.log_path)
+        self.compacting_path = self.compaction.compacting_path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compact_bytes = compact_bytes
+        # (세대 번호, 좋아요) - 한 번에 교체한다
+        self._state: Optional[Tuple[int, ChunkedMap]] = None
+        self._log = None
+        self._load_lock = threading.Lock()
+        self._file_lock = FileLock(DATA_DIR / "likes.lock")
+        self._generation_counter = GenerationCounter(DATA_DIR / "likes.gen")
+
+    ## 현재 버전 (세대 번호가 그대로면 잠금 없이 사용)
+    def _current(self) -> ChunkedMap:
+        state = self._state
+        if state is not None and state[0] == self._generation_counter.value():
+            return state[1]
+        with self._load_lock:
+            generation = self._generation_counter.value()
+            state = self._state
+            if state is not None and state[0] == generation:
+                return state[1]
+            likes = self._load()
+            self._state = (generation, likes)
+            return likes
+
+    ## 스냅샷 + 로그 재생
+    def _load(self) -> ChunkedMap:
+        # 도중에 멈춘 압축이 남긴 로그는 현재 로그에 합친다
+        if self.compaction.stale():
+            with self._file_lock():
+                self.compaction.recover()
+        started = time.perf_counter()
+        # 압축 중인 로그를 스냅샷보다 먼저 열어 둬야 그 사이 압축이 끝나도 변경을 잃지 않는다
+        logs = []
+        for log_path in (self.compacting_path, self.log_path):
+            try:
+                logs.append(open(log_path, "r", encoding="utf-8"))
+            except FileNotFoundError:
+                pass
+        likes = {int(post_id): set(user_ids) for post_id, user_ids in read_json(self.path) or []}
+        for f in logs:
+            with f:
+                metrics.add_read(os.fstat(f.fileno()).st_size)
+                for line in f:
+                    try:
+                        post_id, user_id, liked = json.loads(line)
+                    except ValueError:
+                        # 잘린 줄은 건너뛴다 (뒤에 쓰인 변경은 재생한다)
+                        continue
+                    self._apply(likes, post_id, user_id, liked)
+        metrics.add_decode(time.perf_counter() - started)
+        return ChunkedMap((post_id, self._frozen(user_ids)) for post_id, user_ids in likes.items())
+
+    ## 읽기 전용 사용자 집합 (작으면 frozenset, 크면 ChunkedSet)
+    @staticmethod
+    def _frozen(user_ids: Set[int]) -> Users:
+        return ChunkedSet(user_ids) if len(user_ids) > SMALL_SET else frozenset(user_ids)
+
+    ## user_ids 를 더한(liked) / 뺀 다음 버전 집합 (발행된 집합은 바꾸지 않는다)
+    @staticmethod
+    def _changed(users: Users, user_ids: Iterable[int], liked: bool) -> Users:
+        if isinstance(users, ChunkedSet):
+            users = users.fork()
+            for user_id in user_ids:
+                if liked:
+                    users.add(user_id)
+                else:
+                    users.discard(user_id)
+            return users
+        users = users.union(user_ids) if liked else users.difference(user_ids)
+        return ChunkedSet(users) if len(users) > SMALL_SET else users
+
+    @staticmethod
+    def _apply(likes: Dict[int, Set[int]], post_id: int, user_id, liked: int):
+        if user_id is None:
+            # 게시글 좋아요 전체 삭제
+            likes.pop(post_id, None)
+        elif liked:
+            likes.setdefault(post_id, set()).add(user_id)
+        else:
+            users = likes.get(post_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del likes[post_id]
+
+    ## 게시글의 좋아요 사용자 교체 (빈 집합이면 제거)
+    @staticmethod
+    def _put(likes: ChunkedMap, post_id: int, users: Users):
+        if users:
+            likes[post_id] = users
+        elif post_id in likes:
+            del likes[post_id]
+
+    ## 변경 기록 후 다음 버전 발행 (_file_lock 안에서 호출)
+    def _append(self, likes: ChunkedMap, *entries):
+        self._log = open_append_log(self._log, self.log_path)
+        payload = "".join(json.dumps(entry) + "\n" for entry in entries)
+        self._log.write(payload)
+        self._log.flush()
+        metrics.add_written(len(payload))
+        self._state = (self._generation_counter.bump(), likes)
+        if self._log.tell() >= self.compact_bytes:
+            self.compact()
+
+    ## 좋아요 여부
+    def has_liked(self, post_id: int, user_id: int) -> bool:
+        return user_id in self._current().get(post_id, ())
+
+    ## 좋아요 수
+    def count(self, post_id: int) -> int:
+        return len(self._current().get(post_id, ()))
+
+    ## 좋아요 토글 -> (좋아요 상태, 좋아요 수)
+    def toggle(self, post_id: int, user_id: int) -> Tuple[bool, int]:
+        with self._file_lock():
+            likes = self._current().fork()
+            users = likes.get(post_id, frozenset())
+            liked = user_id not in users
+            users = self._changed(users, (user_id,), liked)
+            self._put(likes, post_id, users)
+            self._append(likes, [post_id, user_id, int(liked)])
+            return liked, len(users)
+
+    ## 좋아요 설정 (이미 같은 상태면 False)
+    def set_liked(self, post_id: int, user_id: int, liked: bool) -> bool:
+        with self._file_lock():
+            users = self._current().get(post_id, frozenset())
+            if (user_id in users) == liked:
+                return False
+            likes = self._current().fork()
+            self._put(likes, post_id, self._changed(users, (user_id,), liked))
+            self._append(likes, [post_id, user_id, int(liked)])
+            return True
+
+    ## 게시글의 좋아요 전체 삭제
+    def delete_post(self, post_id: int):
+        with self._file_lock():
+            if post_id in self._current():
+                likes = self._current().fork()
+                del likes[post_id]
+                self._append(likes, [post_id, None, 0])
+
+    ## 기존 게시글에 박혀 있던 like_users 가져오기
+    def import_likes(self, like_users: Dict[int, list]):
+        with self._file_lock():
+            likes = self._current().fork()
+            entries = []
+            for post_id, user_ids in like_users.items():
+                users = likes.get(post_id, frozenset())
+                added = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in users]
+                if added:
+                    self._put(likes, post_id, self._changed(users, added, True))
+                    entries += [[post_id, user_id, 1] for user_id in added]
+            if entries:
+                self._append(likes, *entries)
+
+    ## 스냅샷으로 압축 (발행된 버전은 바뀌지 않으므로 백그라운드에서 그대로 직렬화한다)
+    def compact(self, background: bool = True):
+        with self._file_lock():
+            if not self.compaction.recover():
+                return
+            likes = self._current()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if not self.compaction.detach():
+                return
+            self._log = open_append_log(None, self.log_path)
+        self.compaction.run(self._write_snapshot, likes, background)
+
+    def _write_snapshot(self, likes: ChunkedMap):
+        write_json_atomic(self.path, [[post_id, sorted(user_ids)] for post_id, user_ids in likes.items()])
+
+like_model = LikeModel()
@@ -1,121 +1,173 @@
-import json
-from pathlib import Path
 from typing import List, Optional
+from model.shard import create_collection
+from model.record import Post, public_dict
+from model.aio import AsyncModel
+from model.index import SortedIndex, encode_cursor, decode_cursor
+from model.search import TextIndex
+from core.config import DATA_DIR
+from model.counter import CounterBuffer
+from model.like import like_model
+from model.blob import blob_model
+from model.comment import comment_model
 
 class PostModel:
     def __init__(self):
-        self.db_path = Path("data/posts.json")
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # SHARDS 가 2 이상이면 id 구간별 샤드
+        self.collection = create_collection("posts", shard_field="id", record_type=Post)
+        self.db_path = self.collection.db_path
+        # (created_at, id) 정렬 인덱스
+        self.collection.add_index(SortedIndex("created_at"))
+        # 제목/내용 전문 검색 (문자 2-gram, 종료 시 data/posts.search 에 저장)
+        self.collection.add_index(TextIndex(("title", "content"), path=DATA_DIR / "posts.search"))
+        # 조회수 증분 버퍼 (읽을 때는 대기 중인 증분까지 더해서 반환)
+        self.counters = CounterBuffer(self.collection)
+        # 좋아요는 별도 저장소 (게시글 레코드에는 좋아요 사용자 목록을 두지 않는다)
+        self.likes = like_model
     
+    ## 응답용 게시글 (대기 중인 조회수 증분 + 좋아요 수 반영, 레코드 버전은 ETag 에만 쓰고 빼낸다)
+    def _present(self, post: Optional[dict]) -> Optional[dict]:
+        if post is None:
+            return None
+        post = public_dict(self.counters.apply(post))
+        post["likes"] = self.likes.count(post["id"])
+        return post
+    
+    ## 응답 버전 (레코드 버전 + 좋아요 수 + 대기 중인 증분: 응답 내용이 바뀌면 함께 바뀐다)
+    def _version(self, post: dict) -> tuple:
+        deltas = self.counters.deltas(post)
+        return (post["id"], post.get("version", 0), self.likes.count(post["id"]), tuple(sorted(deltas.items())))
+
     ## 모든 게시글 읽기
     def _read_all(self) -> List[dict]:
-        if not self.db_path.exists():
-            return []
-        with open(self.db_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    
-    ## 모든 게시글 쓰기
-    def _write_all(self, posts: List[dict]):
-        with open(self.db_path, "w", encoding="utf-8") as f:
-            json.dump(posts, f, ensure_ascii=False, indent=2)
+        return self.collection.all()
     
     ## 다음 게시글 ID 생성
     def get_next_id(self) -> int:
-        posts = self._read_all()
-        if not posts:
-            return 1
-        return max(post["id"] for post in posts) + 1
+        return self.collection.next_id()
     
     ## ID로 게시글 찾기
     def find_by_id(self, post_id: int) -> Optional[dict]:
-        posts = self._read_all()
-        return next((post for post in posts if post['id'] == post_id), None)
+        return self._present(self.collection.get(post_id))
     
-    ## 모든 게시글 조회(페이지네이션)
-    def find_all(self, skip: int = 0, limit: int = 20) -> dict:
-        posts = self._read_all()
-        sorted_posts = sorted(posts, key=lambda x: x['created_at'], reverse=True)
-        paginated = sorted_posts[skip:skip + limit]
+    ## 게시글 응답 버전 (조건부 요청용, 없으면 None)
+    def version_of(self, post_id: int) -> Optional[tuple]:
+        post = self.collection.get(post_id)
+        return self._version(post) if post else None
+
+    ## 모든 게시글 조회(페이지네이션, cursor 가 있으면 그 다음 페이지)
+    def find_all(self, skip: int = 0, limit: int = 20, cursor: Optional[str] = None) -> dict:
+        after = decode_cursor(cursor) if cursor else None
+        paginated, next_entry = self.collection.page("created_at", skip, limit, after)
         return {
-            "total": len(posts),
-            "posts": paginated
+            "total": len(self.collection),
+            "posts": [self._present(post) for post in paginated],
+            "next_cursor": encode_cursor(next_entry) if next_entry else None
         }
     
+    ## 목록 페이지 응답 버전 (본문을 만들지 않고 페이지 레코드의 버전만 모은다)
+    def find_all_version(self, skip: int = 0, limit: int = 20, cursor: Optional[str] = None) -> tuple:
+        after = decode_cursor(cursor) if cursor else None
+        paginated, next_entry = self.collection.page("created_at", skip, limit, after)
+        return (len(self.collection), next_entry, tuple(self._version(post) for post in paginated))
+
+    ## 제목/내용 검색 (BM25 점수순)
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> dict:
+        posts, total = self.collection.search("text", query, skip, limit)
+        return {
+            "total": total,
+            "posts": [self._present(post) for post in posts]
+        }
+
+    ## 검색 색인 저장 (다음 시작 때 다시 만들지 않도록)
+    def save_search_index(self):
+        self.collection.save_index("text")
+    
     ## 사용자 ID로 특정 회원 게시글 검색
     def find_by_user_id(self, user_id: int) -> List[dict]:
         posts = self._read_all()
-        return [post for post in posts if post['user_id'] == user_id]
+        return [self._present(post) for post in posts if post['user_id'] == user_id]
     
-    ## 게시글 생성
+    ## 게시글 생성 (업로드가 잡아 둔 이미지 참조를 넘겨받고, 복사한 작성자 프로필 이미지 참조를 잡는다)
     def create(self, post_data: dict) -> dict:
-        posts = self._read_all()
-        post_data['id'] = self.get_next_id()
-        posts.append(post_data)
-        self._write_all(posts)
-        return post_data
+        blob_model.acquire(post_data.get('author_profile_image'))
+        try:
+            post = self.collection.insert(post_data)
+        except BaseException:
+            blob_model.release_many([post_data.get('image_url'), post_data.get('author_profile_image')])
+            raise
+        return self._present(post)
     
-    ## 게시글 수정
+    ## 게시글 수정 (업로드가 잡아 둔 새 이미지 참조를 넘겨받는다)
     def update(self, post_id: int, updates: dict) -> Optional[dict]:
-        posts = self._read_all()
-        post = next((p for p in posts if p['id'] == post_id), None)
-        if not post:
-            return None
-        post.update(updates)
-        self._write_all(posts)
-        return post
+        try:
+            previous, post = self.collection.update_with_previous(post_id, updates)
+        except BaseException:
+            blob_model.release(updates.get('image_url'))
+            raise
+        if 'image_url' in updates:
+            # 반영됐으면 이전 이미지, 게시글이 없으면 새 이미지 참조 해제
+            blob_model.release(previous.get('image_url') if post else updates['image_url'])
+        return self._present(post)
     
-    ## 게시글 삭제
+    ## 게시글 삭제 (댓글, 좋아요, 이미지 참조도 각각 저장소 쓰기 한 번으로 정리)
     def delete(self, post_id: int) -> bool:
-        posts = self._read_all()
-        original_length = len(posts)
-        posts = [p for p in posts if p['id'] != post_id]
-        if len(posts) < original_length:
-            self._write_all(posts)
-            return True
-        return False
+        if self.collection.get(post_id) is None:
+            return False
+        # 실제로 지운 레코드 기준으로 정리한다 (그 사이 다른 요청이 지웠거나 이미지를 바꿨을 수 있다)
+        deleted = self.collection.delete_many([post_id])
+        if not deleted:
+            return False
+        self.counters.discard(post_id)
+        self.likes.delete_post(post_id)
+        comment_model.delete_by_post_id(post_id)
+        blob_model.release_many([deleted[0].get('image_url'), deleted[0].get('author_profile_image')])
+        return True
     
+    ## 댓글 수 증감 (증분이라 동시에 여러 댓글이 달려도 순서와 무관하게 맞는다)
+    def increment_comment_count(self, post_id: int, delta: int = 1) -> bool:
+        if not self.collection.get(post_id):
+            return False
+        self.counters.add(post_id, 'comments_count', delta)
+        return True
+
     ## 좋아요
     def add_like(self, post_id: int, user_id: int) -> bool:
-        post = self.find_by_id(post_id)
-        if not post:
+        if not self.collection.get(post_id):
             return False
-    
-        like_users = post.get('like_users', [])
-        if user_id in like_users:
-            return False  # 이미 좋아요 누름
-    
-        like_users.append(user_id)
-        self.update(post_id, {
-            'like_users': like_users,
-            'likes': len(like_users)
-        })
-        return True
+        return self.likes.set_liked(post_id, user_id, True)
 
     ## 좋아요 취소
     def remove_like(self, post_id: int, user_id: int) -> bool:
-        post = self.find_by_id(post_id)
-        if not post:
+        if not self.collection.get(post_id):
             return False
-    
-        like_users = post.get('like_users', [])
-        if user_id not in like_users:
-            return False  # 좋아요 안 누름
-    
-        like_users.remove(user_id)
-        self.update(post_id, {
-            'like_users': like_users,
-            'likes': len(like_users)
-        })
-        return True
+        return self.likes.set_liked(post_id, user_id, False)
 
-    ## 조회 수 증가
+    ## 좋아요 토글 -> (좋아요 상태, 좋아요 수)
+    def toggle_like(self, post_id: int, user_id: int):
+        return self.likes.toggle(post_id, user_id)
+
+    ## 게시글에 박혀 있던 like_users 를 좋아요 저장소로 옮기기
+    def migrate_like_users(self):
+        posts = [post for post in self._read_all() if 'like_users' in post]
+        if not posts:
+            return
+        self.likes.import_likes({post['id']: post['like_users'] for post in posts})
+        self.collection.replace_many([
+            {key: value for key, value in post.items() if key != 'like_users'} for post in posts
+        ])
+
+    ## 조회 수 증가 (버퍼에 모았다가 일괄 저장)
     def increment_view_count(self, post_id: int) -> bool:
-        post = self.find_by_id(post_id)
-        if not post:
+        if not self.collection.get(post_id):
             return False
     
-        current_views = post.get('view_count', 0)
-        self.update(post_id, {'view_count': current_views + 1})
+        self.counters.add(post_id, 'view_count')
         return True
 
-post_model = PostModel()
\ No newline at end of file
+post_model = PostModel()
+
+# 라우트/컨트롤러용 비동기 모델 (스레드 풀에서 실행)
+async_post_model = AsyncModel(post_model, writes=(
+    "create", "update", "delete", "add_like", "remove_like", "toggle_like",
+    "increment_view_count", "increment_comment_count", "migrate_like_users"
+))
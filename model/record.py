@@ -0,0 +1,180 @@
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Tuple, Type
+
+# 빠진 필드 표시 (슬롯 값)
+_MISSING = object()
+
+# 빠진 필드 집합 -> 이름 튜플 (같은 필드가 빠진 레코드끼리 튜플 하나를 공유한다)
+_absent_names: Dict[FrozenSet[str], Tuple[str, ...]] = {}
+
+class Record:
+    """__slots__ 기반 레코드 (게시글/댓글/사용자 한 행)
+
+    레코드마다 키 문자열을 들고 있는 dict 대신 클래스에 정한 필드를 슬롯에 담는다.
+    FIELDS 에 없는 필드는 _extra dict 에 두고, 빠진 필드는 슬롯에 _MISSING 을 넣고 _absent 에 이름을 모아
+    dict 와 같은 키 집합을 그대로 유지한다. 여러 레코드가 같은 값을 갖는 문자열 필드(INTERNED)는
+    sys.intern 으로 한 객체를 공유한다. 읽기는 dict 와 같은 매핑 인터페이스(레코드["필드"], get, in)로 하고,
+    응답/저장용 dict 는 to_dict() 로 만든다.
+    발행된 레코드는 바꾸지 않는다 (수정은 새 레코드로 교체).
+    """
+
+    __slots__ = ("_extra", "_absent")
+
+    # 슬롯에 담는 필드 (to_dict 키 순서)
+    FIELDS: Tuple[str, ...] = ()
+    # 같은 값이 반복되는 문자열 필드 (intern)
+    INTERNED: FrozenSet[str] = frozenset()
+    _field_set: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+
+    ## dict -> 레코드 (반복 문자열은 intern)
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Record":
+        record = object.__new__(cls)
+        interned = cls.INTERNED
+        for name in cls.FIELDS:
+            value = data.get(name, _MISSING)
+            if name in interned and type(value) is str:
+                value = sys.intern(value)
+            setattr(record, name, value)
+        fields = cls._field_set
+        keys = data.keys()
+        if keys == fields:
+            record._extra = record._absent = None
+        else:
+            record._extra = None if keys <= fields else {key: data[key] for key in keys - fields}
+            absent = fields.difference(keys)
+            record._absent = _absent_names.setdefault(absent, tuple(absent)) if absent else None
+        return record
+
+    ## 레코드 -> 새 dict (응답/저장용)
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        if self._absent is not None:
+            for name in self._absent:
+                del data[name]
+        if self._extra is not None:
+            data.update(self._extra)
+        return data
+
+    def __getitem__(self, key: str):
+        if key in self._field_set:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __contains__(self, key) -> bool:
+        if key in self._field_set:
+            return getattr(self, key) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        absent = self._absent or ()
+        for name in self.FIELDS:
+            if name not in absent:
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __len__(self) -> int:
+        return (len(self.FIELDS) - len(self._absent or ())
+                + (len(self._extra) if self._extra is not None else 0))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+# isinstance(레코드, Mapping) 은 참이지만 ABC 를 상속하지 않으므로 isinstance(레코드, Record) 가 빠르다
+Mapping.register(Record)
+
+
+class Post(Record):
+    """게시글 레코드"""
+
+    FIELDS = ("id", "title", "content", "image_url", "image_variants", "user_id",
+              "author_nickname", "author_profile_image", "created_at", "updated_at",
+              "likes", "comments_count", "view_count", "version")
+    INTERNED = frozenset(("author_nickname", "author_profile_image"))
+    __slots__ = FIELDS
+
+
+class Comment(Record):
+    """댓글 레코드"""
+
+    FIELDS = ("id", "post_id", "user_id", "author_nickname", "author_profile_image",
+              "content", "created_at", "updated_at", "version")
+    INTERNED = frozenset(("author_nickname", "author_profile_image"))
+    __slots__ = FIELDS
+
+
+class User(Record):
+    """사용자 레코드"""
+
+    FIELDS = ("id", "email", "password", "nickname", "profile_image_url",
+              "profile_image_variants", "created_at", "version")
+    INTERNED = frozenset(("profile_image_url",))
+    __slots__ = FIELDS
+
+
+## 레코드(또는 dict) -> 새 dict (응답용, 바꿔도 저장된 레코드에 영향이 없다)
+def as_dict(record: Optional[Mapping]) -> Optional[dict]:
+    if record is None:
+        return None
+    if type(record) is dict:
+        return dict(record)
+    return record.to_dict()
+
+# 응답에 내보내지 않는 필드 (레코드 버전은 ETag 계산에만 쓴다)
+HIDDEN_FIELDS = ("version",)
+
+## 레코드 -> 응답용 새 dict (HIDDEN_FIELDS 제외)
+def public_dict(record: Optional[Mapping]) -> Optional[dict]:
+    data = as_dict(record)
+    if data is not None:
+        for field in HIDDEN_FIELDS:
+            data.pop(field, None)
+    return data
+
+## JSON 직렬화 default 훅 (json.dumps/orjson.dumps/msgpack.packb 의 default=)
+def encode_record(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+## 레코드 타입으로 변환 (record_type 이 없거나 이미 변환됐으면 그대로)
+def convert(record: dict, record_type: Optional[Type[Record]]):
+    if record_type is None or type(record) is record_type:
+        return record
+    return record_type.from_dict(record)
@@ -0,0 +1,429 @@
+import copy
+import json
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from model.cow import ChunkedMap
+
+# 단어 (한글/영문/숫자)
+WORD_RE = re.compile(r"\w+")
+
+# 저장 파일 형식 버전 (바뀌면 저장된 색인을 버리고 새로 만든다)
+SNAPSHOT_VERSION = 3
+
+# 저장 파일 머리: 매직, JSON 메타데이터 길이
+SNAPSHOT_MAGIC = b"FWSRCH1\0"
+SNAPSHOT_HEADER = struct.Struct("<8sI")
+
+# 한 문서 안 같은 n-gram 빈도 상한 (array('H'))
+MAX_TF = 0xFFFF
+
+## 문자 n-gram 토큰 (n 글자보다 짧은 단어는 단어 그대로)
+def tokenize(text: str, n: int = 2) -> List[str]:
+    grams = []
+    for word in WORD_RE.findall(text.lower()):
+        if len(word) <= n:
+            grams.append(word)
+        else:
+            grams += [word[i:i + n] for i in range(len(word) - n + 1)]
+    return grams
+
+## 색인할 토큰 (n-gram + 글자 하나짜리 토큰: n 글자보다 짧은 검색어도 그 글자가 든 문서를 찾는다)
+def index_terms(text: str, n: int = 2) -> List[str]:
+    grams = tokenize(text, n)
+    if n > 1:
+        for word in WORD_RE.findall(text.lower()):
+            # 한 글자 단어는 tokenize 가 이미 그대로 넣었다
+            if len(word) > 1:
+                grams.extend(word)
+    return grams
+
+## 샤드별 검색 통계 합치기 -> (문서 수, 전체 길이, {토큰: 문서 빈도})
+def combine_stats(stats: Iterable[Tuple[int, int, Dict[str, int]]]) -> Tuple[int, int, Dict[str, int]]:
+    doc_count, total_length, frequencies = 0, 0, Counter()
+    for count, length, shard_frequencies in stats:
+        doc_count += count
+        total_length += length
+        frequencies.update(shard_frequencies)
+    return doc_count, total_length, dict(frequencies)
+
+class TextIndex:
+    """여러 텍스트 필드에 대한 문자 n-gram 역색인 (BM25 순위)
+
+    Collection 인덱스로 등록하면 insert/update/delete 때 바뀐 문서만 다시 색인한다.
+    검색은 모든 n-gram 을 포함하는 문서만 고르고(가장 드문 n-gram 부터 교집합),
+    후보만 BM25 로 점수를 매기므로 비용은 가장 드문 n-gram 의 문서 수에 비례한다.
+    글자 하나도 토큰으로 색인하므로 "맛" 처럼 n 글자보다 짧은 검색어도 찾는다.
+    샤드로 나눈 컬렉션은 stats() 를 합쳐 top() 에 넘기면 모든 샤드가 같은 IDF/평균 길이로 점수를 매긴다.
+
+    fork() 한 다음 버전은 색인 구조를 공유하고, 바꾸는 n-gram 의 문서 목록만 복사한다.
+
+    색인은 save() 로 파일에 저장해 두면 다음 시작 때 문서 내용의 crc32 가
+    모두 같을 경우 다시 만들지 않고 그대로 읽는다. 파일은 JSON 메타데이터(설정, n-gram 목록)와
+    리틀 엔디언 정수 배열(문서 id/crc32/길이, n-gram 별 문서 수, 문서 id, 빈도)로만 되어 있고,
+    읽다가 형식이 맞지 않으면 색인을 새로 만든다.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], name: str = "text", n: int = 2,
+                 path: Optional[Path] = None, k1: float = 1.2, b: float = 0.75):
+        self.field = name
+        self.fields = fields
+        self.n = n
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # n-gram -> (정렬된 문서 id, 같은 위치의 빈도)
+        self._postings: ChunkedMap = ChunkedMap()
+        # 이 버전이 만든(복사한) 문서 목록의 n-gram - 이 목록만 제자리에서 바꿀 수 있다
+        self._owned = set()
+        # 문서 id -> (필드 값들, n-gram 수) - 값은 레코드의 문자열을 그대로 참조한다
+        self._docs: ChunkedMap = ChunkedMap()
+        self._total_length = 0
+        self._built = False
+
+    ## 다음 버전용 복사본 (문서 목록은 처음 바꿀 때 복사)
+    def fork(self) -> "TextIndex":
+        forked = copy.copy(self)
+        forked._postings = self._postings.fork()
+        forked._owned = set()
+        forked._docs = self._docs.fork()
+        return forked
+
+    def _values(self, record: dict) -> tuple:
+        return tuple(record.get(field) or "" for field in self.fields)
+
+    def _grams(self, values: tuple) -> List[str]:
+        # 필드 경계를 넘는 n-gram 이 생기지 않도록 필드별로 자른다
+        grams = []
+        for value in values:
+            grams.extend(index_terms(value, self.n))
+        return grams
+
+    ## 전체 색인 (처음에는 저장된 색인을, 다시 읽을 때는 바뀐 문서만 반영)
+    def rebuild(self, records: Iterable[dict]):
+        records = list(records)
+        if not self._built:
+            self._built = True
+            if self._restore(records):
+                return
+        if not self._docs:
+            # 처음 만들 때는 일반 dict 에 쌓은 뒤 바꾼다 (n-gram 마다 ChunkedMap 을 거치지 않는다)
+            self._postings, self._docs = {}, {}
+            for record in records:
+                self._index(record["id"], self._values(record))
+            self._postings = ChunkedMap(self._postings.items())
+            self._docs = ChunkedMap(self._docs.items())
+            return
+        seen = set()
+        for record in records:
+            record_id = record["id"]
+            seen.add(record_id)
+            values = self._values(record)
+            doc = self._docs.get(record_id)
+            if doc is None:
+                self._index(record_id, values)
+            elif doc[0] != values:
+                self._reindex(record_id, values)
+            else:
+                # 내용이 같으면 새 레코드의 문자열을 참조해 이전 레코드가 해제되게 한다
+                self._docs[record_id] = (values, doc[1])
+        for record_id in [record_id for record_id in self._docs if record_id not in seen]:
+            self._unindex(record_id)
+
+    def check(self, record: dict):
+        pass
+
+    def add(self, record: dict):
+        if record["id"] in self._docs:
+            self._reindex(record["id"], self._values(record))
+        else:
+            self._index(record["id"], self._values(record))
+
+    def remove(self, record: dict):
+        self._unindex(record["id"])
+
+    ## 수정된 레코드 다시 색인
+    def replace(self, old: dict, record: dict):
+        self.add(record)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    ## 바꿀 수 있는 문서 목록 (공유 중이면 복사, 없으면 None)
+    def _writable(self, term: str) -> Optional[Tuple[array, array]]:
+        posting = self._postings.get(term)
+        if posting is None or term in self._owned:
+            return posting
+        posting = self._postings[term] = (posting[0][:], posting[1][:])
+        self._owned.add(term)
+        return posting
+
+    ## 문서 색인
+    def _index(self, record_id: int, values: tuple):
+        grams = self._grams(values)
+        postings = self._postings
+        owned = self._owned
+        for term, tf in Counter(grams).items():
+            if tf > MAX_TF:
+                tf = MAX_TF
+            posting = postings.get(term)
+            if posting is None:
+                postings[term] = (array("I", (record_id,)), array("H", (tf,)))
+                owned.add(term)
+                continue
+            if term not in owned:
+                # 이전 버전과 공유 중인 목록은 복사해서 바꾼다 (_writable 을 거치지 않는 빠른 경로)
+                posting = postings[term] = (posting[0][:], posting[1][:])
+                owned.add(term)
+            ids, tfs = posting
+            if ids[-1] < record_id:
+                # 새 글은 id 가 가장 크므로 보통 끝에 붙는다
+                ids.append(record_id)
+                tfs.append(tf)
+            else:
+                i = bisect_left(ids, record_id)
+                ids.insert(i, record_id)
+                tfs.insert(i, tf)
+        self._docs[record_id] = (values, len(grams))
+        self._total_length += len(grams)
+
+    ## 문서 다시 색인 (빈도가 바뀐 n-gram 의 문서 목록만 고친다)
+    def _reindex(self, record_id: int, values: tuple):
+        old_values, old_length = self._docs[record_id]
+        old = Counter(self._grams(old_values))
+        grams = self._grams(values)
+        for term in old.keys() - set(grams):
+            ids, tfs = self._writable(term)
+            i = bisect_left(ids, record_id)
+            del ids[i]
+            del tfs[i]
+            if not ids:
+                del self._postings[term]
+                self._owned.discard(term)
+        for term, tf in Counter(grams).items():
+            tf = min(tf, MAX_TF)
+            if term in old:
+                if min(old[term], MAX_TF) == tf:
+                    continue
+                ids, tfs = self._writable(term)
+                tfs[bisect_left(ids, record_id)] = tf
+                continue
+            posting = self._writable(term)
+            if posting is None:
+                self._postings[term] = (array("I", (record_id,)), array("H", (tf,)))
+                self._owned.add(term)
+                continue
+            ids, tfs = posting
+            i = bisect_left(ids, record_id)
+            ids.insert(i, record_id)
+            tfs.insert(i, tf)
+        self._docs[record_id] = (values, len(grams))
+        self._total_length += len(grams) - old_length
+
+    ## 문서 색인 제거 (색인할 때의 값으로 n-gram 을 다시 만든다)
+    def _unindex(self, record_id: int):
+        doc = self._docs.pop(record_id, None)
+        if doc is None:
+            return
+        values, length = doc
+        self._total_length -= length
+        for term in set(self._grams(values)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            i = bisect_left(posting[0], record_id)
+            if i < len(posting[0]) and posting[0][i] == record_id:
+                ids, tfs = self._writable(term)
+                del ids[i]
+                del tfs[i]
+                if not ids:
+                    del self._postings[term]
+                    self._owned.discard(term)
+
+    ## 검색 -> (점수순 문서 id 목록, 전체 일치 수)
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> Tuple[List[int], int]:
+        top, total = self.top(query, skip + limit)
+        return [record_id for _, record_id in top[skip:]], total
+
+    ## 검색어 통계 -> (문서 수, 전체 길이, {토큰: 문서 빈도}) (샤드 통계를 합칠 때 쓴다)
+    def stats(self, query: str) -> Tuple[int, int, Dict[str, int]]:
+        frequencies = {}
+        for term in set(tokenize(query, self.n)):
+            posting = self._postings.get(term)
+            frequencies[term] = len(posting[0]) if posting is not None else 0
+        return len(self._docs), self._total_length, frequencies
+
+    ## 점수 상위 count 개 -> ([(점수, 문서 id)], 전체 일치 수)
+    ## (stats: combine_stats 로 합친 전체 통계, 없으면 이 색인의 통계)
+    def top(self, query: str, count: int,
+            stats: Optional[Tuple[int, int, Dict[str, int]]] = None) -> Tuple[List[Tuple[float, int]], int]:
+        terms = set(tokenize(query, self.n))
+        if not terms or not self._docs:
+            return [], 0
+        postings = []
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                return [], 0
+            postings.append((term, posting))
+        postings.sort(key=lambda item: len(item[1][0]))
+
+        if stats is None:
+            doc_count, total_length = len(self._docs), self._total_length
+            frequencies = {term: len(ids) for term, (ids, _) in postings}
+        else:
+            doc_count, total_length, frequencies = stats
+        average_length = total_length / doc_count or 1
+        k1, b = self.k1, self.b
+        idfs = [math.log(1 + (doc_count - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+                for term, _ in postings]
+        postings = [posting for _, posting in postings]
+        docs = self._docs
+
+        scored = []
+        (first_ids, first_tfs), rest = postings[0], postings[1:]
+        for position, record_id in enumerate(first_ids):
+            norm = k1 * (1 - b + b * docs[record_id][1] / average_length)
+            tf = first_tfs[position]
+            score = idfs[0] * tf * (k1 + 1) / (tf + norm)
+            for idf, (ids, tfs) in zip(idfs[1:], rest):
+                i = bisect_left(ids, record_id)
+                if i == len(ids) or ids[i] != record_id:
+                    break
+                tf = tfs[i]
+                score += idf * tf * (k1 + 1) / (tf + norm)
+            else:
+                scored.append((score, record_id))
+        # 점수가 같으면 최신(id 가 큰) 글 먼저
+        return nlargest(count, scored), len(scored)
+
+    ## 색인 저장 (문서 내용 crc32 와 함께)
+    def save(self):
+        if self.path is None or not self._built:
+            return
+        doc_ids, checksums, lengths = array("I"), array("I"), array("I")
+        for record_id, (values, length) in self._docs.items():
+            doc_ids.append(record_id)
+            checksums.append(_checksum(values))
+            lengths.append(length)
+        terms, counts, ids_all, tfs_all = [], array("I"), array("I"), array("H")
+        for term, (ids, tfs) in self._postings.items():
+            terms.append(term)
+            counts.append(len(ids))
+            ids_all.extend(ids)
+            tfs_all.extend(tfs)
+        meta = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "n": self.n,
+            "fields": self.fields,
+            "itemsizes": [array("I").itemsize, array("H").itemsize],
+            "docs": len(doc_ids),
+            "terms": terms,
+            "postings": len(ids_all),
+        }, ensure_ascii=False).encode("utf-8")
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(meta)))
+            f.write(meta)
+            for values in (doc_ids, checksums, lengths, counts, ids_all, tfs_all):
+                if sys.byteorder != "little":
+                    values.byteswap()
+                f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    ## 저장된 색인 읽기 (문서 구성과 내용이 모두 같을 때만 사용)
+    def _restore(self, records: List[dict]) -> bool:
+        if self.path is None:
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        try:
+            snapshot = _read_snapshot(data)
+        except (ValueError, KeyError, TypeError, struct.error):
+            # 손상됐거나 이전 형식의 파일이면 새로 만든다
+            return False
+        if (snapshot["version"] != SNAPSHOT_VERSION or snapshot["n"] != self.n
+                or tuple(snapshot["fields"]) != self.fields):
+            return False
+        saved = snapshot["docs"]
+        if len(saved) != len(records):
+            return False
+        docs = {}
+        for record in records:
+            entry = saved.get(record["id"])
+            values = self._values(record)
+            if entry is None or entry[0] != _checksum(values):
+                return False
+            docs[record["id"]] = (values, entry[1])
+
+        postings = snapshot["postings"]
+        self._docs = ChunkedMap(docs.items())
+        self._postings = ChunkedMap(postings.items())
+        self._owned = set(postings)
+        self._total_length = sum(length for _, length in docs.values())
+        return True
+
+## 저장 파일 바이트 -> {version, n, fields, docs: {id: (crc32, 길이)}, postings: {n-gram: (문서 id, 빈도)}}
+## (형식이 맞지 않으면 ValueError 등)
+def _read_snapshot(data: bytes) -> dict:
+    magic, meta_length = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("검색 색인 파일이 아닙니다")
+    offset = SNAPSHOT_HEADER.size + meta_length
+    meta = json.loads(data[SNAPSHOT_HEADER.size:offset])
+    if meta["itemsizes"] != [array("I").itemsize, array("H").itemsize]:
+        raise ValueError("정수 크기가 다른 플랫폼에서 저장된 색인입니다")
+    terms = meta["terms"]
+    doc_count, posting_count = meta["docs"], meta["postings"]
+    arrays = []
+    for typecode, count in (("I", doc_count), ("I", doc_count), ("I", doc_count),
+                            ("I", len(terms)), ("I", posting_count), ("H", posting_count)):
+        values = array(typecode)
+        end = offset + count * values.itemsize
+        if end > len(data):
+            raise ValueError("검색 색인 파일이 잘렸습니다")
+        values.frombytes(data[offset:end])
+        if sys.byteorder != "little":
+            values.byteswap()
+        arrays.append(values)
+        offset = end
+    if offset != len(data):
+        raise ValueError("검색 색인 파일 길이가 맞지 않습니다")
+    doc_ids, checksums, lengths, counts, ids_all, tfs_all = arrays
+    if sum(counts) != posting_count:
+        raise ValueError("검색 색인 문서 목록 길이가 맞지 않습니다")
+    postings = {}
+    start = 0
+    for term, count in zip(terms, counts):
+        postings[term] = (ids_all[start:start + count], tfs_all[start:start + count])
+        start += count
+    return {
+        "version": meta["version"],
+        "n": meta["n"],
+        "fields": meta["fields"],
+        "docs": {record_id: (checksum, length) for record_id, checksum, length in zip(doc_ids, checksums, lengths)},
+        "postings": postings,
+    }
+
+## 필드 값들의 crc32
+def _checksum(values: tuple) -> int:
+    crc = 0
+    for value in values:
+        crc = zlib.crc32(value.encode("utf-8") + b"\0", crc)
+    return crc
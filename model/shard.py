@@ -0,0 +1,289 @@
+import copy
+import json
+from heapq import merge, nlargest
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from core.config import DATA_DIR, STORAGE_ENGINE, SHARDS, SHARD_BLOCK
+from model.collection import Collection
+from model.index import UniqueIndex, GroupIndex, SortedIndex
+from model.record import Record
+from model.search import TextIndex, combine_stats
+from model.snapshot import LazyRecords
+from model.storage import FileLock, GenerationCounter, create_storage, write_json_atomic
+
+## 샤드 구성에 따른 저장소 이름 (1개면 샤드 없이 원래 이름)
+def shard_names(name: str, count: int) -> List[str]:
+    return [name] if count <= 1 else [f"{name}.{i}" for i in range(count)]
+
+## 샤드 키 값 -> 샤드 번호 (block 개 단위 구간을 count 개 샤드에 돌아가며 배치)
+def shard_index(value: int, count: int, block: int) -> int:
+    return (value // block) % count if count > 1 else 0
+
+## 저장된 샤드 구성 (data/{name}.shards, 없으면 샤드 없음)
+def read_layout(name: str) -> dict:
+    path = DATA_DIR / f"{name}.shards"
+    if not path.exists():
+        return {"count": 1}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+## 샤드 구성이 설정과 다르면 레코드를 새 샤드로 옮긴다 (처음 나눌 때, 샤드 수를 바꿨을 때)
+##  새 샤드에 모두 쓴 다음에 옛 샤드에서 지우므로 도중에 멈춰도 다음 시작 때 이어서 옮긴다
+def reshard(name: str, field: str, count: int, block: int):
+    layout = {"count": count, "block": block, "field": field} if count > 1 else {"count": 1}
+    with FileLock(DATA_DIR / f"{name}.shards.lock")():
+        current = read_layout(name)
+        if current == layout:
+            return
+        old_names = shard_names(name, current["count"])
+        new_names = shard_names(name, count)
+        storages = {source: create_storage(source) for source in dict.fromkeys(old_names + new_names)}
+        records = {}
+        for storage in storages.values():
+            for record in _loaded_records(storage):
+                records[record["id"]] = record
+
+        groups: Dict[str, Dict[int, dict]] = {source: {} for source in storages}
+        for record in records.values():
+            groups[new_names[shard_index(record[field], count, block)]][record["id"]] = record
+        for source in new_names:
+            storage, group = storages[source], groups[source]
+            if group:
+                with storage.lock():
+                    storage.replace_many(list(group.values()), group)
+                    storage.generation.bump()
+        for source, storage in storages.items():
+            group = groups[source]
+            stale = [record["id"] for record in _loaded_records(storage) if record["id"] not in group]
+            if stale:
+                with storage.lock():
+                    storage.delete_many(stale, group)
+                    storage.generation.bump()
+
+        # 샤드 없이 쓰는 동안 발급된 id 도 공유 카운터가 다시 내주지 않게 한다
+        with FileLock(DATA_DIR / f"{name}.ids.lock")():
+            GenerationCounter(DATA_DIR / f"{name}.ids").advance(max(records, default=0))
+
+        path = DATA_DIR / f"{name}.shards"
+        if count > 1:
+            write_json_atomic(path, layout)
+        elif path.exists():
+            path.unlink()
+
+## 저장소의 모든 레코드 (binary 엔진은 지연 매핑을 돌려준다)
+def _loaded_records(storage) -> Iterable[dict]:
+    loaded = storage.load()
+    return loaded.values() if isinstance(loaded, LazyRecords) else loaded
+
+## 설정(SHARDS)에 따라 컬렉션 생성 (샤드가 1개거나 sqlite 엔진이면 일반 Collection)
+def create_collection(name: str, shard_field: str = "id", shards: int = SHARDS,
+                      block: int = SHARD_BLOCK, record_type: Optional[Type[Record]] = None
+                      ) -> Union[Collection, "ShardedCollection"]:
+    if STORAGE_ENGINE == "sqlite":
+        return Collection(name, record_type=record_type)
+    reshard(name, shard_field, shards, block)
+    if shards <= 1:
+        return Collection(name, record_type=record_type)
+    return ShardedCollection(name, shard_field, shards, block, record_type)
+
+
+class ShardedCollection:
+    """샤드 키 구간별로 나눈 여러 Collection 을 하나처럼 쓰는 컬렉션
+
+    샤드마다 저장 파일(data/{name}.{i}.json 등), 파일 잠금, 세대 번호, 인덱스가 따로 있으므로
+    한 레코드의 쓰기는 그 샤드 파일만 다시 쓰고, 다른 샤드의 쓰기와는 워커 사이에서도 동시에 진행된다.
+    다른 워커가 쓴 샤드만 다시 읽는다. 여러 샤드에 걸친 조회(페이지, 검색, 그룹)는 샤드별 결과를
+    필요한 만큼만 받아서 정렬 순서대로 합친다. id 는 data/{name}.ids 공유 카운터로 발급한다.
+    """
+
+    def __init__(self, name: str, shard_field: str, shards: int, block: int = SHARD_BLOCK,
+                 record_type: Optional[Type[Record]] = None):
+        self.name = name
+        self.shard_field = shard_field
+        self.block = block
+        self.db_path = DATA_DIR / f"{name}.shards"
+        self.shards = [Collection(source, record_type=record_type) for source in shard_names(name, shards)]
+        # 필드 -> 원본 인덱스 (샤드마다 복사본을 등록한다)
+        self.indexes: Dict[str, Union[UniqueIndex, GroupIndex, SortedIndex, TextIndex]] = {}
+        self._ids = GenerationCounter(DATA_DIR / f"{name}.ids")
+        self._ids_lock = FileLock(DATA_DIR / f"{name}.ids.lock")
+        self._ids_synced = False
+
+    ## 보조 인덱스 등록 (샤드마다 복사본, 저장 파일도 샤드별로)
+    def add_index(self, index: Union[UniqueIndex, GroupIndex, SortedIndex, TextIndex]):
+        if isinstance(index, UniqueIndex) and index.field != self.shard_field:
+            raise ValueError(f"샤드 컬렉션의 유니크 인덱스는 샤드 키에만 걸 수 있습니다: {index.field}")
+        self.indexes[index.field] = index
+        for shard in self.shards:
+            replica = copy.deepcopy(index)
+            if getattr(replica, "path", None) is not None:
+                replica.path = replica.path.with_name(f"{shard.name}{replica.path.suffix}")
+            shard.add_index(replica)
+
+    ## 샤드 키 값의 샤드
+    def _shard_for(self, value: int) -> Collection:
+        return self.shards[shard_index(value, len(self.shards), self.block)]
+
+    ## id 가 있는 샤드 (샤드 키가 id 가 아니면 샤드마다 찾아본다)
+    def _locate(self, record_id: int) -> Optional[Collection]:
+        if self.shard_field == "id":
+            return self._shard_for(record_id)
+        for shard in self.shards:
+            if shard.get(record_id) is not None:
+                return shard
+        return None
+
+    ## id 목록을 샤드별로 나누기 (없는 id는 건너뜀)
+    def _group(self, record_ids) -> Dict[Collection, List[int]]:
+        groups = {}
+        for record_id in record_ids:
+            shard = self._locate(record_id)
+            if shard is not None:
+                groups.setdefault(shard, []).append(record_id)
+        return groups
+
+    ## 모든 레코드
+    def all(self) -> List[dict]:
+        return list(chain.from_iterable(shard.all() for shard in self.shards))
+
+    ## id로 레코드 찾기
+    def get(self, record_id: int) -> Optional[dict]:
+        shard = self._locate(record_id)
+        return shard.get(record_id) if shard is not None else None
+
+    ## 인덱스 필드 값으로 레코드 찾기
+    def find_one(self, field: str, value) -> Optional[dict]:
+        if field == self.shard_field:
+            return self._shard_for(value).find_one(field, value)
+        for shard in self.shards:
+            record = shard.find_one(field, value)
+            if record is not None:
+                return record
+        return None
+
+    ## 그룹 인덱스로 레코드 목록 찾기 (샤드 키면 한 샤드, 아니면 정렬 순서대로 합친다)
+    def find_many(self, field: str, value, reverse: bool = False) -> List[dict]:
+        if field == self.shard_field:
+            return self._shard_for(value).find_many(field, value, reverse)
+        order_by = self.indexes[field].order_by
+        return list(merge(*(shard.find_many(field, value, reverse) for shard in self.shards),
+                          key=lambda record: (record.get(order_by), record["id"]), reverse=reverse))
+
+    ## 그룹 인덱스로 개수 세기
+    def count(self, field: str, value) -> int:
+        if field == self.shard_field:
+            return self._shard_for(value).count(field, value)
+        return sum(shard.count(field, value) for shard in self.shards)
+
+    ## 정렬 인덱스로 최신순 페이지 조회 -> (레코드 목록, 다음 페이지 정렬 키)
+    ##  샤드마다 skip + limit + 1 개까지만 받아서 최신순으로 합친다
+    def page(self, field: str, skip: int = 0, limit: int = 20, after=None):
+        skip, limit = max(skip, 0), max(limit, 0)
+        pages = [shard.page(field, 0, skip + limit + 1, after)[0] for shard in self.shards]
+        merged = list(islice(merge(*pages, key=lambda record: (record.get(field), record["id"]), reverse=True),
+                             skip + limit + 1))
+        records = merged[skip:skip + limit]
+        next_entry = None
+        if records and len(merged) > skip + limit:
+            next_entry = (records[-1].get(field), records[-1]["id"])
+        return records, next_entry
+
+    ## 전문 검색 -> (점수순 레코드 목록, 전체 일치 수)
+    ##  점수는 모든 샤드를 합친 통계(문서 수, 평균 길이, 문서 빈도)로 매긴다
+    def search(self, field: str, query: str, skip: int = 0, limit: int = 20):
+        # 샤드마다 따로 계산한 IDF/평균 길이로는 점수를 비교할 수 없으므로 전체 통계를 먼저 합친다
+        stats = combine_stats(shard.search_stats(field, query) for shard in self.shards)
+        results = [shard.search_top(field, query, skip + limit, stats) for shard in self.shards]
+        top = nlargest(skip + limit, chain.from_iterable(scored for scored, _ in results),
+                       key=lambda item: (item[0], item[1]["id"]))
+        return [record for _, record in top[skip:]], sum(total for _, total in results)
+
+    ## 인덱스를 파일에 저장
+    def save_index(self, field: str):
+        for shard in self.shards:
+            shard.save_index(field)
+
+    ## 전체 레코드 수
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    ## 다음 id (발급하지는 않는다)
+    def next_id(self) -> int:
+        with self._ids_lock():
+            return self._synced_ids() + 1
+
+    ## 공유 카운터를 적어도 샤드들의 최대 id 로 맞추기 (프로세스마다 처음 한 번, _ids_lock 안에서 호출)
+    def _synced_ids(self) -> int:
+        if not self._ids_synced:
+            self._ids.advance(max(shard.next_id() for shard in self.shards) - 1)
+            self._ids_synced = True
+        return self._ids.value()
+
+    ## id 발급
+    def _allocate_id(self) -> int:
+        with self._ids_lock():
+            self._synced_ids()
+            return self._ids.bump()
+
+    ## 레코드 추가
+    def insert(self, record: dict) -> dict:
+        record_id = self._allocate_id()
+        key = record_id if self.shard_field == "id" else record[self.shard_field]
+        return self._shard_for(key).insert(record, record_id=record_id)
+
+    ## 레코드 수정 (샤드 키는 바꿀 수 없다)
+    def update(self, record_id: int, updates: dict) -> Optional[dict]:
+        self._check_updates(updates)
+        shard = self._locate(record_id)
+        return shard.update(record_id, updates) if shard is not None else None
+
+    ## 레코드 수정 -> (수정 전 레코드, 수정된 레코드)
+    def update_with_previous(self, record_id: int, updates: dict) -> Tuple[Optional[dict], Optional[dict]]:
+        self._check_updates(updates)
+        shard = self._locate(record_id)
+        return shard.update_with_previous(record_id, updates) if shard is not None else (None, None)
+
+    def _check_updates(self, updates: dict):
+        if self.shard_field != "id" and self.shard_field in updates:
+            raise ValueError(f"샤드 키는 바꿀 수 없습니다: {self.shard_field}")
+
+    ## 여러 레코드 수정 (샤드마다 저장소 쓰기 한 번)
+    def update_many(self, changes: Dict[int, dict]) -> List[dict]:
+        for updates in changes.values():
+            self._check_updates(updates)
+        updated = []
+        for shard, record_ids in self._group(changes).items():
+            updated += shard.update_many({record_id: changes[record_id] for record_id in record_ids})
+        return updated
+
+    ## 숫자 필드에 증감값 더하기 (샤드마다 저장소 쓰기 한 번)
+    def increment_many(self, changes: Dict[int, Dict[str, int]],
+                       published: Optional[Callable[[Dict[int, Optional[int]]], None]] = None) -> List[dict]:
+        updated = []
+        for shard, record_ids in self._group(changes).items():
+            updated += shard.increment_many({record_id: changes[record_id] for record_id in record_ids}, published)
+        return updated
+
+    ## 레코드 전체 교체
+    def replace_many(self, replacements: List[dict]):
+        by_id = {record["id"]: record for record in replacements}
+        for shard, record_ids in self._group(by_id).items():
+            shard.replace_many([by_id[record_id] for record_id in record_ids])
+
+    ## 레코드 삭제
+    def delete(self, record_id: int) -> bool:
+        shard = self._locate(record_id)
+        return shard.delete(record_id) if shard is not None else False
+
+    ## 여러 레코드 삭제 (샤드마다 저장소 쓰기 한 번) -> 삭제된 레코드
+    def delete_many(self, record_ids: List[int]) -> List[dict]:
+        deleted = []
+        for shard, ids in self._group(record_ids).items():
+            deleted += shard.delete_many(ids)
+        return deleted
+
+    ## 필드 값이 같은 레코드를 모두 삭제 (샤드 키면 한 샤드만 쓴다)
+    def delete_where(self, field: str, value) -> List[dict]:
+        if field == self.shard_field:
+            return self._shard_for(value).delete_where(field, value)
+        return list(chain.from_iterable(shard.delete_where(field, value) for shard in self.shards))
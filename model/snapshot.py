@@ -0,0 +1,261 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from pathlib import Path
+from typing import Callable, Dict, Iterator, MutableMapping, Optional, Tuple
+
+from core.metrics import metrics
+from model.cow import ChunkedMap
+from model.record import encode_record
+
+try:
+    import msgpack
+except ImportError:  # msgpack 이 없으면 레코드를 JSON 으로 인코딩한다
+    msgpack = None
+
+# 파일 머리: 매직, 코덱, 레코드 수, 최대 레코드 버전, 인덱스 위치
+MAGIC = b"FWSNAP1\0"
+HEADER = struct.Struct("<8sB7xQQQ")
+# 레코드 앞의 길이
+LENGTH = struct.Struct("<I")
+
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+
+## 쓸 수 있는 가장 빠른 코덱
+def default_codec() -> int:
+    return CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+
+## 레코드 -> 바이트
+def encode(record: dict, codec: int) -> bytes:
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb(record, use_bin_type=True, default=encode_record)
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=encode_record).encode("utf-8")
+
+## 바이트 -> 레코드
+def decode(data: bytes, codec: int) -> dict:
+    if codec == CODEC_MSGPACK:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    return json.loads(data)
+
+## 파일의 고정폭 정수 배열 (파일은 리틀 엔디언)
+def _int_array(buffer, typecode: str, start: int, count: int):
+    view = memoryview(buffer)[start:start + count * 8]
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    values = array(typecode, view)
+    values.byteswap()
+    return values
+
+
+class SnapshotReader:
+    """바이너리 스냅샷 파일 (data/{name}.bin) 읽기
+
+    [머리 40바이트][레코드: 길이(u32) + 인코딩된 바이트 ...][id 배열(i64, 오름차순)][오프셋 배열(u64)]
+    파일은 mmap 으로만 열고, 레코드는 id 배열을 이분 탐색해 그 레코드의 바이트만 디코드한다.
+    디코드한 레코드는 스냅샷이 바뀌기 전까지 재사용한다 (레코드는 수정되지 않는다).
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.codec, self.count, self.max_version, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"바이너리 스냅샷이 아닙니다: {path}")
+        if self.codec == CODEC_MSGPACK and msgpack is None:
+            raise RuntimeError(f"msgpack 으로 저장된 스냅샷입니다 (pip install msgpack): {path}")
+        self.ids = _int_array(self._map, "q", index_offset, self.count)
+        self._offsets = _int_array(self._map, "Q", index_offset + self.count * 8, self.count)
+        self._decoded: Dict[int, dict] = {}
+        # 디코드한 dict -> 메모리용 레코드 (None 이면 dict 그대로)
+        self.factory: Optional[Callable[[dict], dict]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    ## id 의 인덱스 위치 (없으면 -1)
+    def position(self, record_id: int) -> int:
+        position = bisect_left(self.ids, record_id)
+        if position < self.count and self.ids[position] == record_id:
+            return position
+        return -1
+
+    def __contains__(self, record_id: int) -> bool:
+        return self.position(record_id) >= 0
+
+    ## 위치의 인코딩된 바이트
+    def raw_at(self, position: int) -> bytes:
+        offset = self._offsets[position]
+        (length,) = LENGTH.unpack_from(self._map, offset)
+        return self._map[offset + LENGTH.size:offset + LENGTH.size + length]
+
+    ## 위치의 레코드 (처음이면 디코드)
+    def record_at(self, position: int) -> dict:
+        record_id = self.ids[position]
+        record = self._decoded.get(record_id)
+        if record is None:
+            data = self.raw_at(position)
+            metrics.add_read(len(data))
+            record = decode(data, self.codec)
+            if self.factory is not None:
+                record = self.factory(record)
+            self._decoded[record_id] = record
+        return record
+
+    ## id 로 레코드 (없으면 None)
+    def get(self, record_id: int) -> Optional[dict]:
+        record = self._decoded.get(record_id)
+        if record is not None:
+            return record
+        position = self.position(record_id)
+        return self.record_at(position) if position >= 0 else None
+
+    ## 레코드 변환 함수 지정 (이미 디코드한 레코드도 변환)
+    def set_factory(self, factory: Callable[[dict], dict]):
+        # record_type.from_dict 같은 바운드 메서드는 꺼낼 때마다 새 객체라 == 로 비교한다
+        if self.factory == factory:
+            return
+        self.factory = factory
+        self._decoded = {record_id: factory(record) for record_id, record in list(self._decoded.items())}
+
+    ## 디코드해서 들고 있는 레코드 수
+    def decoded(self) -> int:
+        return len(self._decoded)
+
+
+class LazyRecords(MutableMapping[int, dict]):
+    """스냅샷 위에 바뀐 레코드만 따로 들고 있는 id -> 레코드 매핑
+
+    Collection 의 레코드 dict 자리에 그대로 쓴다. 스냅샷 레코드는 접근할 때 디코드하고,
+    로그 재생이나 쓰기로 바뀐 레코드와 지운 id 만 메모리에 둔다.
+    바뀐 레코드와 지운 id 는 ChunkedMap 이라 fork() 한 다음 버전과 구조를 공유한다.
+    """
+
+    def __init__(self, reader: Optional[SnapshotReader] = None):
+        self._reader = reader
+        self._changed = ChunkedMap()
+        # 지운 스냅샷 레코드 id -> True
+        self._deleted = ChunkedMap()
+        self._len = len(reader) if reader is not None else 0
+
+    ## 다음 버전 (바뀐 부분만 복사)
+    def fork(self) -> "LazyRecords":
+        forked = LazyRecords(self._reader)
+        forked._changed = self._changed.fork()
+        forked._deleted = self._deleted.fork()
+        forked._len = self._len
+        return forked
+
+    def __getitem__(self, record_id: int) -> dict:
+        record = self._changed.get(record_id)
+        if record is not None:
+            return record
+        if self._reader is None or record_id in self._deleted:
+            raise KeyError(record_id)
+        record = self._reader.get(record_id)
+        if record is None:
+            raise KeyError(record_id)
+        return record
+
+    def __contains__(self, record_id) -> bool:
+        if record_id in self._changed:
+            return True
+        return self._reader is not None and record_id not in self._deleted and record_id in self._reader
+
+    def __setitem__(self, record_id: int, record: dict):
+        if record_id not in self:
+            self._len += 1
+        self._changed[record_id] = record
+        if record_id in self._deleted:
+            del self._deleted[record_id]
+
+    def __delitem__(self, record_id: int):
+        if record_id not in self:
+            raise KeyError(record_id)
+        self._len -= 1
+        self._changed.pop(record_id, None)
+        if self._reader is not None and record_id in self._reader:
+            self._deleted[record_id] = True
+
+    def __len__(self) -> int:
+        return self._len
+
+    ## 스냅샷 id 순서, 그 뒤에 새로 넣은 id
+    def __iter__(self) -> Iterator[int]:
+        reader = self._reader
+        if reader is not None:
+            deleted = self._deleted
+            for record_id in reader.ids:
+                if record_id not in deleted:
+                    yield record_id
+        for record_id in self._changed:
+            if reader is None or record_id not in reader:
+                yield record_id
+
+    ## 레코드를 factory 로 변환 (로드 직후, 발행하기 전에 호출)
+    def convert(self, factory: Callable[[dict], dict]):
+        if self._reader is not None:
+            self._reader.set_factory(factory)
+        changed = self._changed
+        for record_id, record in list(changed.items()):
+            changed[record_id] = factory(record)
+
+    ## 저장된 적 있는 레코드 버전의 최댓값 (스냅샷 머리 값 + 바뀐 레코드)
+    def max_version(self) -> int:
+        base = self._reader.max_version if self._reader is not None else 0
+        return max(base, max((record.get("version", 0) for record in self._changed.values()), default=0))
+
+    ## id 순 (id, 인코딩된 바이트) - 바뀌지 않은 스냅샷 레코드는 디코드하지 않고 바이트를 그대로 쓴다
+    def encoded_items(self, codec: int) -> Iterator[Tuple[int, bytes]]:
+        reader = self._reader
+        changed = self._changed
+        added = sorted(record_id for record_id in changed if reader is None or record_id not in reader)
+        existing = ()
+        if reader is not None:
+            existing = (record_id for record_id in reader.ids if record_id not in self._deleted)
+        for record_id in merge(existing, added):
+            record = changed.get(record_id)
+            if record is not None:
+                yield record_id, encode(record, codec)
+                continue
+            position = reader.position(record_id)
+            if reader.codec == codec:
+                yield record_id, reader.raw_at(position)
+            else:
+                yield record_id, encode(reader.record_at(position), codec)
+
+
+## 레코드 매핑을 바이너리 스냅샷으로 쓰기 (임시 파일에 쓰고 교체)
+def write_snapshot(path: Path, records: LazyRecords, codec: Optional[int] = None):
+    codec = default_codec() if codec is None else codec
+    ids = array("q")
+    offsets = array("Q")
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        offset = HEADER.size
+        for record_id, data in records.encoded_items(codec):
+            f.write(LENGTH.pack(len(data)))
+            f.write(data)
+            ids.append(record_id)
+            offsets.append(offset)
+            offset += LENGTH.size + len(data)
+        if sys.byteorder != "little":
+            ids.byteswap()
+            offsets.byteswap()
+        f.write(ids.tobytes())
+        f.write(offsets.tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, codec, len(ids), records.max_version(), offset))
+        f.seek(0, os.SEEK_END)
+        f.flush()
+        os.fsync(f.fileno())
+        metrics.add_written(f.tell())
+    os.replace(tmp_path, path)
@@ -0,0 +1,788 @@
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없음 (워커 1개로 실행)
+    fcntl = None
+
+from core.config import DATA_DIR, STORAGE_ENGINE, LOG_COMPACT_BYTES, SQLITE_PATH
+from core.metrics import metrics
+from model.snapshot import LazyRecords, SnapshotReader, write_snapshot
+from model.record import Record, encode_record
+
+logger = logging.getLogger(__name__)
+
+# JSON 배열 파일을 쓸 때 한 번에 인코딩하는 레코드 수
+JSON_CHUNK = 1000
+
+
+class FileLock:
+    """프로세스 간 배타 잠금 (fcntl.flock, data/{name}.lock)
+
+    같은 프로세스 안에서는 RLock 으로 스레드를 직렬화하고, 중첩해서 잡으면
+    가장 바깥에서만 flock 을 잡고 푼다.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def __call__(self):
+        with self._lock:
+            if self._depth == 0 and fcntl is not None:
+                if self._file is None:
+                    self._file = open(self.path, "a")
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+
+class GenerationCounter:
+    """워커 프로세스들이 공유하는 세대 번호 (data/{name}.gen 8바이트를 mmap)
+
+    쓰기가 커밋될 때마다 1씩 올린다. 모든 워커가 같은 파일을 공유 매핑하므로
+    캐시가 최신인지 확인할 때 시스템 호출 없이 메모리만 읽는다.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            self._map = mmap.mmap(fd, 8)
+        finally:
+            os.close(fd)
+
+    ## 현재 세대
+    def value(self) -> int:
+        return struct.unpack_from("<Q", self._map)[0]
+
+    ## 세대 올리기 (파일 잠금 안에서 호출)
+    def bump(self) -> int:
+        value = self.value() + 1
+        struct.pack_into("<Q", self._map, 0, value)
+        return value
+
+    ## 적어도 value 가 되도록 올리기 (파일 잠금 안에서 호출)
+    def advance(self, value: int) -> int:
+        if value > self.value():
+            struct.pack_into("<Q", self._map, 0, value)
+        return self.value()
+
+
+class LogCompaction:
+    """append-only 로그 압축 (LogStorage, BinaryStorage, LikeModel 공용)
+
+    현재 로그를 {log}.compacting 으로 떼어내고, 그 시점 상태를 스냅샷으로 쓴 뒤 떼어낸 로그를 지운다.
+    스냅샷을 쓰는 동안에는 {log}.compacting.busy 에 flock 을 잡아 둔다. 압축 중인 로그가 있는데
+    이 잠금을 아무도 잡고 있지 않으면 압축이 도중에 죽었거나 실패한 것이므로, 그 로그를 현재 로그
+    앞에 합쳐(recover) 다음 압축이 다시 맡게 한다. 로그의 변경은 다시 재생해도 결과가 같으므로
+    이미 그 변경이 반영된 스냅샷 위에 한 번 더 재생돼도 안전하다.
+    """
+
+    def __init__(self, log_path: Path):
+        self.log_path = log_path
+        self.compacting_path = log_path.with_name(f"{log_path.name}.compacting")
+        self.busy_path = log_path.with_name(f"{log_path.name}.compacting.busy")
+        self._thread = None
+        # 스냅샷을 쓰는 동안 flock 을 잡고 있는 진행 표시 파일
+        self._busy_file = None
+
+    ## 진행 표시 잠금을 기다리지 않고 잡기 -> 잡은 파일 (다른 스레드/워커가 스냅샷을 쓰는 중이면 None)
+    def _try_busy(self):
+        if self._busy_file is not None:
+            return None
+        f = open(self.busy_path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                return None
+        return f
+
+    ## 다른 스레드/워커가 스냅샷을 쓰는 중인지
+    def busy(self) -> bool:
+        f = self._try_busy()
+        if f is None:
+            return True
+        f.close()
+        return False
+
+    ## 멈춘 압축이 남긴 로그가 있는지
+    def stale(self) -> bool:
+        return self.compacting_path.exists() and not self.busy()
+
+    ## 멈춘 압축이 남긴 로그를 현재 로그 앞에 합치기 (저장소 잠금 안에서 호출)
+    ##  -> 새 압축을 시작해도 되면 True (진행 중인 압축이 있으면 False)
+    def recover(self) -> bool:
+        if not self.compacting_path.exists():
+            return True
+        busy_file = self._try_busy()
+        if busy_file is None:
+            return False
+        # 진행 표시 잠금을 잡은 뒤에 다시 본다 (그 사이 압축이 끝나 떼어낸 로그를 지웠을 수 있다)
+        with busy_file:
+            if not self.compacting_path.exists():
+                return True
+            tmp_path = self.log_path.with_name(f"{self.log_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as out:
+                for path in (self.compacting_path, self.log_path):
+                    try:
+                        with open(path, "rb") as f:
+                            data = f.read()
+                    except FileNotFoundError:
+                        continue
+                    # 잘린 마지막 줄은 버린다 (중간에 남으면 재생이 거기서 멈춘다)
+                    out.write(data[:data.rfind(b"\n") + 1])
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, self.log_path)
+            self.compacting_path.unlink()
+        logger.warning("멈춘 로그 압축을 현재 로그에 합쳤습니다: %s", self.compacting_path)
+        return True
+
+    ## 현재 로그를 떼어내고 진행 표시 잠금을 잡기 (저장소 잠금 안, 로그 핸들을 닫은 뒤 호출)
+    ##  -> 떼어낼 로그가 없으면 False
+    def detach(self) -> bool:
+        if not self.log_path.exists():
+            return False
+        self._busy_file = open(self.busy_path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._busy_file.fileno(), fcntl.LOCK_EX)
+        os.replace(self.log_path, self.compacting_path)
+        return True
+
+    ## 스냅샷 쓰기 (background 면 스레드에서), 성공하면 떼어낸 로그를 지운다
+    def run(self, write_snapshot: Callable[[object], None], snapshot, background: bool = True):
+        if background:
+            self._thread = threading.Thread(
+                target=self._finish, args=(write_snapshot, snapshot),
+                name=f"compact-{self.log_path.name}", daemon=True
+            )
+            self._thread.start()
+        else:
+            self._finish(write_snapshot, snapshot)
+
+    def _finish(self, write_snapshot: Callable[[object], None], snapshot):
+        try:
+            write_snapshot(snapshot)
+            self.compacting_path.unlink()
+        except Exception:
+            # 떼어낸 로그는 남겨 두고 다음 압축/로드 때 현재 로그에 합친다
+            logger.exception("로그 압축 실패: %s", self.compacting_path)
+        finally:
+            busy_file, self._busy_file = self._busy_file, None
+            busy_file.close()
+
+
+class JsonStorage:
+    """data/{name}.json 한 파일에 컬렉션 전체를 저장하는 기본 엔진
+
+    변경이 있을 때마다 임시 파일에 전체를 쓰고 os.replace 로 바꿔치기하므로
+    읽는 쪽(다른 워커 포함)은 잠금 없이도 항상 완전한 파일을 본다.
+    """
+
+    def __init__(self, name: str):
+        self.path = DATA_DIR / f"{name}.json"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 쓰기(읽기-수정-쓰기) 구간의 프로세스 간 잠금과 변경 알림용 세대 번호
+        self.lock = FileLock(DATA_DIR / f"{name}.lock")
+        self.generation = GenerationCounter(DATA_DIR / f"{name}.gen")
+
+    ## 전체 레코드 읽기
+    def load(self) -> List[dict]:
+        return read_json(self.path)
+
+    ## 전체 레코드 쓰기
+    def _write_all(self, records: Dict[int, dict]):
+        write_json_atomic(self.path, list(records.values()), indent=2)
+
+    def insert(self, record: dict, records: Dict[int, dict]):
+        self._write_all(records)
+
+    def patch(self, record_id: int, updates: dict, records: Dict[int, dict]):
+        self._write_all(records)
+
+    def patch_many(self, changes: Dict[int, dict], records: Dict[int, dict]):
+        self._write_all(records)
+
+    def replace_many(self, replaced: List[dict], records: Dict[int, dict]):
+        self._write_all(records)
+
+    def delete(self, record_id: int, records: Dict[int, dict]):
+        self._write_all(records)
+
+    def delete_many(self, record_ids: List[int], records: Dict[int, dict]):
+        self._write_all(records)
+
+
+class LogStorage:
+    """append-only JSONL 로그 엔진
+
+    data/{name}.json 스냅샷 위에 data/{name}.log 의 변경(insert/patch/delete)을
+    재생해서 상태를 복원한다. 쓰기는 변경분 한 줄만 추가하고, 로그가
+    LOG_COMPACT_BYTES 를 넘으면 백그라운드 스레드가 새 스냅샷으로 압축한다.
+    """
+
+    def __init__(self, name: str, compact_bytes: int = LOG_COMPACT_BYTES):
+        self.path = DATA_DIR / f"{name}.json"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._set_log_path(DATA_DIR / f"{name}.log")
+        self.compact_bytes = compact_bytes
+        self.lock = FileLock(DATA_DIR / f"{name}.lock")
+        self.generation = GenerationCounter(DATA_DIR / f"{name}.gen")
+        self._log = None
+
+    def _set_log_path(self, log_path: Path):
+        self.log_path = log_path
+        self.compaction = LogCompaction(log_path)
+        # 압축 중인 로그 (압축이 끝나기 전에 죽으면 다음 로드/압축 때 현재 로그에 합친다)
+        self.compacting_path = self.compaction.compacting_path
+
+    ## 멈춘 압축이 남긴 로그 정리 (로드 전에 호출)
+    def _recover(self):
+        if self.compaction.stale():
+            with self.lock():
+                self.compaction.recover()
+
+    ## 스냅샷 + 로그 재생
+    def load(self) -> List[dict]:
+        self._recover()
+        # 압축 중인 로그를 스냅샷보다 먼저 열어 둔다. 그 사이 다른 워커가 압축을 끝내도
+        # 새 스냅샷 위에 이미 반영된 변경을 한 번 더 재생할 뿐 변경을 잃지 않는다
+        try:
+            compacting = open(self.compacting_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            compacting = None
+        records = {record["id"]: record for record in read_json(self.path)}
+        if compacting is not None:
+            with compacting:
+                _replay_lines(compacting, records)
+        _replay(self.log_path, records)
+        return list(records.values())
+
+    def insert(self, record: dict, records: Dict[int, dict]):
+        self._append({"op": "insert", "record": record}, records)
+
+    def patch(self, record_id: int, updates: dict, records: Dict[int, dict]):
+        self._append({"op": "patch", "id": record_id, "set": updates}, records)
+
+    def patch_many(self, changes: Dict[int, dict], records: Dict[int, dict]):
+        self._append_many(
+            [{"op": "patch", "id": record_id, "set": updates} for record_id, updates in changes.items()],
+            records
+        )
+
+    ## 레코드 전체 교체 (insert 재생은 덮어쓰기)
+    def replace_many(self, replaced: List[dict], records: Dict[int, dict]):
+        self._append_many([{"op": "insert", "record": record} for record in replaced], records)
+
+    def delete(self, record_id: int, records: Dict[int, dict]):
+        self._append({"op": "delete", "id": record_id}, records)
+
+    def delete_many(self, record_ids: List[int], records: Dict[int, dict]):
+        self._append_many([{"op": "delete", "id": record_id} for record_id in record_ids], records)
+
+    ## 변경 한 줄 추가
+    def _append(self, entry: dict, records: Dict[int, dict]):
+        self._append_many([entry], records)
+
+    ## 변경 여러 줄을 한 번에 추가
+    def _append_many(self, entries: List[dict], records: Dict[int, dict]):
+        self._log = open_append_log(self._log, self.log_path)
+        start = self._log.tell()
+        self._log.write("".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=encode_record) + "\n"
+            for entry in entries
+        ))
+        self._log.flush()
+        metrics.add_written(self._log.tell() - start)
+        if self._log.tell() >= self.compact_bytes:
+            self.compact(records)
+
+    ## 스냅샷으로 압축 (현재 로그를 떼어내고 백그라운드에서 스냅샷 작성)
+    ## (self.lock 안에서 호출)
+    def compact(self, records: Dict[int, dict], background: bool = True):
+        if not self.compaction.recover():
+            return
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if not self.compaction.detach():
+            return
+        self._log = open_append_log(None, self.log_path)
+        self.compaction.run(self._write_snapshot, self._freeze(records), background)
+
+    ## 압축할 시점의 레코드 (컬렉션은 저장소에 넘긴 버전을 다시 바꾸지 않으므로 복사하지 않는다)
+    def _freeze(self, records: Dict[int, dict]):
+        return records
+
+    def _write_snapshot(self, snapshot: Dict[int, dict]):
+        write_json_atomic(self.path, list(snapshot.values()))
+
+
+class BinaryStorage(LogStorage):
+    """mmap 바이너리 스냅샷 + append-only 로그 엔진
+
+    data/{name}.bin 스냅샷(model.snapshot)은 id 순 고정폭 인덱스와 길이가 앞에 붙은 레코드로 되어 있어
+    로드할 때 파일을 mmap 으로 열고 로그만 재생한다. 레코드는 처음 접근할 때 그 바이트만 디코드하므로
+    시작 시간과 메모리는 저장된 레코드 수가 아니라 접근한 레코드 수에 비례한다.
+    변경은 LogStorage 와 같은 형식으로 data/{name}.bin.log 에 쌓고, 압축할 때 바뀌지 않은 레코드는
+    디코드하지 않고 바이트를 그대로 옮긴다. 스냅샷이 없으면 json/log 엔진 데이터를 한 번 변환한다.
+    """
+
+    def __init__(self, name: str, compact_bytes: int = LOG_COMPACT_BYTES):
+        super().__init__(name, compact_bytes)
+        self.path = DATA_DIR / f"{name}.bin"
+        self._set_log_path(DATA_DIR / f"{name}.bin.log")
+        self._reader = None
+        if not self.path.exists():
+            with self.lock():
+                if not self.path.exists():
+                    self._import_json(name)
+
+    ## json/log 엔진 데이터 -> 스냅샷 (없으면 빈 스냅샷)
+    def _import_json(self, name: str):
+        records = LazyRecords()
+        for record in read_json(DATA_DIR / f"{name}.json"):
+            records[record["id"]] = record
+        for log_path in (DATA_DIR / f"{name}.log.compacting", DATA_DIR / f"{name}.log"):
+            _replay(log_path, records)
+        write_snapshot(self.path, records)
+
+    ## 스냅샷 열기 (파일이 그대로면 디코드해 둔 레코드와 함께 재사용)
+    def _open_snapshot(self) -> SnapshotReader:
+        inode = os.stat(self.path).st_ino
+        if self._reader is None or self._reader.inode != inode:
+            self._reader = SnapshotReader(self.path)
+        return self._reader
+
+    ## 스냅샷 mmap + 로그 재생 -> 지연 디코드 매핑
+    def load(self) -> LazyRecords:
+        self._recover()
+        try:
+            compacting = open(self.compacting_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            compacting = None
+        records = LazyRecords(self._open_snapshot())
+        if compacting is not None:
+            with compacting:
+                _replay_lines(compacting, records)
+        _replay(self.log_path, records)
+        return records
+
+    def _freeze(self, records: Dict[int, dict]) -> LazyRecords:
+        if isinstance(records, LazyRecords):
+            return records
+        frozen = LazyRecords()
+        for record in records.values():
+            frozen[record["id"]] = record
+        return frozen
+
+    def _write_snapshot(self, snapshot: LazyRecords):
+        write_snapshot(self.path, snapshot)
+
+
+class SqliteStorage:
+    """SQLite 엔진 (WAL 모드)
+
+    컬렉션마다 테이블 하나에 레코드 JSON 을 저장하고, 자주 찾는 필드(INDEXED_FIELDS)와 레코드 버전은
+    별도 컬럼으로 뽑아 인덱스를 건다. 쓰기는 바뀐 행만 갱신한다.
+    load() 는 레코드를 읽지 않고 테이블 위의 지연 매핑(LazyRecords + SqliteReader)을 돌려주며,
+    컬럼이 있는 필드의 조회/개수/페이지는 컬렉션 인덱스(model.index.sql_index)가 SQL 로 보낸다.
+    쓰기마다 바뀐 id 를 {name}_changes 에 남겨 두므로, 메모리에 둬야 하는 인덱스(전문 검색)는
+    다른 워커가 쓴 뒤에도 테이블 전체가 아니라 바뀐 레코드만 다시 색인한다.
+    """
+
+    # 컬렉션별 인덱스 컬럼
+    INDEXED_FIELDS = {
+        "users": ("email", "nickname"),
+        "posts": ("user_id", "created_at"),
+        "comments": ("post_id", "user_id", "created_at"),
+        "blobs": ("url",),
+    }
+
+    # 컬럼 묶음 인덱스 (정렬 조회용, 앞 컬럼이 같으면 뒤 컬럼 순)
+    COMPOSITE_INDEXES = {
+        "posts": (("created_at", "id"),),
+        "comments": (("post_id", "created_at", "id"),),
+    }
+
+    # 남겨 두는 변경 기록 수 (이보다 뒤처진 워커는 전문 검색 색인을 처음부터 맞춘다)
+    CHANGES_KEEP = 100_000
+
+    def __init__(self, name: str, db_path: Path = SQLITE_PATH):
+        self.name = name
+        self.path = db_path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fields = self.INDEXED_FIELDS.get(name, ())
+        self.columns = frozenset(("id",) + self.fields)
+        # 모델의 읽기-수정-쓰기 구간은 SQLite 트랜잭션보다 넓으므로 파일 잠금을 따로 둔다
+        self.lock = FileLock(self.path.with_name(f"{self.path.name}.{name}.lock"))
+        self.generation = GenerationCounter(self.path.with_name(f"{self.path.name}.{name}.gen"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock():
+            self._create_schema()
+        # 자주 쓰는 문장은 미리 만들어 두고 sqlite3 문장 캐시로 재사용한다
+        columns = "".join(f", {field}" for field in self.fields)
+        placeholders = ", ".join("?" * (len(self.fields) + 3))
+        self._upsert_sql = f"INSERT OR REPLACE INTO {name} (id, data, version{columns}) VALUES ({placeholders})"
+        self._delete_sql = f"DELETE FROM {name} WHERE id = ?"
+        self._change_sql = f"INSERT INTO {name}_changes (id) VALUES (?)"
+        self._prune_sql = f"DELETE FROM {name}_changes WHERE seq <= (SELECT MAX(seq) FROM {name}_changes) - ?"
+        self._get_sql = f"SELECT data FROM {name} WHERE id = ?"
+
+    ## 테이블/인덱스 만들기 (이전 버전이 만든 테이블에는 없는 컬럼을 추가해 레코드 JSON 에서 채운다)
+    def _create_schema(self):
+        name = self.name
+        columns = "".join(f", {field}" for field in self.fields)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {name} "
+                           f"(id INTEGER PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0{columns})")
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({name})")}
+        missing = [column for column in ("version",) + self.fields if column not in existing]
+        if missing:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for column in missing:
+                    default = " INTEGER NOT NULL DEFAULT 0" if column == "version" else ""
+                    self._conn.execute(f"ALTER TABLE {name} ADD COLUMN {column}{default}")
+                assignments = ", ".join(
+                    f"{column} = COALESCE(json_extract(data, '$.version'), 0)" if column == "version"
+                    else f"{column} = json_extract(data, '$.{column}')"
+                    for column in missing
+                )
+                self._conn.execute(f"UPDATE {name} SET {assignments}")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        for column in ("version",) + self.fields:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{column} ON {name} ({column})")
+        for columns in self.COMPOSITE_INDEXES.get(name, ()):
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {name}_{'_'.join(columns)} ON {name} ({', '.join(columns)})"
+            )
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {name}_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, id INTEGER NOT NULL)"
+        )
+
+    ## 테이블 위의 지연 매핑 (레코드는 꺼낼 때 한 행씩 읽는다)
+    def load(self) -> LazyRecords:
+        return LazyRecords(SqliteReader(self))
+
+    ## 읽기 쿼리 -> 행 목록
+    def query(self, sql: str, parameters: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
+
+    ## id 의 레코드 JSON (없으면 None)
+    def fetch(self, record_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(self._get_sql, (record_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    ## 필드 값이 같은 첫 레코드 id (없으면 None)
+    def lookup(self, field: str, value) -> Optional[int]:
+        rows = self.query(f"SELECT id FROM {self.name} WHERE {field} = ? ORDER BY id LIMIT 1", (value,))
+        return rows[0][0] if rows else None
+
+    ## 필드 값이 같은 레코드 id 목록 (order_by, id 순)
+    def group(self, field: str, value, order_by: str, reverse: bool = False) -> List[int]:
+        direction = "DESC" if reverse else "ASC"
+        rows = self.query(f"SELECT id FROM {self.name} WHERE {field} = ? "
+                          f"ORDER BY {order_by} {direction}, id {direction}", (value,))
+        return [record_id for record_id, in rows]
+
+    ## 필드 값이 같은 레코드 수
+    def count(self, field: str, value) -> int:
+        return self.query(f"SELECT COUNT(*) FROM {self.name} WHERE {field} = ?", (value,))[0][0]
+
+    ## (field, id) 최신순 페이지 -> (id 목록, 다음 페이지 정렬 키) (SortedIndex.page 와 같은 결과)
+    def page(self, field: str, skip: int = 0, limit: int = 20, after: Optional[Tuple[str, int]] = None):
+        skip, limit = max(skip, 0), max(limit, 0)
+        where, parameters = "", ()
+        if after:
+            where, parameters = f"WHERE ({field}, id) < (?, ?)", tuple(after)
+        rows = self.query(f"SELECT {field}, id FROM {self.name} {where} "
+                          f"ORDER BY {field} DESC, id DESC LIMIT ? OFFSET ?", parameters + (limit + 1, skip))
+        entries = rows[:limit]
+        next_entry = tuple(entries[-1]) if entries and len(rows) > limit else None
+        return [record_id for _, record_id in entries], next_entry
+
+    ## 변경 기록의 마지막 번호
+    def change_seq(self) -> int:
+        rows = self.query("SELECT seq FROM sqlite_sequence WHERE name = ?", (f"{self.name}_changes",))
+        return rows[0][0] if rows else 0
+
+    ## seq 이후 바뀐(추가/수정/삭제) id (기록이 이미 지워졌으면 None)
+    def changed_ids(self, seq: int) -> Optional[List[int]]:
+        (first,), = self.query(f"SELECT MIN(seq) FROM {self.name}_changes")
+        if seq < self.change_seq() and (first is None or first > seq + 1):
+            return None
+        rows = self.query(f"SELECT DISTINCT id FROM {self.name}_changes WHERE seq > ?", (seq,))
+        return [record_id for record_id, in rows]
+
+    def _row(self, record: dict) -> tuple:
+        return (record["id"], json.dumps(record, ensure_ascii=False, default=encode_record),
+                record.get("version", 0), *(record.get(field) for field in self.fields))
+
+    ## 트랜잭션 하나로 실행 (바뀐 id 를 변경 기록에 남긴다)
+    def _write(self, sql: str, rows: List[tuple]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, rows)
+                self._conn.executemany(self._change_sql, [(row[0],) for row in rows])
+                self._conn.execute(self._prune_sql, (self.CHANGES_KEEP,))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    ## 여러 행 upsert (트랜잭션 하나)
+    def upsert_many(self, records: List[dict]):
+        rows = [self._row(record) for record in records]
+        metrics.add_written(sum(len(row[1]) for row in rows))
+        self._write(self._upsert_sql, rows)
+
+    def insert(self, record: dict, records: Dict[int, dict]):
+        self.upsert_many([record])
+
+    def patch(self, record_id: int, updates: dict, records: Dict[int, dict]):
+        self.upsert_many([records[record_id]])
+
+    def patch_many(self, changes: Dict[int, dict], records: Dict[int, dict]):
+        self.upsert_many([records[record_id] for record_id in changes])
+
+    def replace_many(self, replaced: List[dict], records: Dict[int, dict]):
+        self.upsert_many(replaced)
+
+    def delete(self, record_id: int, records: Dict[int, dict]):
+        self.delete_many([record_id], records)
+
+    ## 여러 행 삭제 (트랜잭션 하나)
+    def delete_many(self, record_ids: List[int], records: Dict[int, dict]):
+        self._write(self._delete_sql, [(record_id,) for record_id in record_ids])
+
+
+class SqliteReader:
+    """SQLite 테이블을 SnapshotReader 처럼 읽는 뷰 (LazyRecords 의 바탕)
+
+    행 수와 최대 레코드 버전만 열 때 읽고, 레코드는 id 로 한 행씩 읽어 디코드한 뒤 재사용한다.
+    다른 워커가 쓰면 세대 번호가 바뀌어 새 뷰를 만들고, 이 워커의 쓰기는 LazyRecords 가 따로 들고 있다.
+    """
+
+    def __init__(self, storage: SqliteStorage):
+        self._storage = storage
+        name = storage.name
+        (self.count, self.max_version), = storage.query(f"SELECT COUNT(*), COALESCE(MAX(version), 0) FROM {name}")
+        self._ids_sql = f"SELECT id FROM {name} ORDER BY id"
+        self._decoded: Dict[int, dict] = {}
+        self.factory: Optional[Callable[[dict], dict]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    ## 테이블의 id (오름차순)
+    @property
+    def ids(self) -> List[int]:
+        return [record_id for record_id, in self._storage.query(self._ids_sql)]
+
+    ## id 로 레코드 (없으면 None)
+    def get(self, record_id: int) -> Optional[dict]:
+        record = self._decoded.get(record_id)
+        if record is not None:
+            return record
+        data = self._storage.fetch(record_id)
+        if data is None:
+            return None
+        metrics.add_read(len(data))
+        record = json.loads(data)
+        if self.factory is not None:
+            record = self.factory(record)
+        self._decoded[record_id] = record
+        return record
+
+    def __contains__(self, record_id: int) -> bool:
+        return self.get(record_id) is not None
+
+    ## 레코드 변환 함수 지정 (이미 디코드한 레코드도 변환)
+    def set_factory(self, factory: Callable[[dict], dict]):
+        if self.factory == factory:
+            return
+        self.factory = factory
+        self._decoded = {record_id: factory(record) for record_id, record in list(self._decoded.items())}
+
+
+## 로그 파일 append 핸들 (다른 워커가 로그를 회전시켰으면 새 파일로 다시 연다)
+## 쓰다가 멈춘 워커가 남긴 잘린 줄이 끝에 있으면 잘라 내서 다음 줄이 거기에 붙지 않게 한다 (저장소 잠금 안에서 호출)
+def open_append_log(log, log_path: Path):
+    if log is not None:
+        try:
+            current = os.stat(log_path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(log.fileno()).st_ino:
+            trim_torn_tail(log)
+            return log
+        log.close()
+    log = open(log_path, "a+", encoding="utf-8")
+    trim_torn_tail(log)
+    return log
+
+## 줄바꿈으로 끝나지 않는 로그의 마지막 줄 자르기 (읽기/쓰기로 연 핸들)
+def trim_torn_tail(log):
+    fd = log.fileno()
+    size = os.fstat(fd).st_size
+    if size == 0 or os.pread(fd, 1, size - 1) == b"\n":
+        return
+    keep = 0
+    end = size
+    while end > 0:
+        start = max(0, end - 64 * 1024)
+        block = os.pread(fd, end - start, start)
+        newline = block.rfind(b"\n")
+        if newline >= 0:
+            keep = start + newline + 1
+            break
+        end = start
+    os.ftruncate(fd, keep)
+    log.seek(0, os.SEEK_END)
+    logger.warning("로그 끝의 잘린 줄을 지웠습니다: %s (%d바이트)", log.name, size - keep)
+
+## JSON 파일 읽기 (없으면 빈 목록)
+def read_json(path: Path) -> List[dict]:
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        metrics.add_read(os.fstat(f.fileno()).st_size)
+        return json.load(f)
+
+## 임시 파일에 쓰고 교체 (읽는 쪽은 항상 완전한 파일을 본다)
+def write_json_atomic(path: Path, data, indent: int = None):
+    # 워커마다 다른 임시 파일을 써야 서로 덮어쓰지 않는다
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if isinstance(data, list):
+            _write_json_array(f, data, indent)
+        elif indent:
+            json.dump(data, f, ensure_ascii=False, indent=indent, default=encode_record)
+        else:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=encode_record)
+        f.flush()
+        os.fsync(f.fileno())
+        metrics.add_written(f.tell())
+    os.replace(tmp_path, path)
+
+## 레코드 목록을 JSON 배열로 쓰기 (json.dump 와 같은 내용)
+##  묶음마다 dict 로 바꿔 json.dumps 를 한 번 부른다. json.dump 는 조각마다 write 하고
+##  __slots__ 레코드는 default 훅을 거치며 생성기 단계가 늘어나므로 훨씬 느리다
+def _write_json_array(f, data: list, indent: int = None):
+    if not data:
+        f.write("[]")
+        return
+    start_text, separator, end_text = ("[\n", ",\n", "\n]") if indent else ("[", ",", "]")
+    f.write(start_text)
+    for start in range(0, len(data), JSON_CHUNK):
+        if start:
+            f.write(separator)
+        chunk = [record.to_dict() if isinstance(record, Record) else record
+                 for record in data[start:start + JSON_CHUNK]]
+        text = json.dumps(chunk, ensure_ascii=False, indent=indent,
+                          separators=None if indent else (",", ":"), default=encode_record)
+        f.write(text[len(start_text):-len(end_text)])
+    f.write(end_text)
+
+## 로그 재생
+def _replay(log_path: Path, records: Dict[int, dict]):
+    if not log_path.exists():
+        return
+    with open(log_path, "r", encoding="utf-8") as f:
+        _replay_lines(f, records)
+
+## 읽을 수 없는 줄(잘린 줄)은 건너뛴다 - 그 뒤에 쓰인 변경까지 버리지 않는다
+def _replay_lines(lines, records: Dict[int, dict]):
+    metrics.add_read(os.fstat(lines.fileno()).st_size)
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning("로그의 읽을 수 없는 줄을 건너뜁니다: %s", getattr(lines, "name", lines))
+            continue
+        op = entry["op"]
+        if op == "insert":
+            records[entry["record"]["id"]] = entry["record"]
+        elif op == "patch":
+            if entry["id"] in records:
+                records[entry["id"]] = {**records[entry["id"]], **entry["set"]}
+        elif op == "delete":
+            records.pop(entry["id"], None)
+
+## JSON 배열 파일을 레코드 단위로 읽기 (파일 전체를 메모리에 올리지 않는다)
+def iter_json_array(path: Path, chunk_size: int = 1024 * 1024) -> Iterator[dict]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if not started and position < len(buffer):
+                    if buffer[position] != "[":
+                        raise ValueError(f"JSON 배열이 아닙니다: {path}")
+                    started = True
+                    position += 1
+                    continue
+                if position < len(buffer) and buffer[position] == "]":
+                    return
+                try:
+                    record, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # 레코드가 청크 경계에 걸림 -> 더 읽는다
+                    if not chunk:
+                        raise
+                    break
+                yield record
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+ENGINES = {
+    "json": JsonStorage,
+    "log": LogStorage,
+    "binary": BinaryStorage,
+    "sqlite": SqliteStorage,
+}
+
+## 설정된 저장 엔진 생성
+def create_storage(name: str, engine: str = STORAGE_ENGINE):
+    if engine not in ENGINES:
+        raise ValueError(f"알 수 없는 저장 엔진입니다: {engine}")
+    return ENGINES[engine](name)
@@ -1,84 +1,79 @@
-import json
-from pathlib import Path
 from typing import List, Optional
 import hashlib
+from model.collection import Collection
+from model.record import User
+from model.aio import AsyncModel
+from model.index import UniqueIndex
+from model.blob import blob_model
 
 class UserModel:
     def __init__(self):
-        self.db_path = Path("data/users.json")
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.collection = Collection("users", record_type=User)
+        self.db_path = self.collection.db_path
+        # 이메일/닉네임 유니크 인덱스 (중복 시 DuplicateKeyError)
+        self.collection.add_index(UniqueIndex("email"))
+        self.collection.add_index(UniqueIndex("nickname"))
 
     ## 모든 사용자정보 읽기
     def _read_all(self) -> List[dict]:
-        if not self.db_path.exists():
-            return[]
-        with open(self.db_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-        
-    ## 모든 사용자정보 쓰기
-    def _write_all(self, users: List[dict]):
-        with open(self.db_path, "w", encoding="utf-8") as f:
-            json.dump(users, f, ensure_ascii=False, indent=2)
+        return self.collection.all()
 
-    ## 다음 ID 찾기
+    ## 다음 ID 생성
     def get_next_id(self) -> int:
-        users = self._read_all()
-        if not users:
-            return 1
-        return max(user["id"] for user in users) + 1
+        return self.collection.next_id()
     
     ## ID로 사용자 찾기
     def find_by_id(self, user_id: int) -> Optional[dict]:
-        users = self._read_all()
-        return next((user for user in users if user['id'] == user_id), None)
-    
-    ## 다음 ID 생성
-    def get_next_id(self) -> int:
-        users = self._read_all()
-        if not users:
-            return 1
+        return self.collection.get(user_id)
         
+    ## 사용자 레코드 버전 (조건부 요청용, 없으면 None)
+    def version_of(self, user_id: int) -> Optional[int]:
+        user = self.collection.get(user_id)
+        return user.get("version", 0) if user else None
+
     ## 이메일로 사용자 찾기
     def find_by_email(self, email: str) -> Optional[dict]:
-        users = self._read_all()
-        return next((user for user in users if user['email'] == email), None)
+        return self.collection.find_one("email", email)
     
     ## 닉네임으로 사용자 찾기
     def find_by_nickname(self, nickname: str) -> Optional[dict]:
-        users = self._read_all()
-        return next((user for user in users if user['nickname'] == nickname), None)
+        return self.collection.find_one("nickname", nickname)
     
-    ## 사용자 생성
+    ## 사용자 생성 (업로드가 잡아 둔 프로필 이미지 참조를 넘겨받는다)
     def create(self, user_data: dict) -> dict:
-        users = self._read_all()
-        user_data['id'] = self.get_next_id()
-        users.append(user_data)
-        self._write_all(users)
-        return user_data
+        try:
+            return self.collection.insert(user_data)
+        except BaseException:
+            # 이메일/닉네임 중복 등으로 저장하지 못하면 참조를 돌려준다
+            blob_model.release(user_data.get('profile_image_url'))
+            raise
     
-    ## 사용자 정보 업데이트
+    ## 사용자 정보 업데이트 (업로드가 잡아 둔 새 프로필 이미지 참조를 넘겨받는다)
     def update(self, user_id: int, updates: dict) -> Optional[dict]:
-        users = self._read_all()
-        user = next((u for u in users if u['id'] == user_id), None)
-        if not user:
-            return None
-        user.update(updates)
-        self._write_all(users)
+        try:
+            previous, user = self.collection.update_with_previous(user_id, updates)
+        except BaseException:
+            blob_model.release(updates.get('profile_image_url'))
+            raise
+        if 'profile_image_url' in updates:
+            # 반영됐으면 이전 이미지, 사용자가 없으면 새 이미지 참조 해제
+            blob_model.release(previous.get('profile_image_url') if user else updates['profile_image_url'])
         return user
     
     ## 사용자 삭제
     def delete(self, user_id: int) -> bool:
-        users = self._read_all()
-        original_length = len(users)
-        users = [u for u in users if u['id'] != user_id]
-        if len(users) < original_length:
-            self._write_all(users)
-            return True
-        return False
+        user = self.collection.get(user_id)
+        if not self.collection.delete(user_id):
+            return False
+        blob_model.release(user.get('profile_image_url'))
+        return True
     
     @staticmethod
     def hash_password(password: str) -> str:
         """비밀번호 해싱"""
         return hashlib.sha256(password.encode()).hexdigest()
 
-user_model = UserModel()    
\ No newline at end of file
+user_model = UserModel()
+
+# 라우트/컨트롤러용 비동기 모델 (스레드 풀에서 실행)
+async_user_model = AsyncModel(user_model, writes=("create", "update", "delete"))
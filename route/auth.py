@@ -22,7 +22,7 @@ async def signin(
     email: str = Form(...),
     password: str = Form(..., min_length=8, max_length=20)
 ):
-    user = auth_controller.signin(email, password)
+    user = await auth_controller.signin(email, password)
     return {
         "message": "로그인 성공",
         "user": user
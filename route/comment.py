@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, Form, Request
 from controller.comment_controller import comment_controller
+from core.responses import json_response, not_modified
 
 router = APIRouter(prefix="/posts", tags=["comments"])
 
@@ -9,15 +10,19 @@ async def create_comment(
     user_id: int = Form(...),
     content: str = Form(...)
 ):
-    comment = comment_controller.create_comment(post_id, user_id, content)
+    comment = await comment_controller.create_comment(post_id, user_id, content)
     return {
         "message": "댓글이 등록되었습니다.",
         "comment": comment
     }
 
 @router.get("/{post_id}/comments")
-async def get_comments(post_id: int):
-    return comment_controller.get_comments(post_id)
+async def get_comments(request: Request, post_id: int):
+    etag = await comment_controller.get_comments_etag(post_id)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return json_response(request, await comment_controller.get_comments(post_id), etag=etag)
 
 @router.put("/comments/{comment_id}")
 async def update_comment(
@@ -25,7 +30,7 @@ async def update_comment(
     user_id: int = Form(...),
     content: str = Form(...)
 ):
-    comment = comment_controller.update_comment(comment_id, user_id, content)
+    comment = await comment_controller.update_comment(comment_id, user_id, content)
     return {
         "message": "댓글이 수정되었습니다.",
         "comment": comment
@@ -36,4 +41,4 @@ async def delete_comment(
     comment_id: int,
     user_id: int = Form(...)
 ):
-    return comment_controller.delete_comment(comment_id, user_id)
\ No newline at end of file
+    return await comment_controller.delete_comment(comment_id, user_id)
\ No newline at end of file
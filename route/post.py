@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Form, File, UploadFile
+from fastapi import APIRouter, Form, File, UploadFile, Request
 from controller.post_controller import post_controller
+from core.responses import json_response, not_modified
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
@@ -31,28 +32,42 @@ async def update_post(
     }
 
 @router.get("")
-async def get_posts(skip: int = 0, limit: int = 20):
-    return post_controller.get_posts(skip, limit)
+async def get_posts(request: Request, skip: int = 0, limit: int = 20, cursor: str = None):
+    # 버전을 본문보다 먼저 확인해야 그 사이 바뀐 본문에 예전 ETag 가 붙지 않는다
+    etag = await post_controller.get_posts_etag(skip, limit, cursor)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return json_response(request, await post_controller.get_posts(skip, limit, cursor), etag=etag)
+
+# /{post_id} 보다 먼저 등록해야 "search" 가 게시글 id 로 해석되지 않는다
+@router.get("/search")
+async def search_posts(request: Request, q: str = "", skip: int = 0, limit: int = 20):
+    return json_response(request, await post_controller.search_posts(q, skip, limit))
 
 @router.get("/{post_id}")
-async def get_post(post_id: int):
-    return {"post": post_controller.get_post(post_id)}
+async def get_post(request: Request, post_id: int):
+    etag = await post_controller.get_post_etag(post_id)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return json_response(request, {"post": await post_controller.get_post(post_id)}, etag=etag)
 
 @router.post("/{post_id}/like")
 async def toggle_like(
     post_id: int,
     user_id: int = Form(...)
 ):
-    result = post_controller.toggle_like(post_id, user_id)
+    result = await post_controller.toggle_like(post_id, user_id)
     return result
 
 @router.post("/{post_id}/view")
 async def increment_view(post_id: int):
-    return post_controller.increment_view(post_id)
+    return await post_controller.increment_view(post_id)
 
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: int,
     user_id: int = Form(...)
 ):
-    return post_controller.delete_post(post_id, user_id)
\ No newline at end of file
+    return await post_controller.delete_post(post_id, user_id)
\ No newline at end of file
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Form, File, UploadFile
+from fastapi import APIRouter, Form, File, UploadFile, Request
 from controller.user_controller import user_controller
+from core.responses import json_response, not_modified
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/{user_id}")
-async def get_user(user_id: int):
-    return {"user": user_controller.get_user(user_id)}
+async def get_user(request: Request, user_id: int):
+    etag = await user_controller.get_user_etag(user_id)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return json_response(request, {"user": await user_controller.get_user(user_id)}, etag=etag)
 
 @router.put("/{user_id}")
 async def update_user(
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+## 빈 data/, uploads/ 를 가진 작업 디렉터리에서 스크립트를 새 프로세스로 실행하는 함수
+##  설정(core.config)과 모델 싱글턴은 import 할 때 환경변수를 읽으므로 실행마다 새 프로세스를 쓴다
+##  같은 디렉터리에서 여러 번 부르면 재시작한 워커처럼 이전 실행의 데이터를 이어서 본다
+@pytest.fixture
+def run(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "uploads").mkdir()
+
+    def run_script(source: str, **env) -> str:
+        environ = {key: value for key, value in os.environ.items()
+                   if key not in ("STORAGE_ENGINE", "SHARDS", "SHARD_BLOCK", "SQLITE_PATH")}
+        environ.update(DATA_DIR=str(tmp_path / "data"), PYTHONPATH=str(ROOT), IMAGE_WORKERS="1", **env)
+        result = subprocess.run([sys.executable, "-c", textwrap.dedent(source)], cwd=tmp_path,
+                                env=environ, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        return result.stdout.strip()
+
+    run_script.path = tmp_path
+    return run_script
@@ -0,0 +1,67 @@
+BLOBS = """
+    import os
+    from fastapi.testclient import TestClient
+    from main import app
+    from model.blob import blob_model
+    from model.comment import comment_model
+    from model.post import post_model
+    from model.user import user_model
+
+    def image(seed):
+        return {"profile_image": ("a.jpg", b"\\xff\\xd8\\xff\\xe0" + bytes([seed]) * 2000, "image/jpeg")}
+
+    ## 레코드가 들고 있는 업로드 URL 마다 참조 1개
+    def expected():
+        urls = [user["profile_image_url"] for user in user_model.collection.all()]
+        for post in post_model.collection.all():
+            urls += [post.get("image_url"), post.get("author_profile_image")]
+        urls += [comment.get("author_profile_image") for comment in comment_model.collection.all()]
+        counts = {}
+        for url in filter(blob_model.is_blob_url, urls):
+            counts[url] = counts.get(url, 0) + 1
+        return counts
+
+    def refs():
+        return {blob["url"]: blob["refs"] for blob in blob_model.collection.all()}
+
+    with TestClient(app) as client:
+        response = client.post("/auth/signup", files=image(1), data={
+            "email": "a@a.com", "password": "Abcd123!", "password_confirm": "Abcd123!", "nickname": "n1"})
+        assert response.status_code == 200, response.text
+        avatar = user_model.find_by_id(1)["profile_image_url"]
+        post_image = {"image": image(2)["profile_image"]}
+        assert client.post("/posts", data={"title": "t", "content": "c", "user_id": 1}, files=post_image).status_code == 200
+        assert client.post("/posts", data={"title": "t", "content": "c", "user_id": 1}, files=post_image).status_code == 200
+        assert client.post("/posts/1/comments", data={"user_id": 1, "content": "x"}).status_code == 200
+        assert refs() == expected()
+        assert refs()[avatar] == 4
+
+        # 프로필 이미지를 바꿔도 예전 글/댓글의 복사본이 참조를 잡고 있다
+        assert client.put("/users/1", files=image(3)).status_code == 200
+        assert refs() == expected()
+        assert refs()[avatar] == 3
+        assert client.get(avatar).status_code == 200
+
+        # 같은 게시글 이미지를 쓰는 글 하나를 다른 이미지로 바꾼다
+        post_url = post_model.find_by_id(1)["image_url"]
+        assert client.put("/posts/2", data={"user_id": 1}, files={"image": image(4)["profile_image"]}).status_code == 200
+        assert refs() == expected()
+        assert refs()[post_url] == 1
+
+        assert client.request("DELETE", "/posts/comments/1", data={"user_id": 1}).status_code == 200
+        assert client.request("DELETE", "/posts/1", data={"user_id": 1}).status_code == 200
+        assert client.request("DELETE", "/posts/2", data={"user_id": 1}).status_code == 200
+        assert refs() == expected()
+        assert avatar not in refs() and post_url not in refs()
+        assert not os.path.exists(blob_model.path_of(avatar))
+        assert not os.path.exists(blob_model.path_of(post_url))
+    print("ok")
+"""
+
+
+def test_refcounts_follow_avatar_and_post_updates(run):
+    assert run(BLOBS) == "ok"
+
+
+def test_refcounts_on_sqlite(run):
+    assert run(BLOBS, STORAGE_ENGINE="sqlite") == "ok"
@@ -0,0 +1,68 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from core.static import UploadStaticFiles
+
+ORIGINAL = "sha256/ab/cd/abcd.jpg"
+BODY = b"0123456789" * 10
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / ORIGINAL
+    path.parent.mkdir(parents=True)
+    path.write_bytes(BODY)
+    (tmp_path / "post.txt").write_bytes(b"hello")
+    app = Starlette(routes=[Mount("/static", UploadStaticFiles(str(tmp_path), meta_ttl=0))])
+    with TestClient(app) as client:
+        yield client
+
+
+def test_etag_not_modified(client):
+    response = client.get(f"/static/{ORIGINAL}")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert "immutable" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    response = client.get(f"/static/{ORIGINAL}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(f"/static/{ORIGINAL}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_range(client):
+    response = client.get(f"/static/{ORIGINAL}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == BODY[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+    assert response.headers["content-length"] == "10"
+
+    response = client.get(f"/static/{ORIGINAL}", headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == BODY[-5:]
+
+
+def test_range_not_satisfiable(client):
+    response = client.get(f"/static/{ORIGINAL}", headers={"Range": f"bytes={len(BODY)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+def test_missing_variant_falls_back_to_original(client):
+    response = client.get("/static/sha256/ab/cd/abcd.thumb.jpg")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["cache-control"] == "no-cache"
+    assert client.get("/static/sha256/ab/cd/none.thumb.jpg").status_code == 404
+
+
+def test_content_etag_changes_with_file(client, tmp_path):
+    etag = client.get("/static/post.txt").headers["etag"]
+    (tmp_path / "post.txt").write_bytes(b"changed")
+    response = client.get("/static/post.txt", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == b"changed"
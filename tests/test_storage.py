@@ -0,0 +1,65 @@
+import pytest
+
+INSERT = """
+    from model.collection import Collection
+    items = Collection("items")
+    for n in {names!r}:
+        items.insert({{"n": n}})
+    print(sorted(record["n"] for record in items.all()))
+"""
+
+
+## 엔진별로 쓰다 멈춘 흔적 남기기 (다음 프로세스는 이것을 무시하고 이어서 써야 한다)
+def tear(engine: str, data):
+    if engine == "json":
+        # os.replace 전에 죽은 쓰기의 임시 파일
+        (data / "items.json.999.1.tmp").write_text('[{"id": 1, "n": "a"}, {"id": 2, "n"', encoding="utf-8")
+    elif engine == "log":
+        with open(data / "items.log", "a", encoding="utf-8") as f:
+            f.write('{"op":"insert","record":{"id":3,"n"')
+    elif engine == "binary":
+        with open(data / "items.bin.log", "a", encoding="utf-8") as f:
+            f.write('{"op":"insert","record":{"id":3,"n"')
+    else:
+        with open(data / "community.db-wal", "ab") as f:
+            f.write(b"\x37\x7f\x06\x82" + b"\x00" * 21)
+
+
+@pytest.mark.parametrize("engine", ["json", "log", "binary", "sqlite"])
+def test_replay_after_torn_tail(run, engine):
+    assert run(INSERT.format(names=["a", "b"]), STORAGE_ENGINE=engine) == "['a', 'b']"
+    tear(engine, run.path / "data")
+
+    assert run(INSERT.format(names=["c", "d"]), STORAGE_ENGINE=engine) == "['a', 'b', 'c', 'd']"
+    assert run(INSERT.format(names=[]), STORAGE_ENGINE=engine) == "['a', 'b', 'c', 'd']"
+
+
+def test_likes_replay_after_torn_tail(run):
+    run("""
+        from model.like import like_model
+        like_model.set_liked(1, 1, True)
+    """)
+    with open(run.path / "data" / "likes.log", "a", encoding="utf-8") as f:
+        f.write("[1, 2")
+    run("""
+        from model.like import like_model
+        like_model.set_liked(1, 3, True)
+        like_model.set_liked(1, 4, True)
+    """)
+    assert run("from model.like import like_model; print(like_model.count(1))") == "3"
+
+
+def test_reshard_keeps_issuing_new_ids(run):
+    create = """
+        from model.post import post_model
+        post = post_model.create({"title": "t", "content": "c", "user_id": 1, "created_at": "2024"})
+        ids = [record["id"] for record in post_model.collection.all()]
+        assert len(ids) == len(set(ids)), ids
+        print(post["id"], len(ids))
+    """
+    issued = []
+    for shards in (2, 2, 1, 1, 2, 3, 2):
+        post_id, total = map(int, run(create, SHARDS=str(shards), SHARD_BLOCK="2").split())
+        issued.append(post_id)
+        assert total == len(issued)
+    assert issued == list(range(1, len(issued) + 1))